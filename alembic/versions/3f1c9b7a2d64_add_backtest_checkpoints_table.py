@@ -0,0 +1,39 @@
+"""Add backtest_checkpoints table
+
+Revision ID: 3f1c9b7a2d64
+Revises: ac902fb7f4b9
+Create Date: 2026-10-19 13:41:52.204187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9b7a2d64'
+down_revision: Union[str, None] = 'ac902fb7f4b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create backtest_checkpoints"""
+    op.create_table('backtest_checkpoints',
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_index', sa.Integer(), nullable=False),
+        sa.Column('prefix_hash', sa.String(length=40), nullable=False),
+        sa.Column('trade_date', sa.Date(), nullable=False),
+        sa.Column('nav', sa.Float(), nullable=False),
+        sa.Column('cash', sa.Float(), nullable=False),
+        sa.Column('holdings', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('portfolio_id', 'snapshot_index')
+    )
+    op.create_index(op.f('ix_backtest_checkpoints_trade_date'), 'backtest_checkpoints', ['trade_date'], unique=False)
+
+def downgrade():
+    """Drop backtest_checkpoints"""
+    op.drop_index(op.f('ix_backtest_checkpoints_trade_date'), table_name='backtest_checkpoints')
+    op.drop_table('backtest_checkpoints')
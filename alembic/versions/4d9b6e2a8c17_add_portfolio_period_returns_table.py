@@ -0,0 +1,39 @@
+"""Add portfolio_period_returns table
+
+Revision ID: 4d9b6e2a8c17
+Revises: e2a7c5b91f08
+Create Date: 2026-10-19 18:05:37.214906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d9b6e2a8c17'
+down_revision: Union[str, None] = 'e2a7c5b91f08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create portfolio_period_returns; rows are filled by the next recalculation or nightly run"""
+    op.create_table('portfolio_period_returns',
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('as_of_date', sa.Date(), nullable=False),
+        sa.Column('return_1d', sa.Float(), nullable=True),
+        sa.Column('return_1m', sa.Float(), nullable=True),
+        sa.Column('return_3m', sa.Float(), nullable=True),
+        sa.Column('return_ytd', sa.Float(), nullable=True),
+        sa.Column('return_1y', sa.Float(), nullable=True),
+        sa.Column('return_3y', sa.Float(), nullable=True),
+        sa.Column('return_inception', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('portfolio_id')
+    )
+
+def downgrade():
+    """Drop portfolio_period_returns"""
+    op.drop_table('portfolio_period_returns')
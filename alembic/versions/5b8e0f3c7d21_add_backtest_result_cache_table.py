@@ -0,0 +1,35 @@
+"""Add backtest_result_cache table
+
+Revision ID: 5b8e0f3c7d21
+Revises: 9c4d2e7f1a35
+Create Date: 2026-10-19 15:48:12.640391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0f3c7d21'
+down_revision: Union[str, None] = '9c4d2e7f1a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create backtest_result_cache"""
+    op.create_table('backtest_result_cache',
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_backtest_result_cache_portfolio_id'), 'backtest_result_cache', ['portfolio_id'], unique=False)
+
+def downgrade():
+    """Drop backtest_result_cache"""
+    op.drop_index(op.f('ix_backtest_result_cache_portfolio_id'), table_name='backtest_result_cache')
+    op.drop_table('backtest_result_cache')
@@ -0,0 +1,45 @@
+"""Add portfolio_symbols index and latest_prices.updated_at index
+
+Revision ID: 6c2f8d4a9e13
+Revises: b7f3a1d6e924
+Create Date: 2026-10-19 21:07:45.192834
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c2f8d4a9e13'
+down_revision: Union[str, None] = 'b7f3a1d6e924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create portfolio_symbols and fill it from existing snapshots and holdings"""
+    op.create_table('portfolio_symbols',
+        sa.Column('symbol', sa.String(), nullable=False),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('symbol', 'portfolio_id')
+    )
+    op.create_index(op.f('ix_portfolio_symbols_portfolio_id'), 'portfolio_symbols', ['portfolio_id'], unique=False)
+    op.execute("""
+        INSERT INTO portfolio_symbols (portfolio_id, symbol)
+        SELECT s.portfolio_id, a.symbol
+        FROM portfolio_snapshots s
+        JOIN snapshot_allocations a ON a.snapshot_id = s.id
+        UNION
+        SELECT portfolio_id, upper(symbol)
+        FROM holdings
+    """)
+    # "Symbols changed since T" reads
+    op.create_index(op.f('ix_latest_prices_updated_at'), 'latest_prices', ['updated_at'], unique=False)
+
+def downgrade():
+    """Drop portfolio_symbols and the latest_prices.updated_at index"""
+    op.drop_index(op.f('ix_latest_prices_updated_at'), table_name='latest_prices')
+    op.drop_index(op.f('ix_portfolio_symbols_portfolio_id'), table_name='portfolio_symbols')
+    op.drop_table('portfolio_symbols')
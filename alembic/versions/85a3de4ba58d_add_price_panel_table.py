@@ -0,0 +1,36 @@
+"""Add price_panel table
+
+Revision ID: 85a3de4ba58d
+Revises: 16dbe754f670
+Create Date: 2026-10-19 09:12:40.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '85a3de4ba58d'
+down_revision: Union[str, None] = '16dbe754f670'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create the forward-filled, trading-day-aligned price panel"""
+    op.create_table('price_panel',
+        sa.Column('symbol', sa.String(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('adjusted_close', sa.Float(), nullable=False),
+        sa.Column('source_date', sa.Date(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('symbol', 'date')
+    )
+    # Cross-sectional reads (all symbols on a date) for analytics
+    op.create_index('idx_price_panel_date_symbol', 'price_panel', ['date', 'symbol'])
+
+def downgrade():
+    """Drop the price panel"""
+    op.drop_index('idx_price_panel_date_symbol', table_name='price_panel')
+    op.drop_table('price_panel')
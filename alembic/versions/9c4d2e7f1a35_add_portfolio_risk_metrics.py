@@ -0,0 +1,36 @@
+"""Add sortino_ratio, beta and risk_state to portfolios
+
+Revision ID: 9c4d2e7f1a35
+Revises: 3f1c9b7a2d64
+Create Date: 2026-10-19 15:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4d2e7f1a35'
+down_revision: Union[str, None] = '3f1c9b7a2d64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Add risk metric columns and sort indexes"""
+    op.add_column('portfolios', sa.Column('sortino_ratio', sa.Float(), nullable=True))
+    op.add_column('portfolios', sa.Column('beta', sa.Float(), nullable=True))
+    op.add_column('portfolios', sa.Column('risk_state', sa.JSON(), nullable=True))
+    op.create_index('ix_portfolios_public_sharpe_ratio', 'portfolios', ['sharpe_ratio'],
+                    postgresql_where=sa.text('is_public'))
+    op.create_index('ix_portfolios_public_volatility', 'portfolios', ['volatility'],
+                    postgresql_where=sa.text('is_public'))
+
+def downgrade():
+    """Drop risk metric columns and sort indexes"""
+    op.drop_index('ix_portfolios_public_volatility', table_name='portfolios')
+    op.drop_index('ix_portfolios_public_sharpe_ratio', table_name='portfolios')
+    op.drop_column('portfolios', 'risk_state')
+    op.drop_column('portfolios', 'beta')
+    op.drop_column('portfolios', 'sortino_ratio')
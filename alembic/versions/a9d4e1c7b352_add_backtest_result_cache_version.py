@@ -0,0 +1,27 @@
+"""Add backtest_result_cache.version
+
+Revision ID: a9d4e1c7b352
+Revises: 6c2f8d4a9e13
+Create Date: 2026-10-19 23:14:02.518447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e1c7b352'
+down_revision: Union[str, None] = '6c2f8d4a9e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Add version; existing entries are keyed the old way and can never be read, so drop them"""
+    op.execute("DELETE FROM backtest_result_cache")
+    op.add_column('backtest_result_cache', sa.Column('version', sa.String(length=64), nullable=True))
+
+def downgrade():
+    """Drop version"""
+    op.drop_column('backtest_result_cache', 'version')
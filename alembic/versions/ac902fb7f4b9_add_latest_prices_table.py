@@ -0,0 +1,62 @@
+"""Add latest_prices table
+
+Revision ID: ac902fb7f4b9
+Revises: 85a3de4ba58d
+Create Date: 2026-10-19 10:03:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ac902fb7f4b9'
+down_revision: Union[str, None] = '85a3de4ba58d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create latest_prices and backfill it from asset_prices"""
+    op.create_table('latest_prices',
+        sa.Column('symbol', sa.String(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('close_price', sa.Float(), nullable=False),
+        sa.Column('adjusted_close', sa.Float(), nullable=False),
+        sa.Column('previous_close', sa.Float(), nullable=True),
+        sa.Column('daily_change', sa.Float(), nullable=True),
+        sa.Column('daily_change_percentage', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('symbol')
+    )
+
+    # Two most recent rows per symbol via the (symbol, date) index
+    op.execute("""
+        INSERT INTO latest_prices (symbol, date, close_price, adjusted_close,
+                                   previous_close, daily_change, daily_change_percentage)
+        SELECT cur.symbol, cur.date, cur.close_price, cur.adjusted_close,
+               prev.adjusted_close,
+               cur.adjusted_close - prev.adjusted_close,
+               CASE WHEN prev.adjusted_close > 0
+                    THEN (cur.adjusted_close / prev.adjusted_close - 1) * 100 END
+        FROM (SELECT DISTINCT symbol FROM asset_prices) s
+        CROSS JOIN LATERAL (
+            SELECT symbol, date, close_price, adjusted_close
+            FROM asset_prices a
+            WHERE a.symbol = s.symbol
+            ORDER BY a.date DESC
+            LIMIT 1
+        ) cur
+        LEFT JOIN LATERAL (
+            SELECT adjusted_close
+            FROM asset_prices a
+            WHERE a.symbol = s.symbol AND a.date < cur.date
+            ORDER BY a.date DESC
+            LIMIT 1
+        ) prev ON true
+    """)
+
+def downgrade():
+    """Drop latest_prices"""
+    op.drop_table('latest_prices')
@@ -0,0 +1,36 @@
+"""Add portfolio_leaderboard table
+
+Revision ID: b7f3a1d6e924
+Revises: 4d9b6e2a8c17
+Create Date: 2026-10-19 18:52:11.408263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7f3a1d6e924'
+down_revision: Union[str, None] = '4d9b6e2a8c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade():
+    """Create portfolio_leaderboard; it is filled by the next nightly recalculation"""
+    op.create_table('portfolio_leaderboard',
+        sa.Column('board', sa.String(length=20), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('board', 'rank')
+    )
+    op.create_index(op.f('ix_portfolio_leaderboard_portfolio_id'), 'portfolio_leaderboard', ['portfolio_id'], unique=False)
+
+def downgrade():
+    """Drop portfolio_leaderboard"""
+    op.drop_index(op.f('ix_portfolio_leaderboard_portfolio_id'), table_name='portfolio_leaderboard')
+    op.drop_table('portfolio_leaderboard')
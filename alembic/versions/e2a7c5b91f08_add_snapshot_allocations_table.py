@@ -0,0 +1,62 @@
+"""Add snapshot_allocations table and backfill it from assets/weights
+
+Revision ID: e2a7c5b91f08
+Revises: 5b8e0f3c7d21
+Create Date: 2026-10-19 16:20:05.913847
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a7c5b91f08'
+down_revision: Union[str, None] = '5b8e0f3c7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Split both lists the way PortfolioSnapshot.sync_allocations does (trim,
+# drop blanks) and pair them by position. Snapshots whose lists differ in
+# length or hold a non-numeric weight get no rows, which the backtest
+# reports as missing data, as it already did for them.
+BACKFILL_SQL = r"""
+WITH parsed AS (
+    SELECT s.id,
+           array_remove(ARRAY(SELECT upper(btrim(a)) FROM unnest(string_to_array(s.assets, ',')) AS a), '') AS assets,
+           array_remove(ARRAY(SELECT btrim(w) FROM unnest(string_to_array(s.weights, ',')) AS w), '') AS weights
+    FROM portfolio_snapshots s
+), valid AS (
+    SELECT * FROM parsed
+    WHERE cardinality(assets) = cardinality(weights)
+      AND NOT EXISTS (
+          SELECT 1 FROM unnest(weights) AS w
+          WHERE w !~ '^[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$'
+      )
+)
+INSERT INTO snapshot_allocations (snapshot_id, position, symbol, weight)
+SELECT v.id, pair.ord - 1, pair.symbol, pair.weight::double precision
+FROM valid v
+CROSS JOIN LATERAL unnest(v.assets, v.weights) WITH ORDINALITY AS pair(symbol, weight, ord)
+"""
+
+def upgrade():
+    """Create snapshot_allocations and fill it from the comma-separated columns"""
+    op.create_table('snapshot_allocations',
+        sa.Column('snapshot_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('symbol', sa.String(), nullable=False),
+        sa.Column('weight', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['snapshot_id'], ['portfolio_snapshots.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('snapshot_id', 'position')
+    )
+    op.create_index('ix_snapshot_allocations_symbol_snapshot', 'snapshot_allocations', ['symbol', 'snapshot_id'], unique=False)
+    op.create_index('ix_portfolio_snapshots_portfolio_date', 'portfolio_snapshots', ['portfolio_id', 'snapshot_date'], unique=False)
+    op.execute(BACKFILL_SQL)
+
+def downgrade():
+    """Drop snapshot_allocations; the comma-separated columns still hold the data"""
+    op.drop_index('ix_portfolio_snapshots_portfolio_date', table_name='portfolio_snapshots')
+    op.drop_index('ix_snapshot_allocations_symbol_snapshot', table_name='snapshot_allocations')
+    op.drop_table('snapshot_allocations')
@@ -12,6 +12,11 @@ from collections import defaultdict
 from app.services.price_fetching_service import PostgreSQLOptimizedPriceFetchingService
 from app.database.connection import get_db
 from app.models.asset_price import AssetPrice
+from app.services.price_panel_service import PricePanelService
+from app.services.latest_price_service import LatestPriceService
+from app.services.holdings_valuation_service import HoldingsValuationService
+from app.services.snapshot_allocation_service import SnapshotAllocationService
+from app.jobs.nightly_recalculation import run_nightly_recalculation
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -55,6 +60,7 @@ class DailyPriceUpdateService(PostgreSQLOptimizedPriceFetchingService):
             if new_records:
                 # Only insert truly new records
                 db.bulk_insert_mappings(AssetPrice, new_records)
+                LatestPriceService.refresh_symbols(db, [symbol])
                 db.commit()
                 logger.info(f"  ✅ {symbol}: stored {len(new_records)} new records")
                 return len(new_records)
@@ -81,14 +87,17 @@ class DailyPriceUpdateService(PostgreSQLOptimizedPriceFetchingService):
             logger.info(f"📅 {target_date} is a weekend - no market data expected")
             return
         
-        # Get all symbols from universe service
-        all_symbols = self.universe_service.get_all_symbols_to_track()
-        logger.info(f"🎯 Processing {len(all_symbols)} symbols")
-        
         # Get database session
         db_gen = get_db()
         db = next(db_gen)
         
+        # Universe symbols plus anything a portfolio snapshot allocates to
+        all_symbols = sorted(
+            set(self.universe_service.get_all_symbols_to_track())
+            | set(SnapshotAllocationService.get_required_symbols(db))
+        )
+        logger.info(f"🎯 Processing {len(all_symbols)} symbols")
+        
         try:
             total_fetched = 0
             total_stored = 0
@@ -119,6 +128,12 @@ class DailyPriceUpdateService(PostgreSQLOptimizedPriceFetchingService):
                     error_count += 1
                     continue
             
+            # Extend the forward-filled panel by the new trading day; symbols
+            # without a print today are carried forward here, once
+            PricePanelService.refresh_symbols(db, all_symbols, start_date=date_obj.date())
+            # Every holding's current price and every holdings portfolio's totals, set-based
+            HoldingsValuationService.refresh_current_prices(db)
+            
             logger.info(f"\n🎉 Daily update complete for {target_date}!")
             logger.info(f"  🎯 Total symbols attempted: {len(all_symbols)}")
             logger.info(f"  ✅ Successful updates: {success_count}")
@@ -150,6 +165,14 @@ def daily_eod_update():
         logger.error(f"❌ Daily update failed: {e}")
         raise
 
+def eod_pipeline():
+    """Price update, then recalculate every portfolio against the new prices"""
+    daily_eod_update()
+    try:
+        run_nightly_recalculation()
+    except Exception as e:
+        logger.error(f"❌ Nightly recalculation failed: {e}")
+
 def test_update():
     """Test function for manual testing"""
     logger.info("🧪 Running test update...")
@@ -161,12 +184,13 @@ def test_update_specific_date(target_date: str):
     service = DailyPriceUpdateService()
     service.run_daily_update(target_date)
 
-# Schedule for 6:30 PM EST (after markets close) - weekdays only
-schedule.every().monday.at("18:30").do(daily_eod_update)
-schedule.every().tuesday.at("18:30").do(daily_eod_update)
-schedule.every().wednesday.at("18:30").do(daily_eod_update)
-schedule.every().thursday.at("18:30").do(daily_eod_update)
-schedule.every().friday.at("18:30").do(daily_eod_update)
+# Schedule for 6:30 PM EST (after markets close) - weekdays only;
+# portfolio recalculation runs as soon as the price update finishes
+schedule.every().monday.at("18:30").do(eod_pipeline)
+schedule.every().tuesday.at("18:30").do(eod_pipeline)
+schedule.every().wednesday.at("18:30").do(eod_pipeline)
+schedule.every().thursday.at("18:30").do(eod_pipeline)
+schedule.every().friday.at("18:30").do(eod_pipeline)
 
 if __name__ == "__main__":
     logger.info("📅 Daily price update scheduler started...")
@@ -0,0 +1,459 @@
+# app/jobs/nightly_recalculation.py
+import sys
+import os
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import time
+import logging
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import update
+from dotenv import load_dotenv
+
+from app.database.connection import SessionLocal
+from app.models.historical_performance import HistoricalPerformance
+from app.models.portfolio import Portfolio
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.snapshot_allocation import SnapshotAllocation
+from app.services.backtest_checkpoint_service import BacktestCheckpointService
+from app.services.backtest_engine import AllocationSchedule, EngineMode, run_backtest
+from app.services.backtest_service import BacktestService
+from app.services.benchmark_service import BenchmarkService
+from app.services.holdings_valuation_service import HoldingsValuationService
+from app.services.latest_price_service import LatestPriceService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.performance_service import PerformanceService
+from app.services.period_returns import PERIOD_MONTHS, months_before
+from app.services.period_returns_service import PeriodReturnsService
+from app.services.price_lookup import DEFAULT_MAX_GAP_DAYS, align_to_calendar, to_day_array
+from app.services.price_panel_service import PANEL_MAX_STALENESS_DAYS, PricePanelService, PriceMatrix
+from app.services.risk_metrics import BENCHMARK_SYMBOL, RiskState
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NIGHTLY_WORKERS = int(os.getenv("NIGHTLY_RECALCULATION_WORKERS", str(os.cpu_count() or 2)))
+# Portfolios per task sent to a worker; large enough to amortize pickling
+BATCH_SIZE = 200
+# Portfolios extended per read-compute-write round; each round is a handful of queries
+EXTEND_BATCH_SIZE = 1000
+
+# Set once per worker process by _init_worker so tasks do not ship the matrix
+_worker_prices: Optional[PriceMatrix] = None
+_worker_benchmark: Optional[np.ndarray] = None
+
+
+def _init_worker(dates: np.ndarray, symbols: List[str], values: np.ndarray):
+    global _worker_prices, _worker_benchmark
+    _worker_prices = PriceMatrix(dates, symbols, values)
+    # Forward-filled like BenchmarkService.load_aligned, so a day SPY did not
+    # trade on carries its last close instead of a NaN
+    closes = _worker_prices.column(BENCHMARK_SYMBOL)
+    priced = ~np.isnan(closes)
+    _worker_benchmark, _ = align_to_calendar(dates, dates[priced], closes[priced], PANEL_MAX_STALENESS_DAYS)
+
+
+def _benchmark_returns(closes: np.ndarray) -> np.ndarray:
+    """Return in % since the first known close of a curve's benchmark window (NaN before it)"""
+    known = np.flatnonzero(~np.isnan(closes))
+    if not len(known):
+        return np.full(len(closes), np.nan)
+    return (closes / closes[known[0]] - 1.0) * 100
+
+
+def _portfolio_row(portfolio_id: int, value: float, cost_basis: float, daily_amount: float,
+                   daily_percentage: float, risk: RiskState) -> dict:
+    """Portfolio totals and risk metrics for the bulk update"""
+    metrics = risk.metrics()
+    return {
+        "id": portfolio_id,
+        "total_value": value,
+        "total_cost_basis": cost_basis,
+        "total_return_amount": value - cost_basis,
+        "total_return_percentage": (value - cost_basis) / cost_basis * 100,
+        "daily_return_amount": daily_amount,
+        "daily_return_percentage": daily_percentage,
+        "volatility": metrics.volatility,
+        "sharpe_ratio": metrics.sharpe_ratio,
+        "sortino_ratio": metrics.sortino_ratio,
+        "max_drawdown": metrics.max_drawdown,
+        "beta": metrics.beta,
+        "risk_state": risk.to_dict(),
+    }
+
+
+def _simulate_batch(batch: List[tuple]) -> List[dict]:
+    """Run the engine for a batch of (portfolio_id, starting_value, snapshot_ids, entries, prefix_hashes)"""
+    prices = _worker_prices
+    outcomes = []
+    for portfolio_id, starting_value, snapshot_ids, entries, hashes in batch:
+        try:
+            schedule = AllocationSchedule.from_allocations(entries)
+            result = run_backtest(schedule, prices.dates, prices.symbols, prices.values, starting_value,
+                                  mode=EngineMode.SEGMENTED)
+            if not len(result.values):
+                outcomes.append({"portfolio_id": portfolio_id, "error": "no executable rebalances"})
+                continue
+
+            daily_amount, daily_percentage = result.daily_change()
+            # The curve covers the last len(values) rows of the matrix
+            benchmark = _worker_benchmark[len(prices.dates) - len(result.values):]
+            risk = RiskState.from_curve(result.values, benchmark)
+            outcomes.append({
+                "portfolio_id": portfolio_id,
+                "portfolio": _portfolio_row(portfolio_id, result.final_value, result.starting_value,
+                                            daily_amount, daily_percentage, risk),
+                "snapshots": [
+                    {"id": snapshot_ids[i], "total_value": value}
+                    for i, value in zip(result.source_index.tolist(), result.rebalance_values.tolist())
+                ],
+                # The whole curve, so it always matches the metrics above. Kept
+                # as arrays; rows are built one portfolio at a time when written
+                "curve": {
+                    "dates": result.dates,
+                    "values": result.values,
+                    "cost_basis": result.starting_value,
+                    "sp500_returns": _benchmark_returns(benchmark),
+                },
+                "checkpoints": BacktestCheckpointService.build_rows(portfolio_id, hashes, result),
+                "period_returns": PeriodReturnsService.build_row(portfolio_id, result.dates, result.values),
+            })
+        except Exception as e:
+            outcomes.append({"portfolio_id": portfolio_id, "error": str(e)})
+    return outcomes
+
+
+def load_work(db) -> Tuple[Dict[int, tuple], List[int]]:
+    """
+    Engine inputs of every portfolio with snapshots, keyed by id, and the
+    ids of those whose stored curve and last checkpoint still match their
+    snapshots, which only need the new day.
+    """
+    starting_values = {
+        row.id: BacktestService.starting_value(row)
+        for row in db.query(Portfolio.id, Portfolio.total_cost_basis).all()
+    }
+    snapshots = db.query(
+        PortfolioSnapshot.id,
+        PortfolioSnapshot.portfolio_id,
+        PortfolioSnapshot.snapshot_date,
+        PortfolioSnapshot.assets,
+        PortfolioSnapshot.weights
+    ).order_by(PortfolioSnapshot.portfolio_id, PortfolioSnapshot.snapshot_date).all()
+    allocations = defaultdict(lambda: ([], []))
+    for row in db.query(
+        SnapshotAllocation.snapshot_id, SnapshotAllocation.symbol, SnapshotAllocation.weight
+    ).order_by(SnapshotAllocation.snapshot_id, SnapshotAllocation.position).all():
+        assets, weights = allocations[row.snapshot_id]
+        assets.append(row.symbol)
+        weights.append(row.weight)
+
+    grouped = defaultdict(list)
+    for snapshot in snapshots:
+        grouped[snapshot.portfolio_id].append(snapshot)
+    checkpoints = BacktestCheckpointService.get_latest(db)
+    with_curve = {row[0] for row in db.query(HistoricalPerformance.portfolio_id).distinct()}
+
+    work = {}
+    extendable = []
+    for portfolio_id, items in grouped.items():
+        starting_value = starting_values[portfolio_id]
+        hashes = BacktestCheckpointService.prefix_hashes(items, starting_value)
+        if portfolio_id in with_curve and checkpoints.get(portfolio_id) == (len(items) - 1, hashes[-1]):
+            extendable.append(portfolio_id)
+        entries = [(snapshot.snapshot_date,) + allocations.get(snapshot.id, ([], [])) for snapshot in items]
+        work[portfolio_id] = (portfolio_id, starting_value, [snapshot.id for snapshot in items], entries, hashes)
+    return work, extendable
+
+
+def price_range(work: List[tuple]) -> Tuple[List[str], datetime]:
+    """Symbol union and earliest snapshot date of the portfolios to replay"""
+    symbols = {symbol for item in work for _, assets, _ in item[3] for symbol in assets}
+    return sorted(symbols), min(item[3][0][0] for item in work)
+
+
+def extend_batch(db, portfolio_ids: List[int]) -> Tuple[List[dict], List[int]]:
+    """
+    Append the new trading day to unchanged curves: each portfolio's last
+    checkpoint holdings valued at the latest quotes, with every input read
+    once for the whole batch. Returns (outcomes, ids to replay): curves
+    more than one trading day behind, or without a running risk state,
+    go to the full replay. Portfolios already current are in neither.
+    """
+    portfolios = {
+        row.id: row for row in db.query(Portfolio.id, Portfolio.total_cost_basis, Portfolio.risk_state).filter(
+            Portfolio.id.in_(portfolio_ids)
+        )
+    }
+    checkpoints = BacktestCheckpointService.get_last_many(db, portfolio_ids)
+    recent = PerformanceService.get_recent_many(db, portfolio_ids)
+    held = {
+        portfolio_id: {symbol: position for symbol, position in checkpoint.holdings.items() if position[0]}
+        for portfolio_id, checkpoint in checkpoints.items()
+    }
+    quotes = LatestPriceService.get_latest_prices(
+        db, sorted({symbol for positions in held.values() for symbol in positions}) + [BENCHMARK_SYMBOL]
+    )
+
+    stale = []
+    extending = []
+    new_days = []
+    # Flat (portfolio position, shares, close) triples, so values are one bincount
+    owners, shares, closes = [], [], []
+    for portfolio_id in portfolio_ids:
+        if portfolio_id not in checkpoints or not recent.get(portfolio_id) or \
+                not portfolios[portfolio_id].risk_state:
+            stale.append(portfolio_id)
+            continue
+        quote_days = [quotes[symbol].date for symbol in held[portfolio_id] if symbol in quotes]
+        if not quote_days:
+            continue
+        latest_day, last_day = max(quote_days), recent[portfolio_id][-1].date
+        if latest_day <= last_day:
+            continue
+        if np.busday_count(last_day, latest_day) > 1:
+            stale.append(portfolio_id)
+            continue
+        position = len(extending)
+        extending.append(portfolio_id)
+        new_days.append(latest_day)
+        # Symbols without a quote keep their last close, as in the engine
+        for symbol, (held_shares, last_close) in held[portfolio_id].items():
+            owners.append(position)
+            shares.append(held_shares)
+            closes.append(quotes[symbol].adjusted_close if symbol in quotes else last_close)
+    if not extending:
+        return [], stale
+
+    cash = np.array([checkpoints[portfolio_id].cash for portfolio_id in extending], dtype=np.float64)
+    values = cash + np.bincount(np.array(owners, dtype=np.int64),
+                                weights=np.array(shares, dtype=np.float64) * np.array(closes, dtype=np.float64),
+                                minlength=len(extending))
+
+    # sp500_return is measured from each curve's first day, as store_curve does
+    first = PerformanceService.get_first_many(db, extending)
+    inception_days = to_day_array([first[portfolio_id].date for portfolio_id in extending])
+    latest_days = to_day_array(new_days)
+    calendar = np.unique(np.concatenate((inception_days, latest_days)))
+    benchmark = BenchmarkService.load_aligned(db, [BENCHMARK_SYMBOL], calendar)[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sp500_returns = (benchmark[np.searchsorted(calendar, latest_days)] /
+                         benchmark[np.searchsorted(calendar, inception_days)] - 1.0) * 100
+
+    # Period returns only need the curve at each period's anchor date
+    anchor_ids, anchor_days = [], []
+    for portfolio_id, latest_day in zip(extending, new_days):
+        anchors = [months_before(latest_day, months) for months in PERIOD_MONTHS.values()]
+        anchors.append(date(latest_day.year - 1, 12, 31))
+        anchor_ids.extend([portfolio_id] * len(anchors))
+        anchor_days.extend(anchors)
+    points = defaultdict(dict)
+    for row in PerformanceService.get_as_of_many(db, anchor_ids, anchor_days):
+        points[row.portfolio_id][row.date] = row.total_value
+
+    spy = quotes.get(BENCHMARK_SYMBOL)
+    outcomes = []
+    for k, portfolio_id in enumerate(extending):
+        value, latest_day = float(values[k]), new_days[k]
+        starting_value = BacktestService.starting_value(portfolios[portfolio_id])
+        curve = {
+            "dates": [latest_day],
+            "values": [value],
+            "cost_basis": starting_value,
+            "history": [row.total_value for row in recent[portfolio_id]],
+            "sp500_returns": sp500_returns[k:k + 1],
+        }
+        row = PerformanceService.build_rows(portfolio_id, **curve)[0]
+        risk = RiskState.from_dict(portfolios[portfolio_id].risk_state)
+        risk.update(value, spy.adjusted_close if spy and spy.date == latest_day else None)
+
+        # A sparse curve holding the as-of point of every anchor gives the same returns as the full one
+        curve_points = dict(points[portfolio_id])
+        curve_points.update((row.date, row.total_value) for row in recent[portfolio_id])
+        curve_points[latest_day] = value
+        point_days = sorted(curve_points)
+        outcomes.append({
+            "portfolio_id": portfolio_id,
+            "appended": True,
+            "portfolio": _portfolio_row(portfolio_id, value, starting_value, row["daily_return_amount"],
+                                        row["daily_return_percentage"], risk),
+            "snapshots": [],
+            "curve": curve,
+            "checkpoints": [],
+            "period_returns": PeriodReturnsService.build_row(
+                portfolio_id, point_days, np.array([curve_points[day] for day in point_days]),
+                first[portfolio_id].total_value
+            ),
+        })
+    return outcomes, stale
+
+
+def write_results(db, outcomes: List[dict]):
+    """
+    Bulk write one batch's portfolio totals, snapshot values, curves,
+    checkpoints and period returns, and commit. Replayed curves replace
+    the stored ones; appended days are upserted onto them.
+    """
+    now = datetime.now()
+    replaced = [outcome["portfolio_id"] for outcome in outcomes if not outcome.get("appended")]
+    portfolio_rows = [dict(outcome["portfolio"], last_calculated=now) for outcome in outcomes]
+    snapshot_rows = [row for outcome in outcomes for row in outcome["snapshots"]]
+    checkpoint_rows = [row for outcome in outcomes for row in outcome["checkpoints"]]
+
+    if portfolio_rows:
+        db.execute(update(Portfolio), portfolio_rows)
+    if snapshot_rows:
+        db.execute(update(PortfolioSnapshot), snapshot_rows)
+    PerformanceService.delete_curves(db, replaced)
+    for outcome in outcomes:
+        PerformanceService.upsert_rows(db, PerformanceService.build_rows(outcome["portfolio_id"], **outcome["curve"]))
+    BacktestCheckpointService.replace_all(db, replaced, checkpoint_rows)
+    PeriodReturnsService.upsert_rows(db, [outcome["period_returns"] for outcome in outcomes])
+    db.commit()
+
+
+def write_batch(db, outcomes: List[dict]) -> Tuple[int, int]:
+    """
+    Write one batch's successful outcomes in their own transaction, so a
+    bad row costs that batch only. Returns (written, failed).
+    """
+    succeeded = []
+    for outcome in outcomes:
+        if "error" in outcome:
+            logger.warning(f"  ⚠️ Portfolio {outcome['portfolio_id']}: {outcome['error']}")
+        else:
+            succeeded.append(outcome)
+    if not succeeded:
+        return 0, len(outcomes)
+    try:
+        write_results(db, succeeded)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"  ❌ Could not write a batch of {len(succeeded)} portfolios "
+                     f"({succeeded[0]['portfolio_id']}..{succeeded[-1]['portfolio_id']}): {e}")
+        return 0, len(outcomes)
+    return len(succeeded), len(outcomes) - len(succeeded)
+
+
+def run_nightly_recalculation(workers: int = NIGHTLY_WORKERS) -> Dict[str, float]:
+    """
+    Extend portfolios whose history is unchanged by the new day in bulk,
+    then replay the rest (changed, never stored, or fallen behind) from one
+    shared price matrix; returns throughput stats
+    """
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        work, extendable = load_work(db)
+        if not work:
+            logger.info("📭 No portfolios with snapshots to recalculate")
+            return {"portfolios": 0}
+        loaded = time.perf_counter()
+
+        # Unchanged histories only need the new day, valued from their last checkpoint
+        extended = current = failed = 0
+        behind = []
+        write_seconds = 0.0
+        for i in range(0, len(extendable), EXTEND_BATCH_SIZE):
+            chunk = extendable[i:i + EXTEND_BATCH_SIZE]
+            try:
+                outcomes, stale = extend_batch(db, chunk)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"  ❌ Could not extend a batch of {len(chunk)} portfolios, replaying them: {e}")
+                behind.extend(chunk)
+                continue
+            behind.extend(stale)
+            current += len(chunk) - len(outcomes) - len(stale)
+            write_started = time.perf_counter()
+            written, not_written = write_batch(db, outcomes)
+            write_seconds += time.perf_counter() - write_started
+            extended += written
+            failed += not_written
+        extended_at = time.perf_counter()
+
+        # Extendable portfolios that did not fall behind are done (or failed to write)
+        settled = set(extendable) - set(behind)
+        replay = [item for portfolio_id, item in work.items() if portfolio_id not in settled]
+        succeeded = 0
+        simulated = extended_at
+        if replay:
+            symbols, first_date = price_range(replay)
+            start_date = first_date.date() - timedelta(days=DEFAULT_MAX_GAP_DAYS)
+            prices = PricePanelService.load_matrix(db, symbols + [BENCHMARK_SYMBOL], start_date, datetime.now().date())
+            logger.info(
+                f"📦 Loaded {len(replay)} portfolios to replay ({len(behind)} fell behind) and a "
+                f"{prices.values.shape[0]}x{prices.values.shape[1]} price matrix "
+                f"in {time.perf_counter() - extended_at:.1f}s"
+            )
+
+            batches = [replay[i:i + BATCH_SIZE] for i in range(0, len(replay), BATCH_SIZE)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(prices.dates, prices.symbols, prices.values)) as pool:
+                # Each batch is written as it completes and then dropped, so
+                # memory holds a few batches' curves rather than the night's
+                pending = {pool.submit(_simulate_batch, batch): len(batch) for batch in batches}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        size = pending.pop(future)
+                        try:
+                            outcomes = future.result()
+                        except Exception as e:
+                            logger.error(f"  ❌ A batch of {size} portfolios failed to simulate: {e}")
+                            failed += size
+                            continue
+                        write_started = time.perf_counter()
+                        written, not_written = write_batch(db, outcomes)
+                        write_seconds += time.perf_counter() - write_started
+                        succeeded += written
+                        failed += not_written
+            simulated = time.perf_counter()
+
+        HoldingsValuationService.recalculate_all(db)
+        # Period returns and Sharpe ratios just moved, so re-rank in the same run
+        LeaderboardService.refresh_all(db)
+        finished = time.perf_counter()
+
+        stats = {
+            "portfolios": len(work),
+            "replayed": len(replay),
+            "succeeded": succeeded,
+            "extended": extended,
+            "current": current,
+            "failed": failed,
+            "load_seconds": loaded - started,
+            "extend_seconds": extended_at - loaded,
+            "simulate_seconds": simulated - extended_at,
+            "write_seconds": write_seconds,
+            "total_seconds": finished - started,
+            "portfolios_per_second": len(work) / (finished - started),
+        }
+        logger.info(f"\n🎉 Nightly recalculation complete with {workers} workers!")
+        logger.info(f"  ✅ Replayed: {succeeded}/{len(replay)}, extended: {extended}/{len(extendable)}, "
+                    f"{current} already current, {failed} failed")
+        logger.info(f"  ⏱️  Load {stats['load_seconds']:.1f}s, extend {stats['extend_seconds']:.1f}s, "
+                    f"replay {stats['simulate_seconds']:.1f}s "
+                    f"({len(replay) / max(stats['simulate_seconds'], 1e-9):,.0f} portfolios/sec), "
+                    f"of which writes {write_seconds:.1f}s")
+        logger.info(f"  📈 Throughput: {stats['portfolios_per_second']:,.0f} portfolios/sec end to end")
+        return stats
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Nightly recalculation failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_nightly_recalculation()
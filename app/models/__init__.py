@@ -1,6 +1,8 @@
 # Import all models so they are registered with SQLAlchemy
 from app.models.user import User
 from app.models.portfolio import Portfolio
+from app.models.portfolio_period_returns import PortfolioPeriodReturns
+from app.models.portfolio_leaderboard import PortfolioLeaderboard
 from app.models.holding import Holding, AssetType
 from app.models.historical_performance import HistoricalPerformance
 from app.models.follow import Follow
@@ -15,7 +17,13 @@ from app.models.feed_event import FeedEvent, EventType
 
 # Import new portfolio snapshot models
 from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.snapshot_allocation import SnapshotAllocation
+from app.models.portfolio_symbol import PortfolioSymbol
 from app.models.asset_price import AssetPrice
+from app.models.price_panel import PricePanel
+from app.models.latest_price import LatestPrice
+from app.models.backtest_checkpoint import BacktestCheckpoint
+from app.models.backtest_result_cache import BacktestResultCache
 
 # Import Base for migrations
 from app.database.connection import Base
@@ -23,6 +31,8 @@ from app.database.connection import Base
 __all__ = [
     "User",
     "Portfolio", 
+    "PortfolioPeriodReturns",
+    "PortfolioLeaderboard",
     "Holding",
     "AssetType",
     "HistoricalPerformance",
@@ -40,6 +50,12 @@ __all__ = [
     "FeedEvent",
     "EventType",
     "PortfolioSnapshot",
+    "SnapshotAllocation",
+    "PortfolioSymbol",
     "AssetPrice",
+    "PricePanel",
+    "LatestPrice",
+    "BacktestCheckpoint",
+    "BacktestResultCache",
     "Base"
 ]
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class BacktestCheckpoint(Base):
+    """Backtest engine state right after one rebalance, used to resume recalculations"""
+    __tablename__ = "backtest_checkpoints"
+    
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True)
+    # Position of the snapshot in the portfolio's date-ordered snapshot list
+    snapshot_index = Column(Integer, primary_key=True)
+    
+    # Chained hash of the starting value and every snapshot up to this one
+    prefix_hash = Column(String(40), nullable=False)
+    # Trading day the rebalance executed at
+    trade_date = Column(Date, nullable=False, index=True)
+    
+    # State after the rebalance
+    nav = Column(Float, nullable=False)
+    cash = Column(Float, nullable=False)
+    holdings = Column(JSON, nullable=False)  # {"SPY": [shares, last_close], ...}
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
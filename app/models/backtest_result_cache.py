@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class BacktestResultCache(Base):
+    """Serialized backtest output for one snapshot set, starting value and price watermark"""
+    __tablename__ = "backtest_result_cache"
+    
+    # sha256 over the version below and the starting value
+    cache_key = Column(String(64), primary_key=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Snapshot set and price watermarks without the starting value; a
+    # portfolio's entries with another version are outdated
+    version = Column(String(64), nullable=True)
+    
+    payload = Column(JSON, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
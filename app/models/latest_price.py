@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Float, Date, DateTime
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class LatestPrice(Base):
+    """Most recent price per symbol, maintained by the ingestion pipelines"""
+    __tablename__ = "latest_prices"
+    
+    symbol = Column(String, primary_key=True)
+    date = Column(Date, nullable=False)
+    
+    close_price = Column(Float, nullable=False)
+    adjusted_close = Column(Float, nullable=False)
+    
+    # Change versus the previous trading day (adjusted closes)
+    previous_close = Column(Float, nullable=True)
+    daily_change = Column(Float, nullable=True)
+    daily_change_percentage = Column(Float, nullable=True)
+    
+    # Moves on every write batch for the symbol, including corrections;
+    # indexed so "symbols changed since T" is a range read
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
+from app.models.portfolio_period_returns import PortfolioPeriodReturns
 
 class Portfolio(Base):
     __tablename__ = "portfolios"
@@ -29,6 +30,9 @@ class Portfolio(Base):
     volatility = Column(Float, nullable=True)
     sharpe_ratio = Column(Float, nullable=True)
     max_drawdown = Column(Float, nullable=True)
+    sortino_ratio = Column(Float, nullable=True)
+    beta = Column(Float, nullable=True)  # vs SPY
+    risk_state = Column(JSON, nullable=True)  # running aggregates for one-day updates
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -55,6 +59,14 @@ class Portfolio(Base):
     initial_balance = Column(Float, default=100000.0)  # Starting balance ($100K default)
     rebalancing_frequency = Column(String, default='flexible')  # flexible, monthly, quarterly
 
+    # Written in bulk by PeriodReturnsService; joined so list responses need no extra query
+    period_returns = relationship(
+        PortfolioPeriodReturns,
+        uselist=False,
+        lazy="joined",
+        viewonly=True
+    )
+
     # Relationships (we'll activate these after creating other models)
     # owner = relationship("User", back_populates="portfolios")
     # holdings = relationship("Holding", back_populates="portfolio", cascade="all, delete-orphan")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class PortfolioLeaderboard(Base):
+    """Rank of a public portfolio on one leaderboard; pages are read by rank range"""
+    __tablename__ = "portfolio_leaderboard"
+    
+    board = Column(String(20), primary_key=True)  # see LEADERBOARDS
+    rank = Column(Integer, primary_key=True)  # 1 = best
+    
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, index=True)
+    score = Column(Float, nullable=False)  # Period return in %, or Sharpe ratio
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
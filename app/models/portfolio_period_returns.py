@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class PortfolioPeriodReturns(Base):
+    """Trailing returns (in %) as of the last stored curve day, one row per portfolio"""
+    __tablename__ = "portfolio_period_returns"
+
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True)
+    as_of_date = Column(Date, nullable=False)
+
+    # None when the curve does not reach back far enough
+    return_1d = Column(Float, nullable=True)
+    return_1m = Column(Float, nullable=True)
+    return_3m = Column(Float, nullable=True)
+    return_ytd = Column(Float, nullable=True)
+    return_1y = Column(Float, nullable=True)
+    return_3y = Column(Float, nullable=True)
+    return_inception = Column(Float, nullable=True)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
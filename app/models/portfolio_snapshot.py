@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Index, event, inspect
+from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
+from app.models.snapshot_allocation import SnapshotAllocation
 
 class PortfolioSnapshot(Base):
     __tablename__ = "portfolio_snapshots"
@@ -11,6 +12,7 @@ class PortfolioSnapshot(Base):
     
     # Snapshot data
     snapshot_date = Column(DateTime(timezone=True), nullable=False)  # When this allocation was effective
+    # As entered, kept for the API; readers use allocations
     assets = Column(Text, nullable=False)  # Comma-separated: "AAPL,MSFT,TSLA"
     weights = Column(Text, nullable=False)  # Comma-separated: "50,30,20"
     
@@ -25,20 +27,63 @@ class PortfolioSnapshot(Base):
     # Relationships
     #portfolio = relationship("Portfolio", back_populates="snapshots")
     #created_by = relationship("User")
+    allocations = relationship(
+        SnapshotAllocation,
+        order_by=SnapshotAllocation.position,
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        lazy="selectin"
+    )
+    
+    __table_args__ = (
+        Index('ix_portfolio_snapshots_portfolio_date', 'portfolio_id', 'snapshot_date'),
+    )
+    
+    def sync_allocations(self):
+        """
+        Rebuild allocation rows from the assets/weights text. Runs on flush
+        whenever either changes; lists of different lengths or non-numeric
+        weights leave no rows, which the backtest reports as missing data.
+        """
+        assets = [asset.strip().upper() for asset in self.assets.split(',') if asset.strip()]
+        try:
+            weights = [float(weight.strip()) for weight in self.weights.split(',') if weight.strip()]
+        except ValueError:
+            weights = []
+        if len(assets) != len(weights):
+            assets, weights = [], []
+        self.allocations = [
+            SnapshotAllocation(position=i, symbol=asset, weight=weight)
+            for i, (asset, weight) in enumerate(zip(assets, weights))
+        ]
     
     @property
     def asset_list(self):
-        """Convert comma-separated assets to list"""
+        """Convert comma-separated assets to list, as entered"""
         return [asset.strip() for asset in self.assets.split(',') if asset.strip()]
     
+    @property
+    def symbol_list(self):
+        """Upper-cased tickers of the allocation rows, for price lookups"""
+        return [allocation.symbol for allocation in self.allocations]
+    
     @property
     def weight_list(self):
-        """Convert comma-separated weights to list of floats"""
-        return [float(weight.strip()) for weight in self.weights.split(',') if weight.strip()]
+        return [allocation.weight for allocation in self.allocations]
     
     @property
     def allocation_dict(self):
-        """Return dict of asset: weight pairs"""
+        """Return dict of asset: weight pairs, assets as entered"""
         assets = self.asset_list
         weights = self.weight_list
         return dict(zip(assets, weights)) if len(assets) == len(weights) else {}
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_snapshot_allocations(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, PortfolioSnapshot) or obj.assets is None or obj.weights is None:
+            continue
+        state = inspect(obj)
+        if state.pending or state.attrs.assets.history.has_changes() or state.attrs.weights.history.has_changes():
+            obj.sync_allocations()
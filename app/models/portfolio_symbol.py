@@ -0,0 +1,60 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, delete, event, func, inspect, select, union
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.database.connection import Base
+from app.models.holding import Holding
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.snapshot_allocation import SnapshotAllocation
+
+class PortfolioSymbol(Base):
+    """
+    A symbol some snapshot (current or past) or holding of a portfolio
+    references, so "which portfolios does a price change touch" is one
+    primary-key range read. Kept in step by the flush hook below.
+    """
+    __tablename__ = "portfolio_symbols"
+
+    symbol = Column(String, primary_key=True)  # Upper-cased ticker, unbounded like its sources
+    portfolio_id = Column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+
+def referenced_symbols(portfolio_ids=None):
+    """Select of distinct (portfolio_id, symbol) from snapshot allocations and holdings"""
+    from_snapshots = select(PortfolioSnapshot.portfolio_id, SnapshotAllocation.symbol).join(
+        SnapshotAllocation, SnapshotAllocation.snapshot_id == PortfolioSnapshot.id
+    )
+    from_holdings = select(Holding.portfolio_id, func.upper(Holding.symbol))
+    if portfolio_ids is not None:
+        from_snapshots = from_snapshots.where(PortfolioSnapshot.portfolio_id.in_(portfolio_ids))
+        from_holdings = from_holdings.where(Holding.portfolio_id.in_(portfolio_ids))
+    return union(from_snapshots, from_holdings)
+
+
+def refresh_portfolio_symbols(connection, portfolio_ids):
+    """Rewrite the index rows of the given portfolios from their snapshots and holdings"""
+    table = PortfolioSymbol.__table__
+    connection.execute(delete(table).where(table.c.portfolio_id.in_(portfolio_ids)))
+    connection.execute(insert(table).from_select(
+        ["portfolio_id", "symbol"], referenced_symbols(portfolio_ids)
+    ).on_conflict_do_nothing())
+
+
+# Attributes whose change can alter the symbols a row contributes
+_INDEXED_ATTRIBUTES = {PortfolioSnapshot: ("portfolio_id", "assets", "weights"), Holding: ("portfolio_id", "symbol")}
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_portfolio_symbols(session, flush_context):
+    portfolio_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        attributes = _INDEXED_ATTRIBUTES.get(type(obj))
+        if attributes is None:
+            continue
+        state = inspect(obj)
+        if obj in session.dirty and not any(state.attrs[name].history.has_changes() for name in attributes):
+            continue
+        portfolio_ids.add(obj.portfolio_id)
+        # A row moved between portfolios leaves its old one too
+        portfolio_ids.update(value for value in state.attrs.portfolio_id.history.deleted if value is not None)
+    if portfolio_ids:
+        refresh_portfolio_symbols(session.connection(), sorted(portfolio_ids))
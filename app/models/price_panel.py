@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Float, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class PricePanel(Base):
+    """Adjusted closes aligned to the trading calendar and forward-filled at ingest time"""
+    __tablename__ = "price_panel"
+    
+    symbol = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    
+    # Forward-filled adjusted close for this trading day
+    adjusted_close = Column(Float, nullable=False)
+    # Date of the asset_prices row the value came from (== date when not filled)
+    source_date = Column(Date, nullable=False)
+    
+    # Metadata
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('idx_price_panel_date_symbol', 'date', 'symbol'),
+    )
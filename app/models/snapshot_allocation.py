@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from app.database.connection import Base
+
+class SnapshotAllocation(Base):
+    """One asset and its target weight within a portfolio snapshot"""
+    __tablename__ = "snapshot_allocations"
+    
+    snapshot_id = Column(Integer, ForeignKey("portfolio_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    # Order the asset was entered in, so lists round-trip unchanged
+    position = Column(Integer, primary_key=True)
+    
+    symbol = Column(String, nullable=False)  # Upper-cased ticker, unbounded like assets
+    weight = Column(Float, nullable=False)  # Percent, e.g. 50.0
+    
+    __table_args__ = (
+        # "Which snapshots hold X" without touching the snapshots table
+        Index('ix_snapshot_allocations_symbol_snapshot', 'symbol', 'snapshot_id'),
+    )
@@ -0,0 +1,135 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, text
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import date
+
+import numpy as np
+
+from app.models.asset_price import AssetPrice
+
+# Core table handle: selecting its columns returns plain rows, skipping the
+# ORM identity map and the unused id/created_at columns entirely
+asset_prices = AssetPrice.__table__
+
+PRICE_COLUMNS = (
+    asset_prices.c.symbol,
+    asset_prices.c.date,
+    asset_prices.c.open_price,
+    asset_prices.c.high_price,
+    asset_prices.c.low_price,
+    asset_prices.c.close_price,
+    asset_prices.c.adjusted_close,
+    asset_prices.c.volume,
+)
+
+# Latest close on or before each (symbol, as-of date) within max_gap_days.
+# Each LATERAL probe is a single backwards scan of the (symbol, date) index.
+AS_OF_CLOSES_SQL = text("""
+    SELECT s.symbol, d.as_of, p.date, p.adjusted_close
+    FROM unnest(CAST(:symbols AS text[])) AS s(symbol)
+    CROSS JOIN unnest(CAST(:as_of_dates AS date[])) AS d(as_of)
+    JOIN LATERAL (
+        SELECT a.date, a.adjusted_close
+        FROM asset_prices a
+        WHERE a.symbol = s.symbol
+          AND a.date <= d.as_of
+          AND a.date >= d.as_of - CAST(:max_gap_days AS integer)
+        ORDER BY a.date DESC
+        LIMIT 1
+    ) p ON true
+    ORDER BY d.as_of, s.symbol
+""")
+
+
+class PriceRepository:
+    """Column-selected Core reads over asset_prices"""
+
+    @staticmethod
+    def _date_range(stmt, start_date, end_date):
+        if start_date:
+            stmt = stmt.where(asset_prices.c.date >= start_date)
+        if end_date:
+            stmt = stmt.where(asset_prices.c.date <= end_date)
+        return stmt
+
+    @staticmethod
+    def fetch_price_rows(db: Session, symbols: List[str], start_date: Optional[str] = None,
+                         end_date: Optional[str] = None) -> list:
+        """OHLCV rows ordered by symbol then date, as lightweight Row tuples"""
+        stmt = select(*PRICE_COLUMNS).where(asset_prices.c.symbol.in_(symbols))
+        stmt = PriceRepository._date_range(stmt, start_date, end_date)
+        stmt = stmt.order_by(asset_prices.c.symbol, asset_prices.c.date)
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def fetch_adjusted_closes(db: Session, symbol: str, start_date: Optional[date] = None,
+                              end_date: Optional[date] = None) -> List[Tuple[date, float]]:
+        """(date, adjusted_close) tuples for one symbol in date order"""
+        stmt = select(asset_prices.c.date, asset_prices.c.adjusted_close).where(
+            asset_prices.c.symbol == symbol
+        )
+        stmt = PriceRepository._date_range(stmt, start_date, end_date)
+        stmt = stmt.order_by(asset_prices.c.date)
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def fetch_adjusted_closes_for_symbols(db: Session, symbols: List[str], start_date: Optional[date] = None,
+                                          end_date: Optional[date] = None) -> list:
+        """(symbol, date, adjusted_close) rows for many symbols in one query, ordered by symbol then date"""
+        stmt = select(asset_prices.c.symbol, asset_prices.c.date, asset_prices.c.adjusted_close).where(
+            asset_prices.c.symbol.in_(symbols)
+        )
+        stmt = PriceRepository._date_range(stmt, start_date, end_date)
+        stmt = stmt.order_by(asset_prices.c.symbol, asset_prices.c.date)
+        return db.execute(stmt).all()
+
+    @staticmethod
+    def fetch_adjusted_close_arrays_by_symbol(db: Session, symbols: List[str], start_date: Optional[date] = None,
+                                              end_date: Optional[date] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Dates and adjusted closes per symbol from a single round trip; unpriced symbols are absent"""
+        if not symbols:
+            return {}
+        rows = PriceRepository.fetch_adjusted_closes_for_symbols(db, symbols, start_date, end_date)
+        return PriceRepository.split_rows_by_symbol(rows)
+
+    @staticmethod
+    def fetch_as_of_closes(db: Session, symbols: List[str], as_of_dates: Sequence[date],
+                           max_gap_days: int) -> list:
+        """
+        (symbol, as_of, date, adjusted_close) rows: the last close on or before
+        each as-of date, no more than max_gap_days old. Pairs with no such
+        close are omitted. PostgreSQL only.
+        """
+        if not symbols or not len(as_of_dates):
+            return []
+        return db.execute(AS_OF_CLOSES_SQL, {
+            "symbols": list(symbols),
+            "as_of_dates": list(as_of_dates),
+            "max_gap_days": int(max_gap_days),
+        }).all()
+
+    @staticmethod
+    def fetch_adjusted_close_arrays(db: Session, symbol: str, start_date: Optional[date] = None,
+                                    end_date: Optional[date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Dates (datetime64[D]) and adjusted closes (float64) for one symbol"""
+        rows = PriceRepository.fetch_adjusted_closes(db, symbol, start_date, end_date)
+        return PriceRepository.rows_to_arrays(rows)
+
+    @staticmethod
+    def rows_to_arrays(rows) -> Tuple[np.ndarray, np.ndarray]:
+        """Split (date, price) rows into parallel NumPy arrays"""
+        dates = np.array([row[0] for row in rows], dtype="datetime64[D]")
+        prices = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        return dates, prices
+
+    @staticmethod
+    def split_rows_by_symbol(rows) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Split (symbol, date, price) rows sorted by symbol into per-symbol arrays"""
+        if not rows:
+            return {}
+        dates = np.array([row[1] for row in rows], dtype="datetime64[D]")
+        prices = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+        row_symbols = [row[0] for row in rows]
+        starts = [0] + [i for i in range(1, len(rows)) if row_symbols[i] != row_symbols[i - 1]]
+        ends = starts[1:] + [len(rows)]
+        return {row_symbols[a]: (dates[a:b], prices[a:b]) for a, b in zip(starts, ends)}
@@ -1,34 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, date
 
 from app.database.connection import get_db
-from app.models.asset_price import AssetPrice
+from app.repositories.price_repository import PriceRepository
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user
+from app.services.etag_service import ETagService
+from app.services.price_watermark_service import PriceWatermarkService
 
 router = APIRouter(prefix="/asset-prices", tags=["Asset Prices"])
 
-@router.get("/{symbol}")
-async def get_asset_prices(
-    symbol: str,
+# Declared before "/{symbol}" so "bulk" is not captured as a symbol
+@router.get("/bulk")
+async def get_bulk_asset_prices(
+    request: Request,
+    response: Response,
+    symbols: str = Query(..., description="Comma-separated symbols"),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get historical price data for a symbol"""
-    
-    query = db.query(AssetPrice).filter(AssetPrice.symbol == symbol.upper())
-    
-    if start_date:
-        query = query.filter(AssetPrice.date >= start_date)
-    if end_date:
-        query = query.filter(AssetPrice.date <= end_date)
-    
-    prices = query.order_by(AssetPrice.date.asc()).all()
-    
+    """Get bulk historical price data for multiple symbols"""
+
+    symbol_list = [s.strip().upper() for s in symbols.split(',')]
+
+    # Answer revalidations from the watermark before loading any prices
+    watermarks = PriceWatermarkService.get_watermarks(db, symbol_list)
+    etag = ETagService.build_etag(
+        "bulk", start_date, end_date, *[watermarks[s].token for s in sorted(watermarks)]
+    )
+    last_modified = PriceWatermarkService.last_modified(watermarks)
+    if ETagService.is_not_modified(request, etag, last_modified):
+        return ETagService.not_modified_response(etag, last_modified)
+
+    prices = PriceRepository.fetch_price_rows(db, symbol_list, start_date, end_date)
+
+    ETagService.apply_headers(response, etag, last_modified)
     return [
         {
             "symbol": price.symbol,
@@ -43,27 +53,30 @@ async def get_asset_prices(
         for price in prices
     ]
 
-@router.get("/bulk")
-async def get_bulk_asset_prices(
-    symbols: str = Query(..., description="Comma-separated symbols"),
+@router.get("/{symbol}")
+async def get_asset_prices(
+    symbol: str,
+    request: Request,
+    response: Response,
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get bulk historical price data for multiple symbols"""
-    
-    symbol_list = [s.strip().upper() for s in symbols.split(',')]
-    
-    query = db.query(AssetPrice).filter(AssetPrice.symbol.in_(symbol_list))
-    
-    if start_date:
-        query = query.filter(AssetPrice.date >= start_date)
-    if end_date:
-        query = query.filter(AssetPrice.date <= end_date)
-    
-    prices = query.order_by(AssetPrice.symbol, AssetPrice.date.asc()).all()
-    
+    """Get historical price data for a symbol"""
+
+    symbol = symbol.upper()
+
+    # Answer revalidations from the watermark before loading any prices
+    watermarks = PriceWatermarkService.get_watermarks(db, [symbol])
+    etag = ETagService.build_etag("series", start_date, end_date, watermarks[symbol].token)
+    last_modified = PriceWatermarkService.last_modified(watermarks)
+    if ETagService.is_not_modified(request, etag, last_modified):
+        return ETagService.not_modified_response(etag, last_modified)
+
+    prices = PriceRepository.fetch_price_rows(db, [symbol], start_date, end_date)
+
+    ETagService.apply_headers(response, etag, last_modified)
     return [
         {
             "symbol": price.symbol,
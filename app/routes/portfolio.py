@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import date
+
+import numpy as np
 
 from app.database.connection import get_db
 from app.models.user import User
 from app.schemas.portfolio import (
     PortfolioCreate, PortfolioUpdate, PortfolioResponse, PortfolioDetailResponse,
-    HoldingCreate, HoldingUpdate, HoldingResponse
+    HoldingCreate, HoldingUpdate, HoldingResponse, PerformanceResponse,
+    LeaderboardEntry, LeaderboardPage, BenchmarkComparisonResponse
 )
 from app.services.portfolio_service import PortfolioService
+from app.services.performance_service import PerformanceService
+from app.services.holdings_valuation_service import HoldingsValuationService
+from app.services.benchmark_service import BenchmarkService, DEFAULT_BENCHMARKS, MAX_BENCHMARKS
+from app.services.leaderboard_service import LeaderboardService, LEADERBOARDS
+from app.services.etag_service import ETagService, PRIVATE_CACHE_CONTROL
 from app.auth.dependencies import get_current_active_user
 
 router = APIRouter(prefix="/api/portfolios", tags=["Portfolios"])
@@ -49,10 +58,14 @@ async def get_my_portfolios(
 async def get_public_portfolios(
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    sort_by: str = Query("total_return_percentage",
+                         pattern="^(total_return_percentage|sharpe_ratio|sortino_ratio|volatility|max_drawdown)$"),
+    max_volatility: Optional[float] = Query(None, ge=0, description="Annualized volatility cap in %"),
+    holding: Optional[str] = Query(None, max_length=20, description="Only portfolios currently allocated to this symbol"),
     db: Session = Depends(get_db)
 ):
-    """Get public portfolios for discovery"""
-    portfolios = PortfolioService.get_public_portfolios(db, limit, offset)
+    """Get public portfolios for discovery, sortable by return or risk metrics"""
+    portfolios = PortfolioService.get_public_portfolios(db, limit, offset, sort_by, max_volatility, holding)
     
     response_portfolios = []
     for portfolio in portfolios:
@@ -66,6 +79,24 @@ async def get_public_portfolios(
     
     return response_portfolios
 
+@router.get("/leaderboard", response_model=LeaderboardPage)
+async def get_leaderboard(
+    board: str = Query("1y", pattern="^(" + "|".join(LEADERBOARDS) + ")$"),
+    limit: int = Query(20, ge=1, le=100),
+    after_rank: int = Query(0, ge=0, description="Last rank of the previous page"),
+    db: Session = Depends(get_db)
+):
+    """Public portfolios ranked by period return or Sharpe ratio, refreshed after each nightly recalculation"""
+    rows, next_after_rank = LeaderboardService.get_page(db, board, limit, after_rank)
+    
+    entries = []
+    for entry, portfolio, username in rows:
+        response_data = PortfolioResponse.from_orm(portfolio)
+        response_data.owner_username = username or "Unknown"
+        entries.append(LeaderboardEntry(rank=entry.rank, score=entry.score, portfolio=response_data))
+    
+    return LeaderboardPage(board=board, entries=entries, next_after_rank=next_after_rank)
+
 @router.get("/{portfolio_id}", response_model=PortfolioDetailResponse)
 async def get_portfolio_detail(
     portfolio_id: int,
@@ -87,10 +118,71 @@ async def get_portfolio_detail(
     response_data.owner_username = owner.username if owner else "Unknown"
     response_data.holdings_count = len(holdings)
     response_data.holdings = [HoldingResponse.from_orm(holding) for holding in holdings]
-    response_data.recent_performance = []  # We'll add this later
+    response_data.recent_performance = [
+        PerformanceResponse.from_orm(row) for row in PerformanceService.get_recent(db, portfolio_id)
+    ]
     
     return response_data
 
+@router.get("/{portfolio_id}/performance", response_model=List[PerformanceResponse])
+async def get_portfolio_performance(
+    portfolio_id: int,
+    request: Request,
+    response: Response,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user: Optional[User] = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the stored daily equity curve (written by calculate-values)"""
+    user_id = current_user.id if current_user else None
+    portfolio = PortfolioService.get_portfolio_by_id(db, portfolio_id, user_id)
+    
+    # The curve only changes when the portfolio is recalculated
+    etag = ETagService.build_etag("performance", portfolio_id, portfolio.last_calculated, start_date, end_date)
+    if ETagService.is_not_modified(request, etag, portfolio.last_calculated):
+        return ETagService.not_modified_response(etag, portfolio.last_calculated, PRIVATE_CACHE_CONTROL)
+    
+    rows = PerformanceService.get_curve(db, portfolio_id, start_date, end_date)
+    ETagService.apply_headers(response, etag, portfolio.last_calculated, PRIVATE_CACHE_CONTROL)
+    return [PerformanceResponse.from_orm(row) for row in rows]
+
+@router.get("/{portfolio_id}/benchmarks", response_model=List[BenchmarkComparisonResponse])
+async def compare_portfolio_to_benchmarks(
+    portfolio_id: int,
+    benchmarks: str = Query(",".join(DEFAULT_BENCHMARKS), max_length=200,
+                            description="Comma-separated tickers or blends such as 60/40"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user: Optional[User] = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Excess return, tracking error, information ratio and up/down capture of the stored curve"""
+    user_id = current_user.id if current_user else None
+    PortfolioService.get_portfolio_by_id(db, portfolio_id, user_id)
+    
+    names = list(dict.fromkeys(name.strip().upper() for name in benchmarks.split(",") if name.strip()))
+    if not names or len(names) > MAX_BENCHMARKS:
+        raise HTTPException(status_code=400, detail=f"Give between 1 and {MAX_BENCHMARKS} benchmarks")
+    
+    rows = PerformanceService.get_curve(db, portfolio_id, start_date, end_date)
+    # Stored daily returns have deposits taken out, so purchases into a
+    # holdings portfolio do not count as performance; chain them into an index
+    daily = np.array([row.daily_return_percentage or 0.0 for row in rows[1:]], dtype=np.float64)
+    index = np.concatenate(([1.0], np.cumprod(1.0 + daily / 100)))
+    try:
+        metrics = BenchmarkService.compare(db, [row.date for row in rows], index[:len(rows)], names)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return [
+        BenchmarkComparisonResponse(
+            benchmark=name,
+            **{field: (None if np.isnan(values[k]) else float(values[k])) for field, values in metrics._asdict().items()}
+        )
+        for k, name in enumerate(names)
+    ]
+
 @router.put("/{portfolio_id}", response_model=PortfolioResponse)
 async def update_portfolio(
     portfolio_id: int,
@@ -137,6 +229,26 @@ async def get_portfolio_holdings(
     holdings = PortfolioService.get_portfolio_holdings(db, portfolio_id, user_id)
     return [HoldingResponse.from_orm(holding) for holding in holdings]
 
+@router.post("/{portfolio_id}/holdings/revalue", response_model=PortfolioResponse)
+async def revalue_holdings(
+    portfolio_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Rebuild the daily curve and totals of a holdings portfolio from purchase dates and the price panel"""
+    portfolio = PortfolioService.get_portfolio_by_id(db, portfolio_id, current_user.id)
+    if portfolio.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    try:
+        HoldingsValuationService.recalculate(db, portfolio)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    db.refresh(portfolio)
+    
+    response_data = PortfolioResponse.from_orm(portfolio)
+    response_data.owner_username = current_user.username
+    return response_data
+
 @router.put("/holdings/{holding_id}", response_model=HoldingResponse)
 async def update_holding(
     holding_id: int,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List
@@ -17,6 +17,7 @@ from app.schemas.portfolio_snapshot import (
     CSVUploadResponse
 )
 from app.auth.dependencies import get_current_active_user
+from app.services.etag_service import ETagService, PRIVATE_CACHE_CONTROL
 
 router = APIRouter(prefix="/portfolios", tags=["Portfolio Snapshots"])
 
@@ -84,6 +85,8 @@ async def create_portfolio_snapshot(
 @router.get("/{portfolio_id}/snapshots", response_model=List[PortfolioSnapshotResponse])
 async def get_portfolio_snapshots(
     portfolio_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -105,10 +108,29 @@ async def get_portfolio_snapshots(
             detail="Access denied"
         )
     
+    # Snapshot values only change through snapshot writes or a recalculation,
+    # both of which move one of these validators
+    snapshot_count, last_created = db.query(
+        func.count(PortfolioSnapshot.id),
+        func.max(PortfolioSnapshot.created_at)
+    ).filter(PortfolioSnapshot.portfolio_id == portfolio_id).one()
+    
+    etag = ETagService.build_etag(
+        "snapshots", portfolio_id, snapshot_count, last_created,
+        portfolio.updated_at, portfolio.last_calculated
+    )
+    last_modified = max(
+        [stamp for stamp in (last_created, portfolio.updated_at, portfolio.last_calculated) if stamp],
+        default=None
+    )
+    if ETagService.is_not_modified(request, etag, last_modified):
+        return ETagService.not_modified_response(etag, last_modified, PRIVATE_CACHE_CONTROL)
+    
     snapshots = db.query(PortfolioSnapshot).filter(
         PortfolioSnapshot.portfolio_id == portfolio_id
     ).order_by(PortfolioSnapshot.snapshot_date.asc()).all()
     
+    ETagService.apply_headers(response, etag, last_modified, PRIVATE_CACHE_CONTROL)
     return snapshots
 
 @router.post("/{portfolio_id}/snapshots/upload-csv", response_model=CSVUploadResponse)
@@ -1,12 +1,13 @@
 # app/routes/portfolio_value_calculation.py
-# Fixed version with PROPER REBALANCING SIMULATION
+# Rebalancing simulation endpoints - the simulation itself lives in
+# app/services/backtest_engine.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 import logging
-from typing import List, Dict, Optional
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
 
 # Update these imports to match your project structure
 try:
@@ -36,238 +37,426 @@ try:
 except ImportError:
     from app.dependencies import get_current_user
 
+from app.services.backtest_service import BacktestService
+from app.services.backtest_cache_service import BacktestCacheService
+from app.services.etag_service import ETagService, PRIVATE_CACHE_CONTROL
+from app.services.portfolio_service import PortfolioService
+from app.services.backtest_engine import AllocationSchedule
+from app.services.projection import DEFAULT_BLOCK_DAYS, DEFAULT_PATHS
+from app.services.projection_service import ProjectionService
+from app.services.risk_metrics import TRADING_DAYS_PER_YEAR
+from app.services.what_if_service import WhatIfService, WhatIfScenario
+from app.services.recalculation_job_service import (
+    RecalculationJobService, RecalculationJob, JobConflictError, JobStatus
+)
+
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class CalculateValuesRequest(BaseModel):
     starting_value: float = 100000.0
     recalculate: bool = True
+    # Skip the daily curve and read only rebalance-date prices
+    include_daily_curve: bool = True
+    # Ignore saved checkpoints and replay from the first snapshot
+    full_replay: bool = False
 
 class CalculationResult(BaseModel):
     success: bool
     values_calculated: int
     errors: List[str]
 
+class CalculationJobResponse(BaseModel):
+    job_id: str
+    portfolio_id: int
+    status: str
+    progress: float
+    stage: str
+    values_calculated: int
+    errors: List[str]
+    error: Optional[str] = None
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @classmethod
+    def from_job(cls, job: RecalculationJob) -> "CalculationJobResponse":
+        return cls(
+            job_id=job.id,
+            portfolio_id=job.portfolio_id,
+            status=job.status.value,
+            progress=job.progress,
+            stage=job.stage,
+            values_calculated=job.values_calculated,
+            errors=job.errors,
+            error=job.error,
+            submitted_at=job.submitted_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
+
+class BacktestRebalance(BaseModel):
+    snapshot_index: int
+    date: date
+    trade_date: date
+    value: float
+
+class BacktestMetrics(BaseModel):
+    volatility: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    sortino_ratio: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    beta: Optional[float] = None
+
+class BacktestResultResponse(BaseModel):
+    portfolio_id: int
+    # memory, database or computed
+    source: str
+    starting_value: float
+    final_value: float
+    total_return_percentage: float
+    rebalances: List[BacktestRebalance]
+    curve_dates: List[date]
+    curve_values: List[float]
+    metrics: BacktestMetrics
+    errors: List[str]
+
+class AssetContribution(BaseModel):
+    symbol: str
+    # Of the starting value, so contributions add up to the total return
+    contribution_percentage: float
+    contribution_amount: float
+
+class AttributionPeriod(BaseModel):
+    snapshot_index: int
+    date: date
+    trade_date: date
+    start_value: float
+    end_value: float
+    # Percent of start_value per symbol held in the period
+    contributions: Dict[str, float]
+
+class AttributionResponse(BaseModel):
+    portfolio_id: int
+    # memory, database or computed
+    source: str
+    starting_value: float
+    total_return_percentage: float
+    assets: List[AssetContribution]
+    periods: Optional[List[AttributionPeriod]] = None
+
+class WhatIfAllocation(BaseModel):
+    date: date
+    assets: List[str] = Field(..., min_length=1)
+    # Percent, normalized to 100 like snapshot weights
+    weights: List[float] = Field(..., min_length=1)
+
+class WhatIfSchedule(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    # Either explicit allocations or an existing portfolio's snapshots
+    allocations: List[WhatIfAllocation] = []
+    portfolio_id: Optional[int] = None
+
+class WhatIfRequest(BaseModel):
+    schedules: List[WhatIfSchedule] = Field(..., min_length=1, max_length=50)
+    starting_values: List[float] = Field([100000.0], min_length=1, max_length=10)
+    # Calendar days between each snapshot date and its trade
+    rebalance_lags: List[int] = Field([0], min_length=1, max_length=10)
+    include_curve: bool = False
+
+class WhatIfScenarioResult(BaseModel):
+    name: str
+    lag_days: int
+    starting_value: float
+    final_value: float
+    total_return_percentage: float
+    annualized_return_percentage: float
+    rebalances_executed: int
+    metrics: BacktestMetrics
+    errors: List[str]
+    curve_dates: Optional[List[date]] = None
+    curve_values: Optional[List[float]] = None
+
+    @classmethod
+    def from_scenario(cls, scenario: WhatIfScenario, include_curve: bool) -> "WhatIfScenarioResult":
+        result = scenario.result
+        return cls(
+            name=scenario.name,
+            lag_days=scenario.lag_days,
+            starting_value=result.starting_value,
+            final_value=result.final_value,
+            total_return_percentage=result.total_return_percentage,
+            annualized_return_percentage=scenario.annualized_return_percentage,
+            rebalances_executed=len(result.rebalance_values),
+            metrics=BacktestMetrics(**scenario.metrics._asdict()),
+            errors=result.errors,
+            curve_dates=result.dates.tolist() if include_curve else None,
+            curve_values=result.values.tolist() if include_curve else None
+        )
+
+class ProjectionBand(BaseModel):
+    percentile: float
+    # Projected portfolio value at each point of trading_days
+    values: List[float]
+
+class ProjectionResponse(BaseModel):
+    portfolio_id: int
+    # memory or computed
+    source: str
+    starting_value: float
+    years: int
+    paths: int
+    block_days: int
+    seed: int
+    history_days: int
+    trading_days: List[int]
+    bands: List[ProjectionBand]
+    probability_of_loss: float
+    median_annualized_return_percentage: float
+
+def get_owned_portfolio(db: Session, portfolio_id: int, user: User) -> Portfolio:
+    portfolio = db.query(Portfolio).filter(
+        Portfolio.id == portfolio_id,
+        Portfolio.user_id == user.id
+    ).first()
+    if not portfolio:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    return portfolio
+
+def submit_recalculation(db: Session, portfolio_id: int, request: CalculateValuesRequest) -> RecalculationJob:
+    """Queue (or join) the portfolio's recalculation job"""
+    snapshot_count = db.query(PortfolioSnapshot).filter(
+        PortfolioSnapshot.portfolio_id == portfolio_id
+    ).count()
+    if not snapshot_count:
+        raise HTTPException(status_code=400, detail="No snapshots found for this portfolio")
+    
+    try:
+        job, created = RecalculationJobService.submit(
+            portfolio_id, request.starting_value,
+            daily_curve=request.include_daily_curve, full_replay=request.full_replay
+        )
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if created:
+        logger.info(f"Queued recalculation job {job.id} for portfolio {portfolio_id}")
+    return job
+
+# Plain def: FastAPI runs it in its threadpool, and the work itself runs in
+# the recalculation pool, so the event loop is never blocked
 @router.post("/portfolios/{portfolio_id}/calculate-values", response_model=CalculationResult)
-async def calculate_portfolio_values(
+def calculate_portfolio_values(
     portfolio_id: int,
     request: CalculateValuesRequest,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Calculate real portfolio values using PROPER REBALANCING SIMULATION"""
+    """Calculate real portfolio values using PROPER REBALANCING SIMULATION and wait for the result"""
+    get_owned_portfolio(db, portfolio_id, current_user)
+    job = RecalculationJobService.wait(submit_recalculation(db, portfolio_id, request))
     
-    try:
-        # Verify portfolio ownership
-        portfolio = db.query(Portfolio).filter(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == current_user.id
-        ).first()
-        
-        if not portfolio:
-            raise HTTPException(status_code=404, detail="Portfolio not found")
-        
-        # Get all snapshots for this portfolio, sorted by date
-        snapshots = db.query(PortfolioSnapshot).filter(
-            PortfolioSnapshot.portfolio_id == portfolio_id
-        ).order_by(PortfolioSnapshot.snapshot_date).all()
-        
-        if not snapshots:
-            raise HTTPException(status_code=400, detail="No snapshots found for this portfolio")
-        
-        print(f"Calculating values for {len(snapshots)} rebalancing snapshots")
-        
-        # Get all unique symbols across all snapshots
-        all_symbols = set()
-        for snapshot in snapshots:
-            if snapshot.assets:
-                symbols = [s.strip().upper() for s in snapshot.assets.split(',')]
-                all_symbols.update(symbols)
-        
-        print(f"Symbols needed: {list(all_symbols)}")
-        
-        # Get date range - from first snapshot to now
-        start_date = snapshots[0].snapshot_date.date()
-        end_date = datetime.now().date()
-        
-        # Fetch ALL price data for the entire period
-        price_data = {}
-        for symbol in all_symbols:
-            prices = db.query(AssetPrice).filter(
-                AssetPrice.symbol == symbol,
-                AssetPrice.date >= start_date,
-                AssetPrice.date <= end_date
-            ).all()
-            
-            if prices:
-                # Store as {date: price} mapping
-                price_data[symbol] = {p.date.strftime('%Y-%m-%d'): p.adjusted_close for p in prices}
-                print(f"Found {len(prices)} prices for {symbol}")
-            else:
-                print(f"WARNING: No price data found for symbol: {symbol}")
-        
-        # CORE REBALANCING SIMULATION
-        portfolio_value = request.starting_value  # Start with $100K
-        current_holdings = {}  # Track shares of each asset
-        calculated_values = 0
-        errors = []
-        
-        for i, snapshot in enumerate(snapshots):
-            try:
-                rebalance_date = snapshot.snapshot_date.date().strftime('%Y-%m-%d')
-                print(f"\n=== REBALANCE {i+1} on {rebalance_date} ===")
-                print(f"Portfolio value before rebalance: ${portfolio_value:,.2f}")
-                
-                # Parse the new allocation from CSV
-                if not snapshot.assets or not snapshot.weights:
-                    errors.append(f"Rebalance {i+1}: Missing assets or weights")
-                    continue
-                    
-                new_assets = [s.strip().upper() for s in snapshot.assets.split(',')]
-                new_weights = [float(w.strip()) for w in snapshot.weights.split(',')]
-                
-                if len(new_assets) != len(new_weights):
-                    errors.append(f"Rebalance {i+1}: Asset/weight count mismatch")
-                    continue
-                
-                # Verify weights sum to 100%
-                weight_sum = sum(new_weights)
-                if abs(weight_sum - 100.0) > 0.1:
-                    errors.append(f"Rebalance {i+1}: Weights sum to {weight_sum}%, not 100%")
-                    # Normalize weights
-                    new_weights = [w * 100.0 / weight_sum for w in new_weights]
-                
-                # STEP 1: SELL ALL CURRENT HOLDINGS
-                if current_holdings:
-                    print("Selling all current holdings...")
-                    portfolio_value = calculate_portfolio_value_on_date(current_holdings, price_data, rebalance_date)
-                    print(f"Portfolio value after selling: ${portfolio_value:,.2f}")
-                
-                # STEP 2: BUY NEW ALLOCATION
-                print(f"Buying new allocation: {list(zip(new_assets, new_weights))}")
-                new_holdings = {}
-                
-                for asset, weight_pct in zip(new_assets, new_weights):
-                    if asset not in price_data:
-                        errors.append(f"Rebalance {i+1}: No price data for {asset}")
-                        continue
-                    
-                    # Find price on rebalance date
-                    price = find_closest_price(price_data[asset], rebalance_date)
-                    if not price:
-                        errors.append(f"Rebalance {i+1}: No price for {asset} near {rebalance_date}")
-                        continue
-                    
-                    # Calculate how much to allocate to this asset
-                    allocation_amount = portfolio_value * (weight_pct / 100.0)
-                    shares_to_buy = allocation_amount / price
-                    new_holdings[asset] = shares_to_buy
-                    
-                    print(f"  {asset}: {weight_pct:.1f}% = ${allocation_amount:,.2f} = {shares_to_buy:.2f} shares @ ${price:.2f}")
-                
-                # Update current holdings
-                current_holdings = new_holdings
-                
-                # STEP 3: CALCULATE VALUE AFTER REBALANCING
-                new_portfolio_value = calculate_portfolio_value_on_date(current_holdings, price_data, rebalance_date)
-                
-                # Update snapshot with calculated value
-                snapshot.total_value = new_portfolio_value
-                calculated_values += 1
-                portfolio_value = new_portfolio_value
-                
-                print(f"Portfolio value after rebalancing: ${portfolio_value:,.2f}")
-                
-                # Update portfolio summary
-                portfolio.total_value = portfolio_value
-                if i == 0:
-                    portfolio.total_return_percentage = 0.0
-                else:
-                    portfolio.total_return_percentage = ((portfolio_value - request.starting_value) / request.starting_value) * 100
-                
-                # STEP 4: CALCULATE INTERMEDIATE VALUES (weekly) until next rebalance
-                if i < len(snapshots) - 1:  # Not the last snapshot
-                    next_rebalance_date = snapshots[i + 1].snapshot_date.date()
-                    intermediate_values = calculate_intermediate_values(
-                        current_holdings, price_data, rebalance_date, next_rebalance_date
-                    )
-                    portfolio_value = intermediate_values[-1] if intermediate_values else portfolio_value
-                
-            except Exception as e:
-                errors.append(f"Rebalance {i+1}: Error - {str(e)}")
-                print(f"Error in rebalance {i+1}: {e}")
-        
-        # Commit all changes
-        db.commit()
-        print(f"\n✅ Successfully calculated {calculated_values} portfolio values")
-        print(f"Final portfolio value: ${portfolio_value:,.2f}")
-        print(f"Total return: {((portfolio_value - request.starting_value) / request.starting_value) * 100:.2f}%")
-        
-        return CalculationResult(
-            success=True,
-            values_calculated=calculated_values,
-            errors=errors
-        )
-        
-    except Exception as e:
-        db.rollback()
-        print(f"Calculation error: {e}")
-        raise HTTPException(status_code=500, detail=f"Calculation failed: {str(e)}")
-
-def calculate_portfolio_value_on_date(holdings: Dict[str, float], price_data: Dict[str, Dict[str, float]], date: str) -> float:
-    """Calculate portfolio value on a specific date given current holdings"""
-    total_value = 0.0
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=f"Calculation failed: {job.error}")
     
-    for symbol, shares in holdings.items():
-        if symbol in price_data:
-            price = find_closest_price(price_data[symbol], date)
-            if price:
-                value = shares * price
-                total_value += value
-            else:
-                print(f"Warning: No price for {symbol} on {date}")
-        else:
-            print(f"Warning: No price data for {symbol}")
+    return CalculationResult(
+        success=True,
+        values_calculated=job.values_calculated,
+        errors=job.errors
+    )
+
+@router.post("/portfolios/{portfolio_id}/calculate-values/jobs", response_model=CalculationJobResponse,
+             status_code=status.HTTP_202_ACCEPTED)
+def submit_calculation_job(
+    portfolio_id: int,
+    request: CalculateValuesRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Start a background recalculation; poll the returned job for progress"""
+    get_owned_portfolio(db, portfolio_id, current_user)
+    return CalculationJobResponse.from_job(submit_recalculation(db, portfolio_id, request))
+
+@router.get("/portfolios/{portfolio_id}/calculate-values/jobs/{job_id}", response_model=CalculationJobResponse)
+def get_calculation_job(
+    portfolio_id: int,
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Status and progress of a background recalculation"""
+    get_owned_portfolio(db, portfolio_id, current_user)
+    job = RecalculationJobService.get(job_id)
+    if not job or job.portfolio_id != portfolio_id:
+        raise HTTPException(status_code=404, detail="Calculation job not found")
+    return CalculationJobResponse.from_job(job)
+
+@router.get("/portfolios/{portfolio_id}/backtest", response_model=BacktestResultResponse)
+def get_backtest_result(
+    portfolio_id: int,
+    request: Request,
+    response: Response,
+    starting_value: float = Query(100000.0, gt=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Simulated values, daily curve and risk metrics without saving anything, served from cache"""
+    PortfolioService.get_portfolio_by_id(db, portfolio_id, current_user.id)
+    snapshots = BacktestService.get_snapshots(db, portfolio_id)
+    if not snapshots:
+        raise HTTPException(status_code=400, detail="No snapshots found for this portfolio")
     
-    return total_value
+    # The cache key already changes with the snapshots and prices
+    key = BacktestCacheService.cache_key(db, snapshots, starting_value)
+    etag = ETagService.build_etag("backtest", key)
+    if ETagService.is_not_modified(request, etag):
+        return ETagService.not_modified_response(etag, cache_control=PRIVATE_CACHE_CONTROL)
+    
+    key, payload, source = BacktestCacheService.get_or_compute(db, portfolio_id, starting_value, snapshots, key)
+    ETagService.apply_headers(response, etag, cache_control=PRIVATE_CACHE_CONTROL)
+    return BacktestResultResponse(portfolio_id=portfolio_id, source=source, **payload)
 
-def calculate_intermediate_values(holdings: Dict[str, float], price_data: Dict[str, Dict[str, float]], start_date: str, end_date: str) -> List[float]:
-    """Calculate portfolio values between rebalancing dates (weekly intervals)"""
-    values = []
+@router.get("/portfolios/{portfolio_id}/backtest/attribution", response_model=AttributionResponse)
+def get_backtest_attribution(
+    portfolio_id: int,
+    request: Request,
+    response: Response,
+    starting_value: float = Query(100000.0, gt=0),
+    include_periods: bool = Query(True),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Per-asset contribution to return, cumulatively and per rebalance period, from the cached backtest"""
+    PortfolioService.get_portfolio_by_id(db, portfolio_id, current_user.id)
+    snapshots = BacktestService.get_snapshots(db, portfolio_id)
+    if not snapshots:
+        raise HTTPException(status_code=400, detail="No snapshots found for this portfolio")
     
-    start = datetime.strptime(start_date, '%Y-%m-%d')
-    end = datetime.strptime(end_date, '%Y-%m-%d')
+    key = BacktestCacheService.cache_key(db, snapshots, starting_value)
+    etag = ETagService.build_etag("attribution", key, include_periods)
+    if ETagService.is_not_modified(request, etag):
+        return ETagService.not_modified_response(etag, cache_control=PRIVATE_CACHE_CONTROL)
     
-    # Calculate weekly values
-    current = start + timedelta(days=7)
-    while current < end:
-        date_str = current.strftime('%Y-%m-%d')
-        value = calculate_portfolio_value_on_date(holdings, price_data, date_str)
-        if value > 0:
-            values.append(value)
-        current += timedelta(days=7)
+    key, payload, source = BacktestCacheService.get_or_compute(db, portfolio_id, starting_value, snapshots, key)
+    attribution = payload["attribution"]
+    assets = sorted(
+        (
+            AssetContribution(symbol=symbol, contribution_percentage=percentage, contribution_amount=amount)
+            for symbol, percentage, amount in zip(
+                attribution["symbols"], attribution["cumulative_percentage"], attribution["cumulative_amount"]
+            )
+        ),
+        key=lambda asset: asset.contribution_amount, reverse=True
+    )
+    periods = None
+    if include_periods:
+        periods = [
+            AttributionPeriod(
+                snapshot_index=rebalance["snapshot_index"],
+                date=rebalance["date"],
+                trade_date=rebalance["trade_date"],
+                start_value=rebalance["value"],
+                end_value=end_value,
+                contributions=contributions
+            )
+            for rebalance, end_value, contributions in zip(
+                payload["rebalances"], attribution["period_end_values"], attribution["periods"]
+            )
+        ]
     
-    return values
+    ETagService.apply_headers(response, etag, cache_control=PRIVATE_CACHE_CONTROL)
+    return AttributionResponse(
+        portfolio_id=portfolio_id,
+        source=source,
+        starting_value=payload["starting_value"],
+        total_return_percentage=payload["total_return_percentage"],
+        assets=assets,
+        periods=periods
+    )
 
-def find_closest_price(price_dict: Dict[str, float], target_date: str) -> Optional[float]:
-    """Find the closest available price to target date within 7 days"""
-    if target_date in price_dict:
-        return price_dict[target_date]
+@router.post("/backtest/what-if", response_model=List[WhatIfScenarioResult])
+def run_what_if_backtests(
+    request: WhatIfRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Compare allocation schedules and parameter variants over one shared price load; nothing is saved"""
+    schedules = []
+    for item in request.schedules:
+        if item.portfolio_id is not None:
+            PortfolioService.get_portfolio_by_id(db, item.portfolio_id, current_user.id)
+            schedule = BacktestService.build_schedule(BacktestService.get_snapshots(db, item.portfolio_id))
+        else:
+            schedule = AllocationSchedule.from_allocations(sorted(
+                ((a.date, a.assets, a.weights) for a in item.allocations), key=lambda entry: entry[0]
+            ))
+        schedules.append((item.name, schedule))
     
-    target = datetime.strptime(target_date, '%Y-%m-%d')
+    if any(value <= 0 for value in request.starting_values):
+        raise HTTPException(status_code=400, detail="Starting values must be positive")
+    if any(not 0 <= lag <= 30 for lag in request.rebalance_lags):
+        raise HTTPException(status_code=400, detail="Rebalance lags must be between 0 and 30 days")
     
-    # Search within 7 days (weekends/holidays)
-    for days_offset in range(1, 8):
-        # Try before target date first (more likely to have data)
-        before_date = (target - timedelta(days=days_offset)).strftime('%Y-%m-%d')
-        if before_date in price_dict:
-            return price_dict[before_date]
-        
-        # Try after target date
-        after_date = (target + timedelta(days=days_offset)).strftime('%Y-%m-%d')
-        if after_date in price_dict:
-            return price_dict[after_date]
+    try:
+        scenarios = WhatIfService.run(db, schedules, request.starting_values, request.rebalance_lags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [WhatIfScenarioResult.from_scenario(scenario, request.include_curve) for scenario in scenarios]
+
+@router.get("/portfolios/{portfolio_id}/projection", response_model=ProjectionResponse)
+def get_portfolio_projection(
+    portfolio_id: int,
+    request: Request,
+    response: Response,
+    years: int = Query(10, ge=1, le=30),
+    paths: int = Query(DEFAULT_PATHS, ge=1000, le=50000),
+    block_days: int = Query(DEFAULT_BLOCK_DAYS, ge=5, le=126),
+    seed: int = Query(0, ge=0),
+    starting_value: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Percentile bands of future value from block-bootstrapped backtest returns; defaults to the current value"""
+    portfolio = PortfolioService.get_portfolio_by_id(db, portfolio_id, current_user.id)
+    if starting_value is None:
+        starting_value = portfolio.total_value or 100000.0
+    
+    horizon_days = years * TRADING_DAYS_PER_YEAR
+    try:
+        cache_key = ProjectionService.cache_key(db, portfolio_id, horizon_days, paths, block_days, seed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Bands are growth multiples, so the starting value only scales them;
+    # answer revalidations before running any simulation
+    etag = ETagService.build_etag("projection", f"{cache_key.key}:{starting_value}")
+    if ETagService.is_not_modified(request, etag):
+        return ETagService.not_modified_response(etag, cache_control=PRIVATE_CACHE_CONTROL)
+    
+    try:
+        _, projection, source = ProjectionService.project(
+            db, portfolio_id, horizon_days, paths, block_days, seed, cache_key=cache_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return None
+    ETagService.apply_headers(response, etag, cache_control=PRIVATE_CACHE_CONTROL)
+    return ProjectionResponse(
+        portfolio_id=portfolio_id,
+        source=source,
+        starting_value=starting_value,
+        years=years,
+        paths=paths,
+        block_days=block_days,
+        seed=seed,
+        history_days=projection.history_days,
+        trading_days=projection.trading_days.tolist(),
+        bands=[
+            ProjectionBand(percentile=p, values=(growth * starting_value).tolist())
+            for p, growth in zip(projection.percentiles.tolist(), projection.growth)
+        ],
+        probability_of_loss=projection.probability_of_loss,
+        median_annualized_return_percentage=projection.median_annualized_return_percentage
+    )
 
 # Test endpoint
 @router.get("/portfolios/test-calculation")
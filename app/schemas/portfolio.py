@@ -15,6 +15,20 @@ class PortfolioUpdate(BaseModel):
     description: Optional[str] = Field(None, max_length=500)
     is_public: Optional[bool] = None
 
+class PortfolioPeriodReturnsResponse(BaseModel):
+    # Percent; None when the curve does not reach back far enough
+    as_of_date: date
+    return_1d: Optional[float] = None
+    return_1m: Optional[float] = None
+    return_3m: Optional[float] = None
+    return_ytd: Optional[float] = None
+    return_1y: Optional[float] = None
+    return_3y: Optional[float] = None
+    return_inception: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
 class PortfolioResponse(BaseModel):
     id: int
     name: str
@@ -34,6 +48,11 @@ class PortfolioResponse(BaseModel):
     volatility: Optional[float]
     sharpe_ratio: Optional[float]
     max_drawdown: Optional[float]
+    sortino_ratio: Optional[float] = None
+    beta: Optional[float] = None
+    
+    # Trailing returns for performance badges
+    period_returns: Optional[PortfolioPeriodReturnsResponse] = None
     
     # Metadata
     created_at: datetime
@@ -59,6 +78,18 @@ class PortfolioResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    # Period return in %, or Sharpe ratio for the sharpe board
+    score: float
+    portfolio: PortfolioResponse
+
+class LeaderboardPage(BaseModel):
+    board: str
+    entries: List[LeaderboardEntry]
+    # Pass as after_rank for the next page; None on the last page
+    next_after_rank: Optional[int] = None
+
 # Holding Schemas
 class HoldingCreate(BaseModel):
     symbol: str = Field(..., min_length=1, max_length=10)
@@ -113,6 +144,16 @@ class PerformanceResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BenchmarkComparisonResponse(BaseModel):
+    benchmark: str
+    # Percent over the days both curves are known; None when undefined
+    benchmark_return: Optional[float] = None
+    excess_return: Optional[float] = None
+    tracking_error: Optional[float] = None
+    information_ratio: Optional[float] = None
+    up_capture: Optional[float] = None
+    down_capture: Optional[float] = None
+
 class PortfolioDetailResponse(PortfolioResponse):
     holdings: List[HoldingResponse] = []
     recent_performance: List[PerformanceResponse] = []
@@ -2,6 +2,10 @@ from pydantic import BaseModel, validator
 from datetime import datetime
 from typing import List, Dict, Optional
 
+def split_list(value: str) -> List[str]:
+    """Trimmed, non-empty items of a comma-separated string"""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
 class PortfolioSnapshotBase(BaseModel):
     snapshot_date: datetime
     assets: str  # "AAPL,MSFT,TSLA"
@@ -10,28 +14,23 @@ class PortfolioSnapshotBase(BaseModel):
 
     @validator('assets')
     def validate_assets(cls, v):
-        assets = [asset.strip() for asset in v.split(',') if asset.strip()]
-        if not assets:
+        if not split_list(v):
             raise ValueError('At least one asset is required')
         return v
 
     @validator('weights')
     def validate_weights(cls, v, values):
-        weights = [weight.strip() for weight in v.split(',') if weight.strip()]
+        weights = split_list(v)
         if not weights:
             raise ValueError('Weights are required')
         
-        # Check if weights can be converted to floats
         try:
             weight_floats = [float(w) for w in weights]
         except ValueError:
             raise ValueError('All weights must be valid numbers')
         
-        # Check if assets and weights match in count
-        if 'assets' in values:
-            assets = [asset.strip() for asset in values['assets'].split(',') if asset.strip()]
-            if len(assets) != len(weights):
-                raise ValueError('Number of assets must match number of weights')
+        if 'assets' in values and len(split_list(values['assets'])) != len(weights):
+            raise ValueError('Number of assets must match number of weights')
         
         # Check if weights sum to approximately 100
         total = sum(weight_floats)
@@ -55,7 +54,7 @@ class PortfolioSnapshotResponse(PortfolioSnapshotBase):
     created_at: datetime
     created_by_user_id: int
     
-    # Computed properties
+    # Assets as entered; weights from the snapshot's allocation rows
     asset_list: List[str]
     weight_list: List[float]
     allocation_dict: Dict[str, float]
@@ -63,26 +62,6 @@ class PortfolioSnapshotResponse(PortfolioSnapshotBase):
     class Config:
         from_attributes = True
 
-    @validator('asset_list', pre=True, always=True)
-    def compute_asset_list(cls, v, values):
-        if 'assets' in values:
-            return [asset.strip() for asset in values['assets'].split(',') if asset.strip()]
-        return v
-
-    @validator('weight_list', pre=True, always=True)
-    def compute_weight_list(cls, v, values):
-        if 'weights' in values:
-            return [float(weight.strip()) for weight in values['weights'].split(',') if weight.strip()]
-        return v
-
-    @validator('allocation_dict', pre=True, always=True)
-    def compute_allocation_dict(cls, v, values):
-        if 'assets' in values and 'weights' in values:
-            assets = [asset.strip() for asset in values['assets'].split(',') if asset.strip()]
-            weights = [float(weight.strip()) for weight in values['weights'].split(',') if weight.strip()]
-            return dict(zip(assets, weights))
-        return v
-
 # Schema for CSV upload
 class CSVUploadResponse(BaseModel):
     message: str
@@ -0,0 +1,161 @@
+import hashlib
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.backtest_result_cache import BacktestResultCache
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.backtest_checkpoint_service import BacktestCheckpointService
+from app.services.backtest_engine import BacktestResult
+from app.services.backtest_service import BacktestService
+from app.services.price_watermark_service import PriceWatermarkService
+from app.services.risk_metrics import BENCHMARK_SYMBOL, RiskState
+from app.services.risk_metrics_service import RiskMetricsService
+from app.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Keys change whenever snapshots or prices do, so entries never go stale;
+# the TTL only bounds how long unused results hold memory
+RESULT_CACHE_SIZE = 256
+# Part of every key; bump when the payload layout changes so old rows are never read
+PAYLOAD_VERSION = "2"
+RESULT_CACHE_TTL_SECONDS = 3600
+# Persisted entries kept per portfolio across starting values, newest first
+MAX_STORED_RESULTS_PER_PORTFOLIO = 8
+
+_result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
+
+backtest_result_cache = BacktestResultCache.__table__
+
+
+class BacktestCacheService:
+    """
+    Backtest output cached in process and in Postgres.
+
+    The key covers the snapshot set, the starting value and the ingestion
+    watermark of every priced symbol, so new snapshots or prices simply
+    produce a new key and the old entry is never read again.
+    """
+
+    @staticmethod
+    def cache_version(db: Session, snapshots: List[PortfolioSnapshot]) -> str:
+        """
+        Hash of the payload layout, the snapshot set and the price watermarks,
+        shared by every starting value: entries of a portfolio with another
+        version are outdated.
+        """
+        # A fixed starting value, so the hash covers the snapshots alone
+        snapshot_hash = BacktestCheckpointService.prefix_hashes(snapshots, 0.0)[-1]
+        symbols = {symbol for snapshot in snapshots for symbol in snapshot.symbol_list}
+        watermarks = PriceWatermarkService.get_watermarks(db, list(symbols) + [BENCHMARK_SYMBOL])
+        parts = [PAYLOAD_VERSION, snapshot_hash] + [watermarks[symbol].token for symbol in sorted(watermarks)]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cache_key(db: Session, snapshots: List[PortfolioSnapshot], starting_value: float) -> str:
+        return BacktestCacheService.key_for(BacktestCacheService.cache_version(db, snapshots), starting_value)
+
+    @staticmethod
+    def key_for(version: str, starting_value: float) -> str:
+        return hashlib.sha256(f"{version}|{float(starting_value)!r}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_or_compute(db: Session, portfolio_id: int, starting_value: float,
+                       snapshots: Optional[List[PortfolioSnapshot]] = None,
+                       key: Optional[str] = None) -> Tuple[str, dict, str]:
+        """
+        Returns (cache_key, payload, source) where source is "memory",
+        "database" or "computed". Computing writes nothing but the cache.
+        Pass key when the caller already built it from the same snapshots.
+        """
+        if snapshots is None:
+            snapshots = BacktestService.get_snapshots(db, portfolio_id)
+        if not snapshots:
+            raise ValueError("No snapshots found for this portfolio")
+
+        version = None
+        if key is None:
+            version = BacktestCacheService.cache_version(db, snapshots)
+            key = BacktestCacheService.key_for(version, starting_value)
+        payload = _result_cache.get(key)
+        if payload is not None:
+            return key, payload, "memory"
+
+        stored = db.query(BacktestResultCache.payload).filter(BacktestResultCache.cache_key == key).first()
+        if stored is not None:
+            _result_cache.set(key, stored.payload)
+            return key, stored.payload, "database"
+
+        result = BacktestService.run(db, snapshots, starting_value)
+        payload = BacktestCacheService.build_payload(db, result)
+        version = version or BacktestCacheService.cache_version(db, snapshots)
+        BacktestCacheService.store(db, portfolio_id, key, version, payload)
+        _result_cache.set(key, payload)
+        return key, payload, "computed"
+
+    @staticmethod
+    def build_payload(db: Session, result: BacktestResult) -> dict:
+        """JSON-ready rebalance values, daily curve, risk metrics and attribution"""
+        state = RiskState.from_curve(result.values, RiskMetricsService.load_benchmark(db, result.dates))
+        per_period, cumulative = result.attribution()
+        held = result.shares != 0
+        return {
+            "starting_value": result.starting_value,
+            "final_value": result.final_value,
+            "total_return_percentage": result.total_return_percentage,
+            "rebalances": [
+                {"snapshot_index": index, "date": d.isoformat(), "trade_date": t.isoformat(), "value": value}
+                for index, d, t, value in zip(
+                    result.source_index.tolist(), result.rebalance_dates.tolist(),
+                    result.trade_dates.tolist(), result.rebalance_values.tolist()
+                )
+            ],
+            "curve_dates": [d.isoformat() for d in result.dates.tolist()],
+            "curve_values": result.values.tolist(),
+            "metrics": state.metrics()._asdict(),
+            # Only symbols held in a period, so long schedules over wide universes stay small
+            "attribution": {
+                "symbols": result.symbols,
+                "cumulative_percentage": cumulative.tolist(),
+                "cumulative_amount": result.contributions.sum(axis=0).tolist(),
+                "period_end_values": result.period_end_values().tolist(),
+                "periods": [
+                    {result.symbols[j]: float(per_period[k, j]) for j in np.flatnonzero(held[k])}
+                    for k in range(len(per_period))
+                ],
+            },
+            "errors": result.errors,
+        }
+
+    @staticmethod
+    def store(db: Session, portfolio_id: int, key: str, version: str, payload: dict):
+        """
+        Persist an entry and drop the portfolio's outdated ones (other
+        snapshots or prices). Entries for other starting values at the same
+        version stay, up to MAX_STORED_RESULTS_PER_PORTFOLIO.
+        """
+        try:
+            db.execute(delete(backtest_result_cache).where(
+                backtest_result_cache.c.portfolio_id == portfolio_id,
+                backtest_result_cache.c.version.is_distinct_from(version)
+            ))
+            db.execute(insert(backtest_result_cache).values(
+                cache_key=key, portfolio_id=portfolio_id, version=version, payload=payload
+            ).on_conflict_do_nothing())
+            newest = select(backtest_result_cache.c.cache_key).where(
+                backtest_result_cache.c.portfolio_id == portfolio_id
+            ).order_by(backtest_result_cache.c.created_at.desc()).limit(MAX_STORED_RESULTS_PER_PORTFOLIO)
+            db.execute(delete(backtest_result_cache).where(
+                backtest_result_cache.c.portfolio_id == portfolio_id,
+                backtest_result_cache.c.cache_key.notin_(newest.scalar_subquery())
+            ))
+            db.commit()
+        except Exception as e:
+            # The result is still served; the next request recomputes it
+            db.rollback()
+            logger.warning(f"⚠️ Could not persist backtest cache for portfolio {portfolio_id}: {e}")
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.models.backtest_checkpoint import BacktestCheckpoint
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.backtest_engine import AllocationSchedule, BacktestResult, ResumeState
+
+logger = logging.getLogger(__name__)
+
+backtest_checkpoints = BacktestCheckpoint.__table__
+
+
+class BacktestCheckpointService:
+    """Per-rebalance engine state so recalculations only replay what changed"""
+
+    @staticmethod
+    def prefix_hashes(snapshots: List[PortfolioSnapshot], starting_value: float) -> List[str]:
+        """
+        hashes[i] covers the starting value and snapshots[0..i]: editing,
+        inserting or deleting a snapshot changes the hash from that point on.
+        """
+        digest = hashlib.sha1(f"start:{float(starting_value)!r}".encode("utf-8")).hexdigest()
+        hashes = []
+        for snapshot in snapshots:
+            part = f"{digest}|{snapshot.snapshot_date.isoformat()}|{snapshot.assets}|{snapshot.weights}"
+            digest = hashlib.sha1(part.encode("utf-8")).hexdigest()
+            hashes.append(digest)
+        return hashes
+
+    @staticmethod
+    def get_checkpoints(db: Session, portfolio_id: int) -> List[BacktestCheckpoint]:
+        return db.query(BacktestCheckpoint).filter(
+            BacktestCheckpoint.portfolio_id == portfolio_id
+        ).order_by(BacktestCheckpoint.snapshot_index).all()
+
+    @staticmethod
+    def find_resume_state(db: Session, portfolio_id: int, schedule: AllocationSchedule,
+                          hashes: List[str]) -> Optional[ResumeState]:
+        """State after the latest rebalance whose snapshot prefix is unchanged, if any"""
+        positions = {int(source): k for k, source in enumerate(schedule.source_index)}
+        column = {symbol: j for j, symbol in enumerate(schedule.symbols)}
+
+        for checkpoint in reversed(BacktestCheckpointService.get_checkpoints(db, portfolio_id)):
+            index = checkpoint.snapshot_index
+            if index >= len(hashes) or hashes[index] != checkpoint.prefix_hash or index not in positions:
+                continue
+            shares = np.zeros(len(schedule.symbols))
+            prices = np.full(len(schedule.symbols), np.nan)
+            for symbol, (held, price) in checkpoint.holdings.items():
+                shares[column[symbol]] = held
+                prices[column[symbol]] = np.nan if price is None else price
+            return ResumeState(
+                position=positions[index],
+                nav=checkpoint.nav,
+                shares=shares,
+                cash=checkpoint.cash,
+                prices=prices,
+            )
+        return None
+
+    @staticmethod
+    def build_rows(portfolio_id: int, hashes: List[str], result: BacktestResult) -> List[dict]:
+        """One backtest_checkpoints row per executed rebalance in result"""
+        rows = []
+        trade_dates = result.trade_dates
+        for k, snapshot_index in enumerate(result.source_index.tolist()):
+            held = np.flatnonzero(result.shares[k])
+            # Keep the last close of every symbol with one so a resumed run can
+            # value positions whose prices stop before its price window
+            priced = np.flatnonzero(~np.isnan(result.prices[k]))
+            holdings = {
+                result.symbols[j]: [float(result.shares[k, j]), float(result.prices[k, j])]
+                for j in np.union1d(held, priced)
+            }
+            rows.append({
+                "portfolio_id": portfolio_id,
+                "snapshot_index": snapshot_index,
+                "prefix_hash": hashes[snapshot_index],
+                "trade_date": trade_dates[k].item(),
+                "nav": float(result.rebalance_values[k]),
+                "cash": float(result.cash[k]),
+                "holdings": holdings,
+            })
+        return rows
+
+    @staticmethod
+    def save(db: Session, portfolio_id: int, hashes: List[str], result: BacktestResult):
+        """
+        Replace checkpoints from the first rebalance in result onward.
+        Runs in the caller's transaction.
+        """
+        first = int(result.source_index[0]) if len(result.source_index) else 0
+        db.execute(delete(backtest_checkpoints).where(
+            backtest_checkpoints.c.portfolio_id == portfolio_id,
+            backtest_checkpoints.c.snapshot_index >= first
+        ))
+        rows = BacktestCheckpointService.build_rows(portfolio_id, hashes, result)
+        if rows:
+            db.execute(backtest_checkpoints.insert(), rows)
+
+    @staticmethod
+    def replace_all(db: Session, portfolio_ids: List[int], rows: List[dict]):
+        """Swap every checkpoint of the given portfolios for built rows; runs in the caller's transaction"""
+        if not portfolio_ids:
+            return
+        db.execute(delete(backtest_checkpoints).where(backtest_checkpoints.c.portfolio_id.in_(portfolio_ids)))
+        if rows:
+            db.execute(backtest_checkpoints.insert(), rows)
+
+    @staticmethod
+    def get_latest(db: Session) -> Dict[int, Tuple[int, str]]:
+        """(snapshot_index, prefix_hash) of every portfolio's last checkpoint, in one read"""
+        latest = {}
+        for row in db.query(
+            BacktestCheckpoint.portfolio_id, BacktestCheckpoint.snapshot_index, BacktestCheckpoint.prefix_hash
+        ).order_by(BacktestCheckpoint.portfolio_id, BacktestCheckpoint.snapshot_index):
+            latest[row.portfolio_id] = (row.snapshot_index, row.prefix_hash)
+        return latest
+
+    @staticmethod
+    def get_last_many(db: Session, portfolio_ids: List[int]) -> Dict[int, BacktestCheckpoint]:
+        """Each portfolio's last checkpoint, in one DISTINCT ON read"""
+        rows = db.query(BacktestCheckpoint).filter(
+            BacktestCheckpoint.portfolio_id.in_(portfolio_ids)
+        ).order_by(
+            BacktestCheckpoint.portfolio_id, BacktestCheckpoint.snapshot_index.desc()
+        ).distinct(BacktestCheckpoint.portfolio_id).all()
+        return {row.portfolio_id: row for row in rows}
+
+    @staticmethod
+    def invalidate_from(db: Session, start_date: date, portfolio_ids: Optional[List[int]] = None) -> int:
+        """
+        Drop checkpoints priced on or after start_date, e.g. after a
+        historical backfill; only those of portfolio_ids, if given.
+        """
+        if portfolio_ids is not None and not portfolio_ids:
+            return 0
+        stmt = delete(backtest_checkpoints).where(backtest_checkpoints.c.trade_date >= start_date)
+        if portfolio_ids is not None:
+            stmt = stmt.where(backtest_checkpoints.c.portfolio_id.in_(portfolio_ids))
+        deleted = db.execute(stmt).rowcount
+        if deleted:
+            logger.info(f"🧹 Invalidated {deleted} backtest checkpoints from {start_date}")
+        return deleted
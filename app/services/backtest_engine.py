@@ -0,0 +1,441 @@
+"""
+Array-based rebalancing backtest.
+
+The engine is pure NumPy and knows nothing about the database: callers hand
+it an AllocationSchedule and a price matrix aligned to trading days (see
+PricePanelService.load_matrix) and get back shares, rebalance values and a
+daily equity curve.
+
+Valuation semantics:
+- A rebalance on date d trades at the last close on or before d.
+- Every rebalance sells everything and buys the new weights at those closes.
+- Weights are normalized to sum to 100%; weight that cannot be invested
+  (no price for the asset) is held as cash.
+- Held positions are valued at their last known close between rebalances.
+"""
+import enum
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.price_lookup import DEFAULT_MAX_GAP_DAYS, to_day, to_day_array
+
+# Weight sums further than this (in percentage points) from 100 are reported
+WEIGHT_SUM_TOLERANCE = 0.1
+
+
+class EngineMode(str, enum.Enum):
+    # Rebalance by rebalance, carrying NAV forward
+    SEQUENTIAL = "sequential"
+    # Per-period growth factors computed together, NAV by cumulative product
+    SEGMENTED = "segmented"
+
+
+@dataclass
+class AllocationSchedule:
+    """Target weights per rebalance: weights[k, j] is the fraction in symbols[j] from dates[k]"""
+    dates: np.ndarray
+    symbols: List[str]
+    weights: np.ndarray
+    # Position of each row in the caller's original list (skipped entries leave gaps)
+    source_index: np.ndarray
+    errors: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @classmethod
+    def from_allocations(cls, entries: Sequence[Tuple[date, Sequence[str], Sequence[float]]]) -> "AllocationSchedule":
+        """
+        Build a schedule from (date, assets, weights-in-percent) entries in date order.
+        Entries with missing or mismatched data are skipped with an error.
+        Weights are normalized to sum to 100, with an error when they were off
+        by more than WEIGHT_SUM_TOLERANCE.
+        """
+        errors = []
+        kept = []
+        for i, (on_date, assets, weights) in enumerate(entries):
+            if not assets or not weights:
+                errors.append(f"Rebalance {i+1}: Missing assets or weights")
+                continue
+            assets = [a.strip().upper() for a in assets]
+            weights = [float(w) for w in weights]
+            if len(assets) != len(weights):
+                errors.append(f"Rebalance {i+1}: Asset/weight count mismatch")
+                continue
+
+            weight_sum = sum(weights)
+            if abs(weight_sum - 100.0) > WEIGHT_SUM_TOLERANCE:
+                errors.append(f"Rebalance {i+1}: Weights sum to {weight_sum}%, not 100%")
+            if weight_sum <= 0:
+                continue
+            # Always invest the full value: "33.33, 33.33, 33.33" means thirds
+            weights = [w * 100.0 / weight_sum for w in weights]
+            kept.append((i, to_day(on_date), assets, weights))
+
+        symbols = sorted({a for _, _, assets, _ in kept for a in assets})
+        column = {s: j for j, s in enumerate(symbols)}
+        weight_matrix = np.zeros((len(kept), len(symbols)))
+        for k, (_, _, assets, weights) in enumerate(kept):
+            for asset, weight in zip(assets, weights):
+                # Repeated tickers in one row add up
+                weight_matrix[k, column[asset]] += weight / 100.0
+
+        return cls(
+            dates=np.array([d for _, d, _, _ in kept], dtype="datetime64[D]"),
+            symbols=symbols,
+            weights=weight_matrix,
+            source_index=np.array([i for i, _, _, _ in kept], dtype=np.int64),
+            errors=errors,
+        )
+
+    def shifted(self, days: int) -> "AllocationSchedule":
+        """The same schedule with every rebalance executed days later"""
+        return replace(self, dates=self.dates + np.timedelta64(days, "D"), errors=list(self.errors))
+
+
+@dataclass
+class ResumeState:
+    """Engine state right after a rebalance that was already simulated"""
+    # Index into the schedule of that rebalance
+    position: int
+    nav: float
+    # Per schedule symbol, in schedule order
+    shares: np.ndarray
+    cash: float
+    # Last known close per schedule symbol at that rebalance (NaN if none)
+    prices: np.ndarray
+
+
+@dataclass
+class BacktestResult:
+    starting_value: float
+    symbols: List[str]
+    # One entry per executed rebalance
+    rebalance_dates: np.ndarray
+    # Trading day each rebalance executed at, and its row in the price matrix
+    trade_dates: np.ndarray
+    rebalance_rows: np.ndarray
+    rebalance_values: np.ndarray
+    shares: np.ndarray
+    cash: np.ndarray
+    # Last known close per symbol at each rebalance (NaN if never priced)
+    prices: np.ndarray
+    source_index: np.ndarray
+    # Daily equity curve from the first rebalance to the last priced day
+    dates: np.ndarray
+    values: np.ndarray
+    # contributions[k, j]: dollar gain of symbols[j] from rebalance k to the
+    # next one (or the last curve day); each row sums to that period's change
+    contributions: np.ndarray
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def final_value(self) -> float:
+        if len(self.values):
+            return float(self.values[-1])
+        return float(self.starting_value)
+
+    @property
+    def total_return_percentage(self) -> float:
+        return (self.final_value - self.starting_value) / self.starting_value * 100
+
+    def scaled(self, starting_value: float) -> "BacktestResult":
+        """
+        The same run from a different starting value. Every amount is
+        linear in the starting value, so no re-simulation is needed.
+        """
+        factor = float(starting_value) / self.starting_value
+        return replace(
+            self,
+            starting_value=float(starting_value),
+            rebalance_values=self.rebalance_values * factor,
+            shares=self.shares * factor,
+            cash=self.cash * factor,
+            values=self.values * factor,
+            contributions=self.contributions * factor,
+            errors=list(self.errors),
+        )
+
+    def period_end_values(self) -> np.ndarray:
+        """Value at the end of each rebalance period: the next rebalance's value, then the final value"""
+        return np.append(self.rebalance_values[1:], self.final_value) if len(self.rebalance_values) else np.zeros(0)
+
+    def attribution(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (per_period, cumulative) contribution to return in %. per_period[k, j]
+        is relative to the value at rebalance k; cumulative[j] is relative to
+        the starting value, so it sums to total_return_percentage.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            per_period = np.where(
+                self.rebalance_values[:, None] != 0,
+                self.contributions / self.rebalance_values[:, None] * 100, 0.0
+            )
+        cumulative = self.contributions.sum(axis=0) / self.starting_value * 100
+        return per_period, cumulative
+
+    def daily_change(self) -> Tuple[float, float]:
+        """(amount, percentage) change between the last two curve points"""
+        if len(self.values) < 2 or self.values[-2] == 0:
+            return 0.0, 0.0
+        amount = float(self.values[-1] - self.values[-2])
+        return amount, amount / float(self.values[-2]) * 100
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Carry the last non-NaN value down each column"""
+    mask = np.isnan(values)
+    if not mask.any():
+        return values
+    idx = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = values[idx, np.arange(values.shape[1])]
+    return filled
+
+
+def _price_columns(schedule_symbols: List[str], price_symbols: List[str]) -> np.ndarray:
+    position = {s: j for j, s in enumerate(price_symbols)}
+    return np.array([position.get(s, -1) for s in schedule_symbols], dtype=np.int64)
+
+
+def run_backtest(schedule: AllocationSchedule, price_dates: np.ndarray, price_symbols: List[str],
+                 prices: np.ndarray, starting_value: float = 100000.0,
+                 max_gap_days: int = DEFAULT_MAX_GAP_DAYS,
+                 daily_curve: bool = True,
+                 resume: Optional[ResumeState] = None,
+                 mode: EngineMode = EngineMode.SEQUENTIAL) -> BacktestResult:
+    """
+    Simulate the schedule over an aligned price matrix.
+
+    prices[t, j] is the close of price_symbols[j] on price_dates[t] (NaN if
+    missing). Symbols in the schedule without a price column are treated as
+    never priced. With daily_curve=False only the rebalance values are
+    produced and the curve holds just the final day.
+
+    With resume, simulation continues from the state after rebalance
+    resume.position; the matrix then only needs to cover that rebalance's
+    trading day onward, and results start at that rebalance.
+
+    mode picks how rebalance NAVs are computed (see EngineMode); both give
+    the same results up to rounding.
+    """
+    price_dates = to_day_array(price_dates)
+    aligned, known = _align_prices(schedule, price_symbols, prices)
+    if resume is None:
+        last_known = forward_fill(aligned)
+    else:
+        # Seed the fill with closes known at the checkpoint, which may predate the matrix
+        last_known = forward_fill(np.vstack([resume.prices, aligned]))[1:]
+    return _simulate(schedule, price_dates, aligned, last_known, known, starting_value,
+                     max_gap_days, daily_curve, resume, mode)
+
+
+def run_backtest_batch(schedules: Sequence[AllocationSchedule], price_dates: np.ndarray,
+                       price_symbols: List[str], prices: np.ndarray, starting_value: float = 100000.0,
+                       max_gap_days: int = DEFAULT_MAX_GAP_DAYS,
+                       daily_curve: bool = True,
+                       mode: EngineMode = EngineMode.SEGMENTED) -> List[BacktestResult]:
+    """
+    Run several schedules over one shared price matrix. The matrix is
+    forward-filled once and each schedule takes its columns from it, so
+    the per-schedule cost is only the rebalance pass and the curve.
+    Results match run_backtest on each schedule.
+    """
+    price_dates = to_day_array(price_dates)
+    filled = forward_fill(prices)
+    results = []
+    for schedule in schedules:
+        aligned, known = _align_prices(schedule, price_symbols, prices)
+        last_known, _ = _align_prices(schedule, price_symbols, filled)
+        results.append(_simulate(schedule, price_dates, aligned, last_known, known, starting_value,
+                                 max_gap_days, daily_curve, mode=mode))
+    return results
+
+
+def _align_prices(schedule: AllocationSchedule, price_symbols: List[str],
+                  prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Prices laid out in schedule-symbol order (unknown symbols all-NaN) and the known-column mask"""
+    columns = _price_columns(schedule.symbols, price_symbols)
+    aligned = np.full((prices.shape[0], len(schedule.symbols)), np.nan)
+    known = columns >= 0
+    aligned[:, known] = prices[:, columns[known]]
+    return aligned, known
+
+
+def _simulate(schedule: AllocationSchedule, price_dates: np.ndarray, aligned: np.ndarray,
+              last_known: np.ndarray, known: np.ndarray, starting_value: float, max_gap_days: int,
+              daily_curve: bool, resume: Optional[ResumeState] = None,
+              mode: EngineMode = EngineMode.SEQUENTIAL) -> BacktestResult:
+    errors = list(schedule.errors)
+    n_symbols = len(schedule.symbols)
+    valuation = np.nan_to_num(last_known)
+
+    for j in np.flatnonzero(~known):
+        errors.append(f"No price data for {schedule.symbols[j]}")
+
+    # Trading row for each rebalance: last close on or before the date
+    rows = np.searchsorted(price_dates, schedule.dates, side="right") - 1
+    if resume is not None and rows[resume.position] < 0:
+        raise ValueError("Price matrix starts after the resume rebalance")
+
+    run = _run_segments if mode == EngineMode.SEGMENTED else _run_sequential
+    executed, shares, cash, rebalance_values = run(
+        schedule, price_dates, aligned, known, valuation, rows,
+        np.timedelta64(max_gap_days, "D"), starting_value, resume, errors
+    )
+
+    rebalance_rows = rows[executed]
+    rebalance_prices = last_known[rebalance_rows] if len(executed) else np.zeros((0, n_symbols))
+    # Each period's holdings repriced from its trading day to where the next period starts
+    end_rows = np.append(rebalance_rows[1:], len(price_dates) - 1) if len(executed) else rebalance_rows
+    contributions = shares * (valuation[end_rows] - valuation[rebalance_rows])
+
+    if len(executed) == 0:
+        curve_dates = np.array([], dtype="datetime64[D]")
+        curve_values = np.array([])
+    elif daily_curve:
+        curve_rows = np.arange(rebalance_rows[0], len(price_dates))
+        curve_dates, curve_values = price_dates[curve_rows], _segment_values(
+            curve_rows, rebalance_rows, shares, cash, valuation
+        )
+    else:
+        last = np.array([len(price_dates) - 1])
+        curve_dates, curve_values = price_dates[last], _segment_values(
+            last, rebalance_rows, shares, cash, valuation
+        )
+
+    return BacktestResult(
+        starting_value=float(starting_value),
+        symbols=list(schedule.symbols),
+        rebalance_dates=schedule.dates[executed],
+        trade_dates=price_dates[rebalance_rows],
+        rebalance_rows=rebalance_rows,
+        rebalance_values=rebalance_values,
+        shares=shares,
+        cash=cash,
+        prices=rebalance_prices,
+        source_index=schedule.source_index[executed],
+        dates=curve_dates,
+        values=curve_values,
+        contributions=contributions,
+        errors=errors,
+    )
+
+
+def _run_sequential(schedule: AllocationSchedule, price_dates: np.ndarray, aligned: np.ndarray,
+                    known: np.ndarray, valuation: np.ndarray, rows: np.ndarray, max_gap: np.timedelta64,
+                    starting_value: float, resume: Optional[ResumeState], errors: List[str]):
+    """Rebalance by rebalance, carrying NAV forward; returns (executed, shares, cash, values)"""
+    n_symbols = len(schedule.symbols)
+    executed = []
+    shares = np.zeros((len(schedule), n_symbols))
+    cash = np.zeros(len(schedule))
+    rebalance_values = np.zeros(len(schedule))
+    current_shares = np.zeros(n_symbols)
+    current_cash = float(starting_value)
+    first = 0
+
+    if resume is not None:
+        current_shares = np.asarray(resume.shares, dtype=np.float64)
+        current_cash = float(resume.cash)
+        shares[resume.position] = current_shares
+        cash[resume.position] = current_cash
+        rebalance_values[resume.position] = resume.nav
+        executed.append(resume.position)
+        first = resume.position + 1
+
+    for k in range(first, len(schedule)):
+        label = f"Rebalance {schedule.source_index[k] + 1}"
+        row = rows[k]
+        if row < 0 or schedule.dates[k] - price_dates[row] > max_gap:
+            errors.append(f"{label}: No prices near {schedule.dates[k]}")
+            continue
+
+        # Sell everything at today's closes
+        nav = float(current_shares @ valuation[row]) + current_cash
+
+        # Buy the new weights where a current close exists; the rest stays cash
+        weights = schedule.weights[k]
+        trade_prices = aligned[row]
+        tradable = (weights > 0) & ~np.isnan(trade_prices)
+        for j in np.flatnonzero((weights > 0) & ~tradable):
+            if known[j]:
+                errors.append(f"{label}: No price for {schedule.symbols[j]} near {schedule.dates[k]}")
+
+        new_shares = np.zeros(n_symbols)
+        new_shares[tradable] = nav * weights[tradable] / trade_prices[tradable]
+        current_shares = new_shares
+        current_cash = nav * (1.0 - weights[tradable].sum())
+
+        shares[k] = current_shares
+        cash[k] = current_cash
+        rebalance_values[k] = nav
+        executed.append(k)
+
+    executed = np.array(executed, dtype=np.int64)
+    return executed, shares[executed], cash[executed], rebalance_values[executed]
+
+
+def _run_segments(schedule: AllocationSchedule, price_dates: np.ndarray, aligned: np.ndarray,
+                  known: np.ndarray, valuation: np.ndarray, rows: np.ndarray, max_gap: np.timedelta64,
+                  starting_value: float, resume: Optional[ResumeState], errors: List[str]):
+    """
+    All rebalance periods at once. Each period holds fixed shares per
+    dollar of the NAV it starts with, so its growth factor depends only on
+    its weights and prices; NAVs are the cumulative product of those
+    factors. Same results and errors as _run_sequential.
+    """
+    n_symbols = len(schedule.symbols)
+    first = resume.position + 1 if resume is not None else 0
+    candidates = np.arange(first, len(schedule))
+    candidate_rows = rows[candidates]
+    valid = candidate_rows >= 0
+    valid[valid] = schedule.dates[candidates[valid]] - price_dates[candidate_rows[valid]] <= max_gap
+
+    weights = schedule.weights[candidates]
+    trade_prices = aligned[np.clip(candidate_rows, 0, None)] if len(aligned) else np.full(weights.shape, np.nan)
+    tradable = (weights > 0) & ~np.isnan(trade_prices)
+    missing = (weights > 0) & ~tradable & known & valid[:, None]
+    for i in np.flatnonzero(~valid | missing.any(axis=1)):
+        k = candidates[i]
+        label = f"Rebalance {schedule.source_index[k] + 1}"
+        if not valid[i]:
+            errors.append(f"{label}: No prices near {schedule.dates[k]}")
+            continue
+        for j in np.flatnonzero(missing[i]):
+            errors.append(f"{label}: No price for {schedule.symbols[j]} near {schedule.dates[k]}")
+
+    # Shares bought and cash kept per dollar of NAV in each period
+    executed = candidates[valid]
+    tradable = tradable[valid]
+    invested = np.where(tradable, weights[valid], 0.0)
+    units = invested / np.where(tradable, trade_prices[valid], 1.0)
+    cash_fraction = 1.0 - invested.sum(axis=1)
+    start_nav = float(starting_value)
+
+    if resume is not None:
+        nav = float(resume.nav)
+        resume_units = np.asarray(resume.shares, dtype=np.float64) / nav if nav else np.zeros(n_symbols)
+        units = np.vstack([resume_units, units])
+        cash_fraction = np.concatenate(([resume.cash / nav if nav else 1.0], cash_fraction))
+        executed = np.concatenate(([resume.position], executed))
+        start_nav = nav
+
+    if len(executed) == 0:
+        return executed, np.zeros((0, n_symbols)), np.zeros(0), np.zeros(0)
+
+    # Growth of each period up to the next rebalance's trading day
+    period_rows = rows[executed]
+    growth = np.einsum("ij,ij->i", units[:-1], valuation[period_rows[1:]]) + cash_fraction[:-1]
+    navs = start_nav * np.concatenate(([1.0], np.cumprod(growth)))
+    return executed, units * navs[:, None], cash_fraction * navs, navs
+
+
+def _segment_values(curve_rows: np.ndarray, rebalance_rows: np.ndarray, shares: np.ndarray,
+                    cash: np.ndarray, valuation: np.ndarray) -> np.ndarray:
+    """Portfolio value on each row using the holdings of the rebalance in force"""
+    segment = np.searchsorted(rebalance_rows, curve_rows, side="right") - 1
+    return np.einsum("ij,ij->i", shares[segment], valuation[curve_rows]) + cash[segment]
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.portfolio import Portfolio
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.backtest_engine import AllocationSchedule, BacktestResult, ResumeState, run_backtest
+from app.services.backtest_checkpoint_service import BacktestCheckpointService
+from app.services.performance_service import PerformanceService
+from app.repositories.price_repository import PriceRepository
+from app.services.price_lookup import DEFAULT_MAX_GAP_DAYS, to_day_array
+from app.services.price_panel_service import PricePanelService, PriceMatrix
+from app.services.period_returns_service import PeriodReturnsService
+from app.services.risk_metrics_service import RiskMetricsService
+
+logger = logging.getLogger(__name__)
+
+# Starting value of portfolios without a cost basis
+DEFAULT_STARTING_VALUE = 100000.0
+
+
+class BacktestService:
+    """Loads snapshots and prices for the backtest engine and stores its results"""
+
+    @staticmethod
+    def get_snapshots(db: Session, portfolio_id: int) -> List[PortfolioSnapshot]:
+        return db.query(PortfolioSnapshot).filter(
+            PortfolioSnapshot.portfolio_id == portfolio_id
+        ).order_by(PortfolioSnapshot.snapshot_date).all()
+
+    @staticmethod
+    def starting_value(portfolio) -> float:
+        """What a stored recalculation of the portfolio (or a row with its total_cost_basis) starts from"""
+        return portfolio.total_cost_basis or DEFAULT_STARTING_VALUE
+
+    @staticmethod
+    def build_schedule(snapshots: List[PortfolioSnapshot]) -> AllocationSchedule:
+        """Allocation schedule from snapshots sorted by date"""
+        return AllocationSchedule.from_allocations([
+            (snapshot.snapshot_date, snapshot.symbol_list, snapshot.weight_list) for snapshot in snapshots
+        ])
+
+    @staticmethod
+    def load_prices(db: Session, schedule: AllocationSchedule, end_date=None,
+                    start_position: int = 0) -> PriceMatrix:
+        """Aligned prices from a week before rebalance start_position through end_date"""
+        start_date = schedule.dates[start_position].item() - timedelta(days=DEFAULT_MAX_GAP_DAYS)
+        end_date = end_date or datetime.now().date()
+        return PricePanelService.load_matrix(db, schedule.symbols, start_date, end_date)
+
+    @staticmethod
+    def load_as_of_prices(db: Session, schedule: AllocationSchedule, end_date=None,
+                          start_position: int = 0) -> PriceMatrix:
+        """
+        Prices at the rebalance dates from start_position and at end_date only,
+        one LATERAL probe per (symbol, date). Each row is dated at the latest
+        trading day among its closes, so the engine sees the same trade dates
+        as with the full panel.
+        """
+        end_date = end_date or datetime.now().date()
+        as_of_dates = np.unique(np.append(schedule.dates[start_position:], np.datetime64(end_date, "D")))
+        symbols = list(schedule.symbols)
+        rows = PriceRepository.fetch_as_of_closes(db, symbols, as_of_dates.tolist(), DEFAULT_MAX_GAP_DAYS)
+
+        values = np.full((len(as_of_dates), len(symbols)), np.nan)
+        trade_days = np.full(len(as_of_dates), np.iinfo(np.int64).min)
+        if rows:
+            column = {symbol: j for j, symbol in enumerate(symbols)}
+            row_idx = np.searchsorted(as_of_dates, to_day_array([row[1] for row in rows]))
+            col_idx = np.fromiter((column[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+            values[row_idx, col_idx] = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+            np.maximum.at(trade_days, row_idx, to_day_array([row[2] for row in rows]).astype(np.int64))
+
+        # Drop dates with no closes at all; dates sharing a trading day carry identical prices
+        priced = trade_days != np.iinfo(np.int64).min
+        dates, first = np.unique(trade_days[priced].astype("datetime64[D]"), return_index=True)
+        return PriceMatrix(dates, symbols, values[priced][first])
+
+    @staticmethod
+    def run_schedule(db: Session, schedule: AllocationSchedule, starting_value: float,
+                     daily_curve: bool = True, resume: Optional[ResumeState] = None) -> BacktestResult:
+        """
+        Run the engine without writing anything. Without a daily curve only
+        rebalance-date prices are read; with resume only prices from the
+        resumed rebalance onward.
+        """
+        if len(schedule) == 0:
+            return run_backtest(schedule, np.array([], dtype="datetime64[D]"), [], np.zeros((0, 0)), starting_value)
+        start_position = resume.position if resume else 0
+        if daily_curve:
+            prices = BacktestService.load_prices(db, schedule, start_position=start_position)
+        else:
+            prices = BacktestService.load_as_of_prices(db, schedule, start_position=start_position)
+        return run_backtest(schedule, prices.dates, prices.symbols, prices.values, starting_value,
+                            daily_curve=daily_curve, resume=resume)
+
+    @staticmethod
+    def run(db: Session, snapshots: List[PortfolioSnapshot], starting_value: float,
+            daily_curve: bool = True) -> BacktestResult:
+        """Run the engine over a full snapshot history without writing anything"""
+        return BacktestService.run_schedule(db, BacktestService.build_schedule(snapshots), starting_value, daily_curve)
+
+    @staticmethod
+    def store_results(db: Session, portfolio: Portfolio, snapshots: List[PortfolioSnapshot],
+                      result: BacktestResult):
+        """Write rebalance values to snapshots and the latest curve point to the portfolio"""
+        for snapshot_pos, value in zip(result.source_index.tolist(), result.rebalance_values.tolist()):
+            snapshots[snapshot_pos].total_value = value
+
+        if len(result.values):
+            portfolio.total_value = result.final_value
+            portfolio.total_cost_basis = result.starting_value
+            portfolio.total_return_amount = result.final_value - result.starting_value
+            portfolio.total_return_percentage = result.total_return_percentage
+        if len(result.values) >= 2:
+            # Rebalance-only runs have no previous day to compare against
+            daily_amount, daily_percentage = result.daily_change()
+            portfolio.daily_return_amount = daily_amount
+            portfolio.daily_return_percentage = daily_percentage
+        portfolio.last_calculated = datetime.now()
+
+    @staticmethod
+    def recalculate_portfolio(db: Session, portfolio: Portfolio, starting_value: float,
+                              snapshots: Optional[List[PortfolioSnapshot]] = None,
+                              daily_curve: bool = True,
+                              full_replay: bool = False,
+                              progress: Optional[Callable[[float, str], None]] = None) -> Tuple[BacktestResult, int]:
+        """
+        Recompute and persist a portfolio's values, resuming from the last
+        checkpoint whose snapshot history is unchanged unless full_replay.
+        progress, if given, is called with (fraction done, stage).
+        Returns (result, rebalances_calculated).
+        """
+        progress = progress or (lambda fraction, stage: None)
+        if snapshots is None:
+            snapshots = BacktestService.get_snapshots(db, portfolio.id)
+        if not snapshots:
+            raise ValueError("No snapshots found for this portfolio")
+
+        schedule = BacktestService.build_schedule(snapshots)
+        hashes = BacktestCheckpointService.prefix_hashes(snapshots, starting_value)
+        resume = None
+        if not full_replay:
+            resume = BacktestCheckpointService.find_resume_state(db, portfolio.id, schedule, hashes)
+
+        progress(0.1, "Loading prices and simulating")
+        result = BacktestService.run_schedule(db, schedule, starting_value, daily_curve, resume)
+        progress(0.7, "Saving results")
+        BacktestService.store_results(db, portfolio, snapshots, result)
+        if daily_curve:
+            PerformanceService.store_curve(db, portfolio.id, result, resumed=resume is not None)
+            db.flush()
+            RiskMetricsService.refresh(db, portfolio)
+            PeriodReturnsService.refresh(db, portfolio.id)
+            # Checkpoints vouch for the stored curve up to them, so only a
+            # run that rewrote the curve may save them
+            BacktestCheckpointService.save(db, portfolio.id, hashes, result)
+        db.commit()
+        progress(1.0, "Done")
+
+        resumed_from = f", resumed at rebalance {result.source_index[0] + 1}" if resume else ""
+        logger.info(
+            f"Portfolio {portfolio.id}: {len(result.rebalance_values)} rebalances{resumed_from}, "
+            f"final value ${result.final_value:,.2f} ({result.total_return_percentage:.2f}%)"
+        )
+        return result, len(result.rebalance_values)
@@ -0,0 +1,123 @@
+import logging
+from datetime import date, datetime
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.services.price_lookup import align_to_calendar, to_day, to_day_array
+from app.services.price_panel_service import PANEL_MAX_STALENESS_DAYS, PricePanelService
+from app.services.price_watermark_service import PriceWatermarkService
+from app.services.risk_metrics import BENCHMARK_SYMBOL, RelativeMetrics, relative_metrics
+from app.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BENCHMARKS = (BENCHMARK_SYMBOL, "QQQ", "AOR", "60/40")
+MAX_BENCHMARKS = 20
+# Blends of ETFs, rebalanced daily to these weights
+COMPOSITE_BENCHMARKS = {
+    "60/40": (("SPY", 0.6), ("AGG", 0.4)),
+}
+# Benchmark histories are loaded whole from here, once per price watermark
+HISTORY_START = date(1990, 1, 1)
+SERIES_CACHE_SIZE = 500
+SERIES_CACHE_TTL_SECONDS = 6 * 3600
+
+# (symbol, watermark token) -> (dates, closes); shared by every portfolio
+_series_cache = TTLCache(maxsize=SERIES_CACHE_SIZE, ttl=SERIES_CACHE_TTL_SECONDS)
+
+
+class BenchmarkService:
+    """Benchmark price series, cached process-wide, and portfolio comparisons against them"""
+
+    @staticmethod
+    def components(name: str) -> Tuple[Tuple[str, float], ...]:
+        """(symbol, weight) pairs making up a benchmark; a plain ticker is itself at weight 1"""
+        name = name.strip().upper()
+        return COMPOSITE_BENCHMARKS.get(name, ((name, 1.0),))
+
+    @staticmethod
+    def get_series(db: Session, symbols: Sequence[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Full close history per symbol as (dates, closes). Keys include the
+        ingestion watermark, so new prices are picked up on the next call
+        and symbols already cached cost no query.
+        """
+        symbols = sorted({symbol.strip().upper() for symbol in symbols})
+        watermarks = PriceWatermarkService.get_watermarks(db, symbols)
+        series = {}
+        missing = []
+        for symbol in symbols:
+            cached = _series_cache.get((symbol, watermarks[symbol].token))
+            if cached is None:
+                missing.append(symbol)
+            else:
+                series[symbol] = cached
+
+        if missing:
+            prices = PricePanelService.load_matrix(db, missing, HISTORY_START, datetime.now().date())
+            for symbol in missing:
+                closes = prices.column(symbol)
+                priced = ~np.isnan(closes)
+                series[symbol] = (prices.dates[priced], closes[priced])
+                _series_cache.set((symbol, watermarks[symbol].token), series[symbol])
+            logger.info(f"📊 Loaded benchmark history for {', '.join(missing)}")
+        return series
+
+    @staticmethod
+    def load_aligned(db: Session, symbols: Sequence[str], dates: np.ndarray) -> np.ndarray:
+        """Closes aligned to the given trading days, one column per symbol (NaN where unknown)"""
+        dates = to_day_array(dates)
+        symbols = [symbol.strip().upper() for symbol in symbols]
+        series = BenchmarkService.get_series(db, symbols)
+        aligned = np.full((len(dates), len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            series_dates, closes = series[symbol]
+            aligned[:, j], _ = align_to_calendar(dates, series_dates, closes, PANEL_MAX_STALENESS_DAYS)
+        return aligned
+
+    @staticmethod
+    def daily_returns(db: Session, names: Sequence[str], dates: np.ndarray) -> np.ndarray:
+        """
+        (len(dates) - 1, K) daily returns of each named benchmark between
+        consecutive days. Composites combine component returns by weight,
+        so a missing component day leaves the composite day unknown.
+        """
+        parts = [BenchmarkService.components(name) for name in names]
+        symbols = sorted({symbol for components in parts for symbol, _ in components})
+        closes = BenchmarkService.load_aligned(db, symbols, dates)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            symbol_returns = closes[1:] / closes[:-1] - 1.0
+
+        # One weight column per benchmark, so every blend is a single product
+        weights = np.zeros((len(symbols), len(names)))
+        for k, components in enumerate(parts):
+            for symbol, weight in components:
+                weights[symbols.index(symbol), k] = weight
+        used = weights != 0
+        known = np.isfinite(symbol_returns)
+        blended = np.nan_to_num(symbol_returns) @ weights
+        # A benchmark day is known only if all its components are
+        complete = (~known).astype(np.int64) @ used.astype(np.int64) == 0
+        return np.where(complete, blended, np.nan)
+
+    @staticmethod
+    def compare(db: Session, dates: np.ndarray, values: np.ndarray,
+                names: Sequence[str] = DEFAULT_BENCHMARKS) -> RelativeMetrics:
+        """Relative metrics of a daily value curve against each named benchmark"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < 2:
+            raise ValueError("Need at least two curve days to compare against benchmarks")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = values[1:] / values[:-1] - 1.0
+        return relative_metrics(returns, BenchmarkService.daily_returns(db, names, dates))
+
+    @staticmethod
+    def cumulative_returns(db: Session, first_day: date, dates: np.ndarray,
+                           symbol: str = BENCHMARK_SYMBOL) -> np.ndarray:
+        """Return in % of symbol from first_day's close to each day's close (NaN where unknown)"""
+        days = np.concatenate(([to_day(first_day)], to_day_array(dates)))
+        closes = BenchmarkService.load_aligned(db, [symbol], days)[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (closes[1:] / closes[0] - 1.0) * 100
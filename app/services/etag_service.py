@@ -0,0 +1,66 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+# Price history is the same for every user and changes at most once a day
+PUBLIC_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+# Portfolio data is per-user, so only the browser may keep a copy
+PRIVATE_CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+
+class ETagService:
+
+    @staticmethod
+    def build_etag(*parts) -> str:
+        """Build a strong ETag from watermark tokens and query parameters"""
+        digest = hashlib.sha1("|".join("" if p is None else str(p) for p in parts).encode("utf-8"))
+        return f'"{digest.hexdigest()}"'
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+        """Evaluate If-None-Match (preferred) or If-Modified-Since against the current validators"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            if "*" in candidates:
+                return True
+            # Weak comparison is allowed for GET revalidation
+            return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return ETagService._to_utc(last_modified).replace(microsecond=0) <= since
+
+        return False
+
+    @staticmethod
+    def apply_headers(response: Response, etag: str, last_modified: Optional[datetime] = None,
+                      cache_control: str = PUBLIC_CACHE_CONTROL):
+        """Attach validators and caching policy to a response"""
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+        if last_modified:
+            response.headers["Last-Modified"] = format_datetime(ETagService._to_utc(last_modified), usegmt=True)
+
+    @staticmethod
+    def not_modified_response(etag: str, last_modified: Optional[datetime] = None,
+                              cache_control: str = PUBLIC_CACHE_CONTROL) -> Response:
+        """Empty 304 carrying the same validators as a full response"""
+        response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        ETagService.apply_headers(response, etag, last_modified, cache_control)
+        return response
+
+    @staticmethod
+    def _to_utc(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
@@ -0,0 +1,50 @@
+"""
+Daily valuation of holdings-based portfolios.
+
+Pure NumPy, no database access. Holdings are fixed quantities bought on
+their purchase dates at their average cost; the portfolio holds nothing
+before its first purchase and never sells. Each holding is valued at its
+last known close, or at its average cost until the symbol has a price.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from app.services.backtest_engine import forward_fill
+from app.services.price_lookup import to_day_array
+
+
+class HoldingsCurve(NamedTuple):
+    dates: np.ndarray
+    values: np.ndarray
+    # Money put in so far: quantity x average cost of holdings already bought
+    cost_basis: np.ndarray
+    # Last close used for each holding on the final day (its cost if never priced)
+    last_prices: np.ndarray
+
+
+def holdings_curve(price_dates: np.ndarray, prices: np.ndarray, quantities: np.ndarray,
+                   average_costs: np.ndarray, purchase_dates: np.ndarray) -> HoldingsCurve:
+    """
+    Value of the holdings on every trading day from the first purchase.
+    prices[t, h] is holding h's close on price_dates[t] (NaN if missing);
+    a holding bought on a non-trading day counts from the next trading day.
+    """
+    price_dates = to_day_array(price_dates)
+    purchase_dates = to_day_array(purchase_dates)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    average_costs = np.asarray(average_costs, dtype=np.float64)
+    if len(quantities) == 0 or len(price_dates) == 0:
+        return HoldingsCurve(np.array([], dtype="datetime64[D]"), np.array([]), np.array([]), average_costs)
+
+    first = np.searchsorted(price_dates, purchase_dates.min(), side="left")
+    dates = price_dates[first:]
+    # Closes before the first purchase still seed the forward fill
+    closes = forward_fill(np.asarray(prices, dtype=np.float64))[first:]
+    closes = np.where(np.isnan(closes), average_costs, closes)
+
+    held = dates[:, None] >= purchase_dates[None, :]
+    values = (closes * held) @ quantities
+    cost_basis = held.astype(np.float64) @ (quantities * average_costs)
+    last_prices = closes[-1] if len(dates) else average_costs
+    return HoldingsCurve(dates, values, cost_basis, last_prices)
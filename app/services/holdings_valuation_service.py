@@ -0,0 +1,243 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import case, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.holding import Holding
+from app.models.latest_price import LatestPrice
+from app.models.portfolio import Portfolio
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.benchmark_service import BenchmarkService
+from app.services.holdings_valuation import holdings_curve
+from app.services.performance_service import PerformanceService
+from app.services.period_returns_service import PeriodReturnsService
+from app.services.price_lookup import DEFAULT_MAX_GAP_DAYS
+from app.services.price_panel_service import PriceMatrix, PricePanelService
+from app.services.risk_metrics import RiskState
+from app.services.risk_metrics_service import RiskMetricsService
+
+logger = logging.getLogger(__name__)
+
+holdings_table = Holding.__table__
+latest_prices_table = LatestPrice.__table__
+portfolios_table = Portfolio.__table__
+snapshots_table = PortfolioSnapshot.__table__
+
+
+class HoldingsValuationService:
+    """Daily curves and current prices for portfolios built from holdings rather than snapshots"""
+
+    @staticmethod
+    def load_holdings(db: Session, portfolio_ids: Optional[List[int]] = None) -> list:
+        """(id, portfolio_id, symbol, quantity, average_cost, purchase_date) rows in one query"""
+        query = db.query(
+            Holding.id, Holding.portfolio_id, Holding.symbol,
+            Holding.quantity, Holding.average_cost, Holding.purchase_date
+        )
+        if portfolio_ids is not None:
+            query = query.filter(Holding.portfolio_id.in_(portfolio_ids))
+        return query.order_by(Holding.portfolio_id, Holding.id).all()
+
+    @staticmethod
+    def apply_prices(db: Session, holdings: list, prices: np.ndarray) -> int:
+        """
+        Write current_price and the columns derived from it for many
+        holdings in one bulk UPDATE; NaN prices leave a holding untouched.
+        Runs in the caller's transaction; returns holdings updated.
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        priced = ~np.isnan(prices)
+        if not priced.any():
+            return 0
+        quantities = np.array([h.quantity for h in holdings], dtype=np.float64)[priced]
+        cost_basis = quantities * np.array([h.average_cost for h in holdings], dtype=np.float64)[priced]
+        current_value = quantities * prices[priced]
+        gain = current_value - cost_basis
+        with np.errstate(divide="ignore", invalid="ignore"):
+            gain_pct = np.where(cost_basis > 0, gain / cost_basis * 100, 0.0)
+
+        now = datetime.now()
+        ids = [h.id for h, ok in zip(holdings, priced.tolist()) if ok]
+        db.execute(update(Holding), [
+            {
+                "id": holding_id,
+                "current_price": price,
+                "total_cost_basis": basis,
+                "current_value": value,
+                "unrealized_gain_loss": g,
+                "unrealized_return_percentage": gp,
+                "last_price_update": now,
+            }
+            for holding_id, price, basis, value, g, gp in zip(
+                ids, prices[priced].tolist(), cost_basis.tolist(), current_value.tolist(),
+                gain.tolist(), gain_pct.tolist()
+            )
+        ])
+        return len(ids)
+
+    @staticmethod
+    def refresh_current_prices(db: Session, portfolio_ids: Optional[List[int]] = None) -> int:
+        """
+        Reprice holdings (all, or those of the given portfolios) from
+        latest_prices with one UPDATE ... FROM, then recompute the affected
+        portfolios' totals with one aggregate UPDATE. Holdings whose price
+        has not moved are not rewritten. Commits; returns holdings updated.
+        """
+        price = latest_prices_table.c.adjusted_close
+        cost_basis = holdings_table.c.quantity * holdings_table.c.average_cost
+        current_value = holdings_table.c.quantity * price
+        stmt = update(holdings_table).where(
+            holdings_table.c.symbol == latest_prices_table.c.symbol,
+            holdings_table.c.current_price.is_distinct_from(price)
+        ).values(
+            current_price=price,
+            total_cost_basis=cost_basis,
+            current_value=current_value,
+            unrealized_gain_loss=current_value - cost_basis,
+            unrealized_return_percentage=case(
+                (cost_basis > 0, (current_value - cost_basis) / cost_basis * 100), else_=0.0
+            ),
+            last_price_update=func.now(),
+        )
+        if portfolio_ids is not None:
+            stmt = stmt.where(holdings_table.c.portfolio_id.in_(portfolio_ids))
+        updated = db.execute(stmt).rowcount
+
+        refreshed = HoldingsValuationService.refresh_totals(db, portfolio_ids)
+        db.commit()
+        logger.info(f"💲 Repriced {updated} holdings; totals refreshed for {refreshed} portfolios")
+        return updated
+
+    @staticmethod
+    def refresh_totals(db: Session, portfolio_ids: Optional[List[int]] = None) -> int:
+        """
+        Set portfolio totals from the sums of their holdings in one
+        aggregate UPDATE. With portfolio_ids, those portfolios (a portfolio
+        with no holdings left goes to zero); without, every portfolio with
+        holdings and no snapshots, since snapshot portfolios are valued by
+        the backtest. Runs in the caller's transaction; returns portfolios updated.
+        """
+        value = func.coalesce(func.sum(holdings_table.c.current_value), 0.0)
+        cost_basis = func.coalesce(func.sum(holdings_table.c.total_cost_basis), 0.0)
+        totals = select(
+            portfolios_table.c.id.label("portfolio_id"),
+            value.label("total_value"),
+            cost_basis.label("total_cost_basis")
+        ).select_from(
+            portfolios_table.outerjoin(holdings_table, holdings_table.c.portfolio_id == portfolios_table.c.id)
+        ).group_by(portfolios_table.c.id)
+        if portfolio_ids is not None:
+            totals = totals.where(portfolios_table.c.id.in_(portfolio_ids))
+        else:
+            totals = totals.where(
+                holdings_table.c.id.isnot(None),
+                ~exists().where(snapshots_table.c.portfolio_id == portfolios_table.c.id)
+            )
+        totals = totals.subquery()
+
+        gain = totals.c.total_value - totals.c.total_cost_basis
+        return db.execute(update(portfolios_table).where(
+            portfolios_table.c.id == totals.c.portfolio_id
+        ).values(
+            total_value=totals.c.total_value,
+            total_cost_basis=totals.c.total_cost_basis,
+            total_return_amount=gain,
+            total_return_percentage=case(
+                (totals.c.total_cost_basis > 0, gain / totals.c.total_cost_basis * 100), else_=0.0
+            ),
+            last_calculated=func.now(),
+        )).rowcount
+
+    @staticmethod
+    def value_portfolio(db: Session, portfolio: Portfolio, holdings: list, prices: PriceMatrix) -> int:
+        """
+        Build and store the daily curve of one portfolio's holdings from a
+        price matrix covering them, then update its totals, risk metrics,
+        period returns and holding prices. Runs in the caller's transaction;
+        returns curve rows written.
+        """
+        columns = [prices.symbols.index(h.symbol.upper()) for h in holdings]
+        curve = holdings_curve(
+            prices.dates, prices.values[:, columns],
+            [h.quantity for h in holdings], [h.average_cost for h in holdings],
+            [h.purchase_date for h in holdings]
+        )
+        if not len(curve.values):
+            return 0
+
+        sp500_returns = BenchmarkService.cumulative_returns(db, curve.dates[0].item(), curve.dates)
+        rows = PerformanceService.build_rows(portfolio.id, curve.dates, curve.values, curve.cost_basis,
+                                             sp500_returns=sp500_returns)
+        PerformanceService.replace_rows(db, portfolio.id, rows)
+
+        # Purchases are deposits, not gains: risk and period returns follow the flow-adjusted index
+        index = np.cumprod([1.0 + row["daily_return_percentage"] / 100 for row in rows])
+        state = RiskState.from_curve(index, RiskMetricsService.load_benchmark(db, curve.dates))
+        RiskMetricsService.apply(portfolio, state)
+        PeriodReturnsService.upsert_rows(db, [PeriodReturnsService.build_row(portfolio.id, curve.dates, index)])
+
+        HoldingsValuationService.apply_prices(db, holdings, curve.last_prices)
+        last = rows[-1]
+        portfolio.total_value = last["total_value"]
+        portfolio.total_cost_basis = last["total_cost_basis"]
+        portfolio.total_return_amount = last["total_return_amount"]
+        portfolio.total_return_percentage = last["total_return_percentage"]
+        portfolio.daily_return_amount = last["daily_return_amount"]
+        portfolio.daily_return_percentage = last["daily_return_percentage"]
+        portfolio.last_calculated = datetime.now()
+        return len(rows)
+
+    @staticmethod
+    def load_prices(db: Session, holdings: list) -> PriceMatrix:
+        """One aligned matrix for every symbol the holdings need, from the earliest purchase"""
+        start = min(h.purchase_date for h in holdings)
+        start = (start.date() if isinstance(start, datetime) else start) - timedelta(days=DEFAULT_MAX_GAP_DAYS)
+        return PricePanelService.load_matrix(db, sorted({h.symbol.upper() for h in holdings}),
+                                             start, datetime.now().date())
+
+    @staticmethod
+    def recalculate(db: Session, portfolio: Portfolio) -> int:
+        """Rebuild one holdings portfolio's curve and totals and commit; returns curve rows"""
+        holdings = HoldingsValuationService.load_holdings(db, [portfolio.id])
+        if not holdings:
+            raise ValueError("No holdings found for this portfolio")
+        written = HoldingsValuationService.value_portfolio(
+            db, portfolio, holdings, HoldingsValuationService.load_prices(db, holdings)
+        )
+        db.commit()
+        return written
+
+    @staticmethod
+    def recalculate_all(db: Session) -> int:
+        """
+        Revalue every portfolio that has holdings but no snapshots (snapshot
+        portfolios are valued by the backtest) from one shared price matrix.
+        Returns portfolios updated.
+        """
+        holdings = HoldingsValuationService.load_holdings(db)
+        snapshot_portfolios = {row[0] for row in db.query(PortfolioSnapshot.portfolio_id).distinct()}
+        by_portfolio: Dict[int, list] = defaultdict(list)
+        for holding in holdings:
+            if holding.portfolio_id not in snapshot_portfolios:
+                by_portfolio[holding.portfolio_id].append(holding)
+        if not by_portfolio:
+            return 0
+
+        prices = HoldingsValuationService.load_prices(db, [h for items in by_portfolio.values() for h in items])
+        portfolios = db.query(Portfolio).filter(Portfolio.id.in_(list(by_portfolio))).all()
+        updated = 0
+        for portfolio in portfolios:
+            try:
+                if HoldingsValuationService.value_portfolio(db, portfolio, by_portfolio[portfolio.id], prices):
+                    updated += 1
+                db.commit()
+            except Exception as e:
+                logger.error(f"  ❌ Could not value holdings of portfolio {portfolio.id}: {e}")
+                db.rollback()
+
+        logger.info(f"💼 Valued {updated}/{len(portfolios)} holdings portfolios")
+        return updated
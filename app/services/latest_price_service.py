@@ -0,0 +1,117 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import Dict, List, NamedTuple, Optional
+from datetime import date, datetime
+
+from app.models.latest_price import LatestPrice
+from app.services.price_watermark_service import PriceWatermarkService
+from app.services.ttl_cache import TTLCache
+
+LATEST_PRICE_TTL_SECONDS = 60
+
+_latest_price_cache = TTLCache(maxsize=20000, ttl=LATEST_PRICE_TTL_SECONDS)
+
+# Recompute latest_prices rows for a set of symbols from their two most
+# recent asset_prices rows. Runs inside the caller's write transaction.
+REFRESH_LATEST_PRICES_SQL = text("""
+    INSERT INTO latest_prices (symbol, date, close_price, adjusted_close,
+                               previous_close, daily_change, daily_change_percentage, updated_at)
+    SELECT cur.symbol, cur.date, cur.close_price, cur.adjusted_close,
+           prev.adjusted_close,
+           cur.adjusted_close - prev.adjusted_close,
+           CASE WHEN prev.adjusted_close > 0
+                THEN (cur.adjusted_close / prev.adjusted_close - 1) * 100 END,
+           now()
+    FROM unnest(CAST(:symbols AS text[])) AS s(symbol)
+    CROSS JOIN LATERAL (
+        SELECT symbol, date, close_price, adjusted_close
+        FROM asset_prices a
+        WHERE a.symbol = s.symbol
+        ORDER BY a.date DESC
+        LIMIT 1
+    ) cur
+    LEFT JOIN LATERAL (
+        SELECT adjusted_close
+        FROM asset_prices a
+        WHERE a.symbol = s.symbol AND a.date < cur.date
+        ORDER BY a.date DESC
+        LIMIT 1
+    ) prev ON true
+    ON CONFLICT (symbol) DO UPDATE SET
+        date = EXCLUDED.date,
+        close_price = EXCLUDED.close_price,
+        adjusted_close = EXCLUDED.adjusted_close,
+        previous_close = EXCLUDED.previous_close,
+        daily_change = EXCLUDED.daily_change,
+        daily_change_percentage = EXCLUDED.daily_change_percentage,
+        updated_at = EXCLUDED.updated_at
+""")
+
+
+class LatestQuote(NamedTuple):
+    symbol: str
+    date: date
+    close_price: float
+    adjusted_close: float
+    previous_close: Optional[float]
+    daily_change: Optional[float]
+    daily_change_percentage: Optional[float]
+    updated_at: Optional[datetime]
+
+
+class LatestPriceService:
+
+    @staticmethod
+    def refresh_symbols(db: Session, symbols: List[str]):
+        """
+        Bring latest_prices up to date for symbols just written to asset_prices.
+        Call before the write batch commits so both land atomically.
+        """
+        symbols = sorted({s.upper() for s in symbols})
+        if not symbols:
+            return
+        db.execute(REFRESH_LATEST_PRICES_SQL, {"symbols": symbols})
+        LatestPriceService.invalidate(symbols)
+        PriceWatermarkService.invalidate(symbols)
+
+    @staticmethod
+    def get_latest_prices(db: Session, symbols: List[str]) -> Dict[str, LatestQuote]:
+        """Latest quote per symbol in a single indexed read, served from cache when fresh"""
+        symbols = sorted({s.strip().upper() for s in symbols if s and s.strip()})
+        quotes = {}
+        missing = []
+
+        for symbol in symbols:
+            cached = _latest_price_cache.get(symbol)
+            if cached is None:
+                missing.append(symbol)
+            else:
+                quotes[symbol] = cached
+
+        if missing:
+            rows = db.query(
+                LatestPrice.symbol,
+                LatestPrice.date,
+                LatestPrice.close_price,
+                LatestPrice.adjusted_close,
+                LatestPrice.previous_close,
+                LatestPrice.daily_change,
+                LatestPrice.daily_change_percentage,
+                LatestPrice.updated_at
+            ).filter(LatestPrice.symbol.in_(missing)).all()
+
+            for row in rows:
+                quote = LatestQuote(*row)
+                _latest_price_cache.set(quote.symbol, quote)
+                quotes[quote.symbol] = quote
+
+        return quotes
+
+    @staticmethod
+    def invalidate(symbols: Optional[List[str]] = None):
+        """Drop cached quotes for symbols (or everything)"""
+        if symbols is None:
+            _latest_price_cache.clear()
+            return
+        for symbol in symbols:
+            _latest_price_cache.pop(symbol.upper())
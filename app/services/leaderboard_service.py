@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.portfolio import Portfolio
+from app.models.portfolio_leaderboard import PortfolioLeaderboard
+from app.models.portfolio_period_returns import PortfolioPeriodReturns
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Board name -> score column, ranked highest first
+LEADERBOARDS = {
+    "1m": PortfolioPeriodReturns.return_1m,
+    "ytd": PortfolioPeriodReturns.return_ytd,
+    "1y": PortfolioPeriodReturns.return_1y,
+    "all_time": PortfolioPeriodReturns.return_inception,
+    "sharpe": Portfolio.sharpe_ratio,
+}
+
+portfolio_leaderboard = PortfolioLeaderboard.__table__
+
+
+class LeaderboardService:
+    """
+    Ranked public portfolios per board, stored one row per (board, rank).
+
+    Pages are keyset reads on the primary key (rank > after_rank), so their
+    cost does not grow with the number of public portfolios.
+    """
+
+    @staticmethod
+    def ranked(board: str):
+        """Select of (board, rank, portfolio_id, score) for every public portfolio with a score"""
+        score = LEADERBOARDS[board]
+        return select(
+            literal(board).label("board"),
+            func.row_number().over(order_by=(score.desc(), Portfolio.id)).label("rank"),
+            Portfolio.id.label("portfolio_id"),
+            score.label("score")
+        ).select_from(Portfolio).outerjoin(
+            PortfolioPeriodReturns, PortfolioPeriodReturns.portfolio_id == Portfolio.id
+        ).where(Portfolio.is_public == True, score.isnot(None))
+
+    @staticmethod
+    def refresh(db: Session, board: str) -> int:
+        """
+        Re-rank one board inside Postgres. Only ranks whose portfolio or
+        score changed are rewritten, and ranks past the end are dropped.
+        Runs in the caller's transaction; returns the board's size.
+        """
+        ranked = LeaderboardService.ranked(board)
+        count = db.execute(select(func.count()).select_from(ranked.subquery())).scalar()
+
+        stmt = insert(portfolio_leaderboard).from_select(
+            ["board", "rank", "portfolio_id", "score"], ranked
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[portfolio_leaderboard.c.board, portfolio_leaderboard.c.rank],
+            set_={
+                "portfolio_id": stmt.excluded.portfolio_id,
+                "score": stmt.excluded.score,
+                "updated_at": func.now(),
+            },
+            where=or_(
+                portfolio_leaderboard.c.portfolio_id != stmt.excluded.portfolio_id,
+                portfolio_leaderboard.c.score != stmt.excluded.score
+            )
+        )
+        db.execute(stmt)
+        db.execute(portfolio_leaderboard.delete().where(
+            portfolio_leaderboard.c.board == board,
+            portfolio_leaderboard.c.rank > count
+        ))
+        return count
+
+    @staticmethod
+    def refresh_all(db: Session) -> Dict[str, int]:
+        """Re-rank every board and commit; returns each board's size"""
+        sizes = {board: LeaderboardService.refresh(db, board) for board in LEADERBOARDS}
+        db.commit()
+        logger.info(f"🏆 Refreshed leaderboards: {sizes}")
+        return sizes
+
+    @staticmethod
+    def get_page(db: Session, board: str, limit: int = 20,
+                 after_rank: int = 0) -> Tuple[List[Tuple[PortfolioLeaderboard, Portfolio, Optional[str]]], Optional[int]]:
+        """
+        (entries, next_after_rank) where entries are (rank row, portfolio,
+        owner username). Portfolios made private since the last refresh are
+        skipped, so a page can be short; next_after_rank is None at the end.
+        """
+        rows = db.query(PortfolioLeaderboard, Portfolio, User.username).join(
+            Portfolio, Portfolio.id == PortfolioLeaderboard.portfolio_id
+        ).outerjoin(
+            User, User.id == Portfolio.user_id
+        ).filter(
+            PortfolioLeaderboard.board == board,
+            PortfolioLeaderboard.rank > after_rank
+        ).order_by(PortfolioLeaderboard.rank).limit(limit).all()
+
+        next_after_rank = rows[-1][0].rank if len(rows) == limit else None
+        return [row for row in rows if row[1].is_public], next_after_rank
@@ -0,0 +1,239 @@
+import logging
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from sqlalchemy import delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.historical_performance import HistoricalPerformance
+from app.services.backtest_engine import BacktestResult
+from app.services.benchmark_service import BenchmarkService
+from app.services.price_lookup import to_day_array
+from app.services.risk_metrics import VOLATILITY_WINDOW_DAYS, daily_returns, rolling_volatility
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK_SIZE = 2000
+
+historical_performance = HistoricalPerformance.__table__
+
+# Reads over many curves at once; each LATERAL probe is one scan of the
+# (portfolio_id, date) index, however long the curve
+RECENT_ROWS_SQL = text("""
+    SELECT p.portfolio_id, h.date, h.total_value
+    FROM unnest(CAST(:portfolio_ids AS integer[])) AS p(portfolio_id)
+    JOIN LATERAL (
+        SELECT hp.date, hp.total_value
+        FROM historical_performance hp
+        WHERE hp.portfolio_id = p.portfolio_id
+        ORDER BY hp.date DESC
+        LIMIT :limit
+    ) h ON true
+    ORDER BY p.portfolio_id, h.date
+""")
+FIRST_ROWS_SQL = text("""
+    SELECT p.portfolio_id, h.date, h.total_value
+    FROM unnest(CAST(:portfolio_ids AS integer[])) AS p(portfolio_id)
+    JOIN LATERAL (
+        SELECT hp.date, hp.total_value
+        FROM historical_performance hp
+        WHERE hp.portfolio_id = p.portfolio_id
+        ORDER BY hp.date
+        LIMIT 1
+    ) h ON true
+""")
+# Pairs (portfolio_ids[i], as_of_dates[i]): the last row on or before the date
+AS_OF_ROWS_SQL = text("""
+    SELECT p.portfolio_id, h.date, h.total_value
+    FROM unnest(CAST(:portfolio_ids AS integer[]), CAST(:as_of_dates AS date[])) AS p(portfolio_id, as_of)
+    JOIN LATERAL (
+        SELECT hp.date, hp.total_value
+        FROM historical_performance hp
+        WHERE hp.portfolio_id = p.portfolio_id
+          AND hp.date <= p.as_of
+        ORDER BY hp.date DESC
+        LIMIT 1
+    ) h ON true
+""")
+
+
+class PerformanceService:
+    """Daily equity curve persisted in historical_performance"""
+
+    @staticmethod
+    def build_rows(portfolio_id: int, dates: np.ndarray, values: np.ndarray,
+                   cost_basis: Union[float, np.ndarray],
+                   history: Optional[List[float]] = None,
+                   sp500_returns: Optional[np.ndarray] = None) -> List[dict]:
+        """
+        One historical_performance row per curve day. history holds stored
+        values just before the curve (for a resumed run), so the first day's
+        return and the rolling volatility carry across the join.
+        cost_basis is one amount or one per day; a rise in it is new money,
+        which is taken out of that day's return.
+        sp500_returns, if given, is the benchmark's return in % since the
+        first stored day, aligned to dates (NaN where unknown).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return []
+        history = np.asarray(history if history is not None else [], dtype=np.float64)
+        cost = np.broadcast_to(np.asarray(cost_basis, dtype=np.float64), values.shape)
+
+        series = np.concatenate((history, values))
+        daily_amount, daily_fraction = daily_returns(series)
+        flows = np.concatenate((np.zeros(len(history)), np.diff(cost, prepend=cost[0])))
+        if flows.any():
+            daily_amount = daily_amount - flows
+            previous = np.concatenate(([series[0]], series[:-1]))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                daily_fraction = np.where(previous != 0, daily_amount / previous, 0.0)
+        # The first stored day has no return, so the window starts on the second
+        volatility = np.concatenate(([np.nan], rolling_volatility(daily_fraction[1:])))
+        daily_amount, daily_fraction, volatility = (
+            daily_amount[len(history):], daily_fraction[len(history):], volatility[len(history):]
+        )
+
+        total_return = values - cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            total_return_pct = np.where(cost != 0, total_return / cost * 100, 0.0)
+        if sp500_returns is None:
+            sp500_returns = np.full(len(values), np.nan)
+
+        return [
+            {
+                "portfolio_id": portfolio_id,
+                "date": d,
+                "total_value": v,
+                "total_cost_basis": c,
+                "total_return_amount": r,
+                "total_return_percentage": rp,
+                "daily_return_amount": da,
+                "daily_return_percentage": dp * 100,
+                "volatility_30d": None if np.isnan(vol) else vol,
+                "sp500_return": None if np.isnan(sp) else sp,
+            }
+            for d, v, c, r, rp, da, dp, vol, sp in zip(
+                to_day_array(dates).tolist(), values.tolist(), cost.tolist(), total_return.tolist(),
+                total_return_pct.tolist(), daily_amount.tolist(), daily_fraction.tolist(), volatility.tolist(),
+                np.asarray(sp500_returns, dtype=np.float64).tolist()
+            )
+        ]
+
+    @staticmethod
+    def store_curve(db: Session, portfolio_id: int, result: BacktestResult, resumed: bool = False) -> int:
+        """
+        Upsert the daily curve and drop rows that are no longer on it.
+        A resumed curve only replaces rows from its first day onward.
+        Runs in the caller's transaction; returns rows written.
+        """
+        history = None
+        sp500_returns = None
+        from_day = None
+        if len(result.dates):
+            first_day = result.dates[0].item()
+            inception_day = first_day
+            if resumed:
+                history = [row.total_value for row in PerformanceService.get_recent(
+                    db, portfolio_id, VOLATILITY_WINDOW_DAYS, before=first_day
+                )]
+                from_day = first_day
+                inception_day = PerformanceService.get_first_day(db, portfolio_id) or first_day
+            sp500_returns = BenchmarkService.cumulative_returns(db, inception_day, result.dates)
+        rows = PerformanceService.build_rows(portfolio_id, result.dates, result.values,
+                                             result.starting_value, history, sp500_returns)
+        PerformanceService.replace_rows(db, portfolio_id, rows, from_day)
+
+        logger.info(f"📈 Stored {len(rows)} performance rows for portfolio {portfolio_id}")
+        return len(rows)
+
+    @staticmethod
+    def replace_rows(db: Session, portfolio_id: int, rows: List[dict], from_day: Optional[date] = None):
+        """Upsert built rows and drop stored days (from from_day on, if given) that are not among them"""
+        stale = historical_performance.c.portfolio_id == portfolio_id
+        if from_day is not None:
+            stale = stale & (historical_performance.c.date >= from_day)
+        # A new history can start later or skip days the old one had
+        db.execute(delete(historical_performance).where(
+            stale,
+            historical_performance.c.date.notin_([row["date"] for row in rows])
+        ))
+        PerformanceService.upsert_rows(db, rows)
+
+    @staticmethod
+    def delete_curves(db: Session, portfolio_ids: List[int]):
+        """Drop the whole stored curve of several portfolios in one delete, before writing new ones"""
+        if portfolio_ids:
+            db.execute(delete(historical_performance).where(
+                historical_performance.c.portfolio_id.in_(portfolio_ids)
+            ))
+
+    @staticmethod
+    def upsert_rows(db: Session, rows: List[dict]):
+        """Bulk INSERT ... ON CONFLICT DO UPDATE of built rows"""
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(historical_performance).values(rows[i:i + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                constraint='_portfolio_date_uc',
+                set_={
+                    'total_value': stmt.excluded.total_value,
+                    'total_cost_basis': stmt.excluded.total_cost_basis,
+                    'total_return_amount': stmt.excluded.total_return_amount,
+                    'total_return_percentage': stmt.excluded.total_return_percentage,
+                    'daily_return_amount': stmt.excluded.daily_return_amount,
+                    'daily_return_percentage': stmt.excluded.daily_return_percentage,
+                    'volatility_30d': stmt.excluded.volatility_30d,
+                    'sp500_return': stmt.excluded.sp500_return,
+                }
+            )
+            db.execute(stmt)
+
+    @staticmethod
+    def get_curve(db: Session, portfolio_id: int, start_date: Optional[date] = None,
+                  end_date: Optional[date] = None) -> List[HistoricalPerformance]:
+        query = db.query(HistoricalPerformance).filter(HistoricalPerformance.portfolio_id == portfolio_id)
+        if start_date:
+            query = query.filter(HistoricalPerformance.date >= start_date)
+        if end_date:
+            query = query.filter(HistoricalPerformance.date <= end_date)
+        return query.order_by(HistoricalPerformance.date).all()
+
+    @staticmethod
+    def get_first_day(db: Session, portfolio_id: int) -> Optional[date]:
+        return db.query(func.min(HistoricalPerformance.date)).filter(
+            HistoricalPerformance.portfolio_id == portfolio_id
+        ).scalar()
+
+    @staticmethod
+    def get_recent(db: Session, portfolio_id: int, limit: int = VOLATILITY_WINDOW_DAYS,
+                   before: Optional[date] = None) -> List[HistoricalPerformance]:
+        """Most recent rows (strictly before a date, if given) in date order"""
+        query = db.query(HistoricalPerformance).filter(HistoricalPerformance.portfolio_id == portfolio_id)
+        if before:
+            query = query.filter(HistoricalPerformance.date < before)
+        rows = query.order_by(HistoricalPerformance.date.desc()).limit(limit).all()
+        return rows[::-1]
+
+    @staticmethod
+    def get_recent_many(db: Session, portfolio_ids: List[int],
+                        limit: int = VOLATILITY_WINDOW_DAYS) -> Dict[int, list]:
+        """Most recent (date, total_value) rows of each portfolio's curve in date order, in one read"""
+        recent = {}
+        for row in db.execute(RECENT_ROWS_SQL, {"portfolio_ids": list(portfolio_ids), "limit": int(limit)}):
+            recent.setdefault(row.portfolio_id, []).append(row)
+        return recent
+
+    @staticmethod
+    def get_first_many(db: Session, portfolio_ids: List[int]) -> Dict[int, tuple]:
+        """First (date, total_value) row of each portfolio's curve, in one read"""
+        return {row.portfolio_id: row for row in db.execute(FIRST_ROWS_SQL, {"portfolio_ids": list(portfolio_ids)})}
+
+    @staticmethod
+    def get_as_of_many(db: Session, portfolio_ids: Sequence[int], as_of_dates: Sequence[date]) -> list:
+        """(portfolio_id, date, total_value) of the last row on or before as_of_dates[i] for portfolio_ids[i]"""
+        return db.execute(AS_OF_ROWS_SQL, {
+            "portfolio_ids": list(portfolio_ids),
+            "as_of_dates": list(as_of_dates),
+        }).all()
@@ -0,0 +1,69 @@
+"""
+Trailing period returns over an equity curve.
+
+Pure NumPy, no database access. Each period is measured from the last
+curve point on or before its anchor date (so weekends and holidays fall
+back to the previous close) to the last point, in percent. A period whose
+anchor is before the curve starts has no return.
+"""
+import calendar
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.price_lookup import to_day_array
+
+# Field name -> calendar months back from the last curve day
+PERIOD_MONTHS = {
+    "return_1m": 1,
+    "return_3m": 3,
+    "return_1y": 12,
+    "return_3y": 36,
+}
+PERIOD_FIELDS = ("return_1d",) + tuple(PERIOD_MONTHS) + ("return_ytd", "return_inception")
+# Longest lookback any period needs, in calendar days, with room for a holiday gap
+LOOKBACK_DAYS = 3 * 366 + 7
+
+
+def months_before(day: date, months: int) -> date:
+    """Same day of the month, months earlier, clamped to the month's length"""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def period_returns(dates: np.ndarray, values: np.ndarray,
+                   inception_value: Optional[float] = None) -> Dict[str, Optional[float]]:
+    """
+    Returns in percent keyed by PERIOD_FIELDS, plus as_of_date. dates may
+    start after inception (a trailing window of the curve); pass the first
+    stored value as inception_value in that case.
+    """
+    dates = to_day_array(dates)
+    values = np.asarray(values, dtype=np.float64)
+    out = {field: None for field in PERIOD_FIELDS}
+    out["as_of_date"] = None
+    if len(values) == 0:
+        return out
+
+    last_day = dates[-1].item()
+    last_value = values[-1]
+    out["as_of_date"] = last_day
+
+    def change(base: float) -> Optional[float]:
+        if base is None or not np.isfinite(base) or base <= 0:
+            return None
+        return float((last_value / base - 1.0) * 100)
+
+    anchors = {field: months_before(last_day, months) for field, months in PERIOD_MONTHS.items()}
+    anchors["return_ytd"] = date(last_day.year - 1, 12, 31)
+    positions = np.searchsorted(dates, np.array(list(anchors.values()), dtype="datetime64[D]"), side="right") - 1
+    for field, position in zip(anchors, positions.tolist()):
+        out[field] = change(values[position]) if position >= 0 else None
+
+    if len(values) >= 2:
+        out["return_1d"] = change(values[-2])
+    out["return_inception"] = change(values[0] if inception_value is None else inception_value)
+    return out
@@ -0,0 +1,80 @@
+import logging
+from datetime import timedelta
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.historical_performance import HistoricalPerformance
+from app.models.portfolio_period_returns import PortfolioPeriodReturns
+from app.services.period_returns import LOOKBACK_DAYS, PERIOD_FIELDS, period_returns
+
+logger = logging.getLogger(__name__)
+
+UPSERT_CHUNK_SIZE = 2000
+
+portfolio_period_returns = PortfolioPeriodReturns.__table__
+
+
+class PeriodReturnsService:
+    """Keeps portfolio_period_returns in step with each portfolio's stored curve"""
+
+    @staticmethod
+    def build_row(portfolio_id: int, dates: np.ndarray, values: np.ndarray,
+                  inception_value: Optional[float] = None) -> Optional[dict]:
+        """portfolio_period_returns row for a curve (or its trailing window); None if empty"""
+        returns = period_returns(dates, values, inception_value)
+        if returns["as_of_date"] is None:
+            return None
+        return dict(returns, portfolio_id=portfolio_id)
+
+    @staticmethod
+    def refresh(db: Session, portfolio_id: int) -> Optional[dict]:
+        """
+        Recompute from the stored curve after it changed. Reads only the
+        trailing LOOKBACK_DAYS plus the first row, so a one-day append costs
+        the same as a full rewrite. Runs in the caller's transaction.
+        """
+        last_day = db.query(func.max(HistoricalPerformance.date)).filter(
+            HistoricalPerformance.portfolio_id == portfolio_id
+        ).scalar()
+        if last_day is None:
+            db.execute(portfolio_period_returns.delete().where(
+                portfolio_period_returns.c.portfolio_id == portfolio_id
+            ))
+            return None
+
+        first = db.query(HistoricalPerformance.total_value).filter(
+            HistoricalPerformance.portfolio_id == portfolio_id
+        ).order_by(HistoricalPerformance.date).first()
+        rows = db.query(HistoricalPerformance.date, HistoricalPerformance.total_value).filter(
+            HistoricalPerformance.portfolio_id == portfolio_id,
+            HistoricalPerformance.date >= last_day - timedelta(days=LOOKBACK_DAYS)
+        ).order_by(HistoricalPerformance.date).all()
+
+        row = PeriodReturnsService.build_row(
+            portfolio_id,
+            [r.date for r in rows],
+            np.array([r.total_value for r in rows], dtype=np.float64),
+            first.total_value
+        )
+        PeriodReturnsService.upsert_rows(db, [row])
+        return row
+
+    @staticmethod
+    def upsert_rows(db: Session, rows: List[dict]):
+        """Bulk INSERT ... ON CONFLICT DO UPDATE of built rows"""
+        rows = [row for row in rows if row]
+        for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(portfolio_period_returns).values(rows[i:i + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[portfolio_period_returns.c.portfolio_id],
+                set_=dict(
+                    {field: stmt.excluded[field] for field in PERIOD_FIELDS},
+                    as_of_date=stmt.excluded.as_of_date,
+                    updated_at=func.now()
+                )
+            )
+            db.execute(stmt)
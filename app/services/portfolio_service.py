@@ -7,9 +7,20 @@ from app.models.user import User
 from app.models.portfolio import Portfolio
 from app.models.holding import Holding, AssetType
 from app.models.historical_performance import HistoricalPerformance
+from app.services.holdings_valuation_service import HoldingsValuationService
+from app.services.snapshot_allocation_service import SnapshotAllocationService
 from app.schemas.portfolio import PortfolioCreate, PortfolioUpdate, HoldingCreate, HoldingUpdate
 from datetime import datetime, date
 
+# Discovery sort keys, each ordered best first
+PUBLIC_SORT_ORDERS = {
+    "total_return_percentage": Portfolio.total_return_percentage.desc(),
+    "sharpe_ratio": Portfolio.sharpe_ratio.desc(),
+    "sortino_ratio": Portfolio.sortino_ratio.desc(),
+    "volatility": Portfolio.volatility.asc(),
+    "max_drawdown": Portfolio.max_drawdown.desc(),
+}
+
 class PortfolioService:
     
     @staticmethod
@@ -226,32 +237,22 @@ class PortfolioService:
     
     @staticmethod
     def recalculate_portfolio_totals(db: Session, portfolio_id: int):
-        """Recalculate portfolio total values based on holdings"""
-        portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
-        if not portfolio:
-            return
-        
-        holdings = db.query(Holding).filter(Holding.portfolio_id == portfolio_id).all()
-        
-        total_cost_basis = sum(holding.total_cost_basis for holding in holdings)
-        total_current_value = sum(holding.current_value for holding in holdings)
-        total_return_amount = total_current_value - total_cost_basis
-        total_return_percentage = (total_return_amount / total_cost_basis * 100) if total_cost_basis > 0 else 0
-        
-        # Update portfolio
-        portfolio.total_cost_basis = total_cost_basis
-        portfolio.total_value = total_current_value
-        portfolio.total_return_amount = total_return_amount
-        portfolio.total_return_percentage = total_return_percentage
-        portfolio.last_calculated = datetime.now()
-        
+        """Recalculate portfolio total values from its holdings with one aggregate UPDATE"""
+        HoldingsValuationService.refresh_totals(db, [portfolio_id])
         db.commit()
     
     @staticmethod
-    def get_public_portfolios(db: Session, limit: int = 20, offset: int = 0) -> List[Portfolio]:
-        """Get public portfolios for discovery"""
-        return db.query(Portfolio).filter(
-            Portfolio.is_public == True
-        ).order_by(
-            Portfolio.total_return_percentage.desc()
+    def get_public_portfolios(db: Session, limit: int = 20, offset: int = 0,
+                              sort_by: str = "total_return_percentage",
+                              max_volatility: Optional[float] = None,
+                              holding: Optional[str] = None) -> List[Portfolio]:
+        """Get public portfolios for discovery, best first by sort_by (see PUBLIC_SORT_ORDERS)"""
+        query = db.query(Portfolio).filter(Portfolio.is_public == True)
+        if holding:
+            query = query.filter(Portfolio.id.in_(SnapshotAllocationService.current_holders(holding)))
+        if max_volatility is not None:
+            query = query.filter(Portfolio.volatility <= max_volatility)
+        # Portfolios without metrics yet sort last
+        return query.order_by(
+            PUBLIC_SORT_ORDERS[sort_by].nulls_last(), Portfolio.id
         ).offset(offset).limit(limit).all()
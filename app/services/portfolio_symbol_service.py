@@ -0,0 +1,38 @@
+import logging
+from typing import List, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.portfolio_symbol import PortfolioSymbol, referenced_symbols
+
+logger = logging.getLogger(__name__)
+
+portfolio_symbols = PortfolioSymbol.__table__
+
+
+class PortfolioSymbolService:
+    """Symbol -> portfolio index over every snapshot and holding, for targeted revaluation"""
+
+    @staticmethod
+    def get_portfolios(db: Session, symbols: Sequence[str]) -> List[int]:
+        """Ids of portfolios that reference any of the symbols, now or in a past snapshot"""
+        symbols = sorted({symbol.strip().upper() for symbol in symbols if symbol and symbol.strip()})
+        if not symbols:
+            return []
+        return db.scalars(
+            select(portfolio_symbols.c.portfolio_id).distinct().where(
+                portfolio_symbols.c.symbol.in_(symbols)
+            ).order_by(portfolio_symbols.c.portfolio_id)
+        ).all()
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Rewrite the whole index from snapshots and holdings and commit; returns rows"""
+        db.execute(delete(portfolio_symbols))
+        rows = db.execute(insert(portfolio_symbols).from_select(
+            ["portfolio_id", "symbol"], referenced_symbols()
+        )).rowcount
+        db.commit()
+        logger.info(f"🗂️ Rebuilt portfolio symbol index: {rows} rows")
+        return rows
@@ -16,6 +16,12 @@ from collections import defaultdict
 from app.database.connection import get_db
 from app.models.asset_price import AssetPrice
 from app.services.stock_universe_service import StockUniverseService
+from app.services.price_panel_service import PricePanelService
+from app.services.latest_price_service import LatestPriceService
+from app.services.backtest_checkpoint_service import BacktestCheckpointService
+from app.services.portfolio_symbol_service import PortfolioSymbolService
+from app.services.price_watermark_service import PriceWatermarkService
+from app.services.revaluation_service import RevaluationService
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -148,8 +154,9 @@ class PostgreSQLOptimizedPriceFetchingService:
                 }
             )
             
-            # Execute the bulk upsert
+            # Execute the bulk upsert and move latest_prices in the same transaction
             db.execute(stmt)
+            LatestPriceService.refresh_symbols(db, [symbol])
             db.commit()
             
             bulk_elapsed = time.time() - bulk_start
@@ -202,6 +209,8 @@ class PostgreSQLOptimizedPriceFetchingService:
         
         if stored_count > 0:
             try:
+                db.flush()
+                LatestPriceService.refresh_symbols(db, [symbol])
                 db.commit()
                 logger.info(f"  💾 {symbol}: stored {stored_count} new records (fallback method)")
             except Exception as e:
@@ -261,6 +270,7 @@ class PostgreSQLOptimizedPriceFetchingService:
         db = next(db_gen)
         
         try:
+            changes_since = PriceWatermarkService.database_time(db)
             # Check database performance first
             self.check_database_performance_postgresql(db)
             
@@ -301,6 +311,19 @@ class PostgreSQLOptimizedPriceFetchingService:
                 # Small delay to be nice to the API
                 time.sleep(0.2)
             
+            # Rebuild the aligned panel for everything that was (re)loaded
+            PricePanelService.refresh_symbols(db, list(missing_data.keys()))
+            changed = PriceWatermarkService.changed_since(db, changes_since)
+            # Backfilled history can change any rebalance priced inside the range,
+            # but only in portfolios that reference a rewritten symbol
+            BacktestCheckpointService.invalidate_from(
+                db, datetime.strptime(start_date, "%Y-%m-%d").date(),
+                PortfolioSymbolService.get_portfolios(db, changed.symbols)
+            )
+            db.commit()
+            # Revalue just those portfolios
+            RevaluationService.on_symbols_changed(db, changed)
+            
             total_elapsed = time.time() - total_start_time
             
             logger.info(f"\n🎉 PostgreSQL-optimized collection complete!")
@@ -336,6 +359,7 @@ class PostgreSQLOptimizedPriceFetchingService:
         db = next(db_gen)
         
         try:
+            changes_since = PriceWatermarkService.database_time(db)
             # Quick missing data check
             missing_data = self.get_missing_price_data_fast(db, all_symbols, start_date, end_date)
             
@@ -369,6 +393,19 @@ class PostgreSQLOptimizedPriceFetchingService:
                 # Small delay between symbols
                 time.sleep(0.5)
             
+            # Rebuild the aligned panel for everything that was (re)loaded
+            PricePanelService.refresh_symbols(db, list(missing_data.keys()))
+            changed = PriceWatermarkService.changed_since(db, changes_since)
+            # Backfilled history can change any rebalance priced inside the range,
+            # but only in portfolios that reference a rewritten symbol
+            BacktestCheckpointService.invalidate_from(
+                db, datetime.strptime(start_date, "%Y-%m-%d").date(),
+                PortfolioSymbolService.get_portfolios(db, changed.symbols)
+            )
+            db.commit()
+            # Revalue just those portfolios
+            RevaluationService.on_symbols_changed(db, changed)
+            
             total_elapsed = time.time() - total_start_time
             logger.info(f"\n🎉 Single-threaded collection complete!")
             logger.info(f"  ⏱️  Total time: {total_elapsed:.2f} seconds ({total_elapsed/60:.2f} minutes)")
@@ -420,6 +457,7 @@ class PostgreSQLOptimizedPriceFetchingService:
                 )
                 
                 db.execute(stmt)
+                LatestPriceService.refresh_symbols(db, [symbol])
                 db.commit()
                 
                 total_stored += len(insert_data)
@@ -0,0 +1,140 @@
+import enum
+from datetime import date, datetime
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+DateLike = Union[date, datetime, str, np.datetime64]
+
+# Weekends plus the longest market closures fit comfortably inside a week
+DEFAULT_MAX_GAP_DAYS = 7
+# The same week counted in trading days (weekdays), for as-of lookups
+DEFAULT_MAX_GAP_TRADING_DAYS = 5
+
+
+class AsOfPolicy(str, enum.Enum):
+    PREVIOUS = "previous"  # last close on or before the date - never looks ahead
+    NEAREST = "nearest"    # closest close on either side, ties go to the earlier one
+
+
+def to_day(value: DateLike) -> np.datetime64:
+    """Normalize a date, datetime, ISO string or datetime64 to datetime64[D]"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return np.datetime64(value, "D")
+
+
+def to_day_array(values: Iterable[DateLike]) -> np.ndarray:
+    """Vector form of to_day"""
+    if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[D]")
+    return np.array([to_day(v) for v in values], dtype="datetime64[D]")
+
+
+class AsOfPriceSeries:
+    """
+    Price lookups over a sorted date array using binary search.
+
+    With PREVIOUS the price on a date is the last close on or before it, as
+    long as that close is at most max_gap_days trading days old. NEAREST
+    also accepts a later close within the same window, which can peek at
+    the future and is only meant for display purposes, not for valuation.
+
+    Gaps are counted in weekdays with np.busday_count, so a weekend never
+    uses up the window; exchange holidays count as trading days.
+    """
+
+    def __init__(self, dates: np.ndarray, prices: np.ndarray,
+                 policy: AsOfPolicy = AsOfPolicy.PREVIOUS,
+                 max_gap_days: int = DEFAULT_MAX_GAP_TRADING_DAYS):
+        dates = to_day_array(dates)
+        prices = np.asarray(prices, dtype=np.float64)
+        if dates.shape != prices.shape:
+            raise ValueError("dates and prices must have the same length")
+
+        order = np.argsort(dates, kind="stable")
+        self.dates = dates[order]
+        self.prices = prices[order]
+        self.policy = AsOfPolicy(policy)
+        self.max_gap_days = int(max_gap_days)
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs) -> "AsOfPriceSeries":
+        """Build from (date, price) rows such as PriceRepository.fetch_adjusted_closes"""
+        dates = np.array([row[0] for row in rows], dtype="datetime64[D]")
+        prices = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        return cls(dates, prices, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def index_many(self, targets: Iterable[DateLike]) -> np.ndarray:
+        """Index of the observation used for each target date, -1 where none qualifies"""
+        targets = to_day_array(targets)
+        n = len(self.dates)
+        if n == 0:
+            return np.full(targets.shape, -1, dtype=np.int64)
+
+        prev_idx = np.searchsorted(self.dates, targets, side="right") - 1
+        safe_prev = np.clip(prev_idx, 0, n - 1)
+        # Weekdays from the close up to (not including) the target
+        prev_gap = np.busday_count(self.dates[safe_prev], targets)
+        prev_ok = (prev_idx >= 0) & (prev_gap <= self.max_gap_days)
+
+        if self.policy == AsOfPolicy.PREVIOUS:
+            return np.where(prev_ok, prev_idx, -1)
+
+        next_idx = prev_idx + 1
+        safe_next = np.clip(next_idx, 0, n - 1)
+        next_gap = np.busday_count(targets, self.dates[safe_next])
+        next_ok = (next_idx < n) & (next_gap <= self.max_gap_days)
+
+        use_prev = prev_ok & (~next_ok | (prev_gap <= next_gap))
+        return np.where(use_prev, prev_idx, np.where(next_ok, next_idx, -1))
+
+    def lookup_many(self, targets: Iterable[DateLike]) -> np.ndarray:
+        """Prices for many dates at once, NaN where no observation qualifies"""
+        idx = self.index_many(targets)
+        if len(self.prices) == 0:
+            return np.full(idx.shape, np.nan)
+        return np.where(idx >= 0, self.prices[np.clip(idx, 0, None)], np.nan)
+
+    def lookup(self, target: DateLike) -> Optional[float]:
+        """Price for a single date, or None if nothing qualifies"""
+        value = self.lookup_many([target])[0]
+        return None if np.isnan(value) else float(value)
+
+
+def align_to_calendar(calendar: np.ndarray, dates: np.ndarray, prices: np.ndarray,
+                      max_staleness: int) -> tuple:
+    """
+    Forward-fill one symbol's prices onto a trading calendar.
+
+    Returns (values, source_dates) aligned to the calendar. A value is carried
+    forward for at most max_staleness calendar rows; beyond that, and before
+    the first observation, the value is NaN and the source date is NaT.
+    """
+    calendar = to_day_array(calendar)
+    dates = to_day_array(dates)
+    prices = np.asarray(prices, dtype=np.float64)
+    values = np.full(calendar.shape, np.nan)
+    source_dates = np.full(calendar.shape, np.datetime64("NaT"), dtype="datetime64[D]")
+    if len(dates) == 0 or len(calendar) == 0:
+        return values, source_dates
+
+    idx = np.searchsorted(dates, calendar, side="right") - 1
+    has_prior = idx >= 0
+    safe_idx = np.clip(idx, 0, None)
+
+    # Staleness is measured in trading days: calendar rows since the source date
+    source = dates[safe_idx]
+    source_pos = np.searchsorted(calendar, source, side="left")
+    # Observations older than the calendar itself are counted in weekdays
+    before = source < calendar[0]
+    source_pos[before] = -np.busday_count(source[before], calendar[0])
+    staleness = np.arange(len(calendar)) - source_pos
+    valid = has_prior & (staleness <= max_staleness)
+
+    values[valid] = prices[safe_idx[valid]]
+    source_dates[valid] = dates[safe_idx[valid]]
+    return values, source_dates
@@ -0,0 +1,136 @@
+import logging
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select, delete, distinct
+from sqlalchemy.orm import Session
+
+from app.models.asset_price import AssetPrice
+from app.models.price_panel import PricePanel
+from app.repositories.price_repository import PriceRepository
+from app.services.price_lookup import align_to_calendar, to_day_array
+
+logger = logging.getLogger(__name__)
+
+# Carry a close forward for at most one trading week; after that the symbol
+# is treated as missing rather than silently valued at a stale price
+PANEL_MAX_STALENESS_DAYS = 5
+# Calendar days of raw prices to read before a refresh window so the first
+# panel day can be forward-filled
+PANEL_LOOKBACK_DAYS = 14
+INSERT_CHUNK_SIZE = 5000
+
+price_panel = PricePanel.__table__
+asset_prices = AssetPrice.__table__
+
+
+class PriceMatrix(NamedTuple):
+    """Prices aligned to trading days: values[t, j] is symbols[j] on dates[t], NaN if missing"""
+    dates: np.ndarray
+    symbols: List[str]
+    values: np.ndarray
+
+    def column(self, symbol: str) -> np.ndarray:
+        return self.values[:, self.symbols.index(symbol)]
+
+
+class PricePanelService:
+
+    @staticmethod
+    def get_trading_calendar(db: Session, start_date: Optional[date] = None,
+                             end_date: Optional[date] = None) -> np.ndarray:
+        """Trading days (datetime64[D]) on which any symbol has a price"""
+        stmt = select(distinct(asset_prices.c.date))
+        if start_date:
+            stmt = stmt.where(asset_prices.c.date >= start_date)
+        if end_date:
+            stmt = stmt.where(asset_prices.c.date <= end_date)
+        dates = to_day_array([row[0] for row in db.execute(stmt.order_by(asset_prices.c.date))])
+        # Weekend rows are data errors, not trading days
+        return dates[np.is_busday(dates)]
+
+    @staticmethod
+    def refresh_symbols(db: Session, symbols: List[str], start_date: Optional[date] = None,
+                        calendar: Optional[np.ndarray] = None) -> int:
+        """
+        Rebuild panel rows for the given symbols from start_date onward
+        (the full history when start_date is None). Returns rows written.
+        """
+        if calendar is None:
+            calendar = PricePanelService.get_trading_calendar(db, start_date)
+        elif start_date is not None:
+            calendar = calendar[calendar >= np.datetime64(start_date, "D")]
+        if len(calendar) == 0:
+            return 0
+
+        window_start = calendar[0].item()
+        lookback_start = window_start - timedelta(days=PANEL_LOOKBACK_DAYS)
+        total_written = 0
+
+        for symbol in symbols:
+            try:
+                dates, prices = PriceRepository.fetch_adjusted_close_arrays(db, symbol, lookback_start)
+                values, source_dates = align_to_calendar(calendar, dates, prices, PANEL_MAX_STALENESS_DAYS)
+                valid = ~np.isnan(values)
+
+                rows = [
+                    {"symbol": symbol, "date": d, "adjusted_close": v, "source_date": s}
+                    for d, v, s in zip(calendar[valid].tolist(), values[valid].tolist(),
+                                       source_dates[valid].tolist())
+                ]
+
+                # Replace the window so corrected or withdrawn prices do not linger
+                db.execute(delete(price_panel).where(
+                    price_panel.c.symbol == symbol,
+                    price_panel.c.date >= window_start
+                ))
+                for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+                    db.execute(price_panel.insert(), rows[i:i + INSERT_CHUNK_SIZE])
+                db.commit()
+                total_written += len(rows)
+
+            except Exception as e:
+                logger.error(f"  ❌ Price panel refresh failed for {symbol}: {e}")
+                db.rollback()
+
+        logger.info(f"🧮 Price panel refreshed for {len(symbols)} symbols from {window_start}: {total_written} rows")
+        return total_written
+
+    @staticmethod
+    def load_matrix(db: Session, symbols: List[str], start_date: date, end_date: date) -> PriceMatrix:
+        """
+        Read an aligned price matrix for the given symbols in one panel query.
+        Symbols that have not been materialized yet are aligned from raw prices.
+        """
+        symbols = list(dict.fromkeys(s.upper() for s in symbols))
+        rows = db.execute(
+            select(price_panel.c.symbol, price_panel.c.date, price_panel.c.adjusted_close).where(
+                price_panel.c.symbol.in_(symbols),
+                price_panel.c.date >= start_date,
+                price_panel.c.date <= end_date
+            ).order_by(price_panel.c.date)
+        ).all()
+
+        if rows:
+            calendar = np.unique(to_day_array([row[1] for row in rows]))
+        else:
+            calendar = PricePanelService.get_trading_calendar(db, start_date, end_date)
+
+        values = np.full((len(calendar), len(symbols)), np.nan)
+        column = {symbol: j for j, symbol in enumerate(symbols)}
+
+        if rows:
+            col_idx = np.fromiter((column[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+            row_idx = np.searchsorted(calendar, to_day_array([row[1] for row in rows]))
+            values[row_idx, col_idx] = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+
+        present = {row[0] for row in rows}
+        missing = [symbol for symbol in symbols if symbol not in present]
+        if missing and len(calendar):
+            lookback_start = start_date - timedelta(days=PANEL_LOOKBACK_DAYS)
+            raw = PriceRepository.fetch_adjusted_close_arrays_by_symbol(db, missing, lookback_start, end_date)
+            for symbol, (dates, prices) in raw.items():
+                values[:, column[symbol]], _ = align_to_calendar(calendar, dates, prices, PANEL_MAX_STALENESS_DAYS)
+
+        return PriceMatrix(calendar, symbols, values)
@@ -0,0 +1,115 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Dict, List, Optional, NamedTuple
+from datetime import date, datetime
+
+from app.models.asset_price import AssetPrice
+from app.models.latest_price import LatestPrice
+from app.services.ttl_cache import TTLCache
+
+# Watermarks only move when the ingestion job writes, so a short TTL keeps
+# repeat conditional requests from touching the database at all.
+WATERMARK_TTL_SECONDS = 60
+
+_watermark_cache = TTLCache(maxsize=20000, ttl=WATERMARK_TTL_SECONDS)
+
+
+class PriceWatermark(NamedTuple):
+    symbol: str
+    last_date: Optional[date]
+    last_ingested_at: Optional[datetime]
+
+    @property
+    def token(self) -> str:
+        """Stable string form used when building ETags and cache keys"""
+        last_date = self.last_date.isoformat() if self.last_date else "-"
+        ingested = self.last_ingested_at.isoformat() if self.last_ingested_at else "-"
+        return f"{self.symbol}:{last_date}:{ingested}"
+
+
+class SymbolsChanged(NamedTuple):
+    """Symbols whose prices were written in [since, until], by latest_prices.updated_at"""
+    since: datetime
+    until: datetime
+    symbols: List[str]
+
+
+class PriceWatermarkService:
+
+    @staticmethod
+    def get_watermarks(db: Session, symbols: List[str]) -> Dict[str, PriceWatermark]:
+        """Get the ingestion watermark for each symbol, served from cache when fresh"""
+        symbols = sorted({s.strip().upper() for s in symbols if s and s.strip()})
+        watermarks = {}
+        missing = []
+
+        for symbol in symbols:
+            cached = _watermark_cache.get(symbol)
+            if cached is None:
+                missing.append(symbol)
+            else:
+                watermarks[symbol] = cached
+
+        if missing:
+            # latest_prices.updated_at moves with every write batch, corrections included
+            found = {
+                row[0]: PriceWatermark(row[0], row[1], row[2])
+                for row in db.query(LatestPrice.symbol, LatestPrice.date, LatestPrice.updated_at).filter(
+                    LatestPrice.symbol.in_(missing)
+                ).all()
+            }
+
+            # Symbols not materialized yet fall back to aggregating asset_prices
+            unmaterialized = [symbol for symbol in missing if symbol not in found]
+            if unmaterialized:
+                rows = db.query(
+                    AssetPrice.symbol,
+                    func.max(AssetPrice.date),
+                    func.max(AssetPrice.created_at)
+                ).filter(
+                    AssetPrice.symbol.in_(unmaterialized)
+                ).group_by(AssetPrice.symbol).all()
+                found.update({row[0]: PriceWatermark(row[0], row[1], row[2]) for row in rows})
+
+            for symbol in missing:
+                watermark = found.get(symbol, PriceWatermark(symbol, None, None))
+                _watermark_cache.set(symbol, watermark)
+                watermarks[symbol] = watermark
+
+        return watermarks
+
+    @staticmethod
+    def last_modified(watermarks: Dict[str, PriceWatermark]) -> Optional[datetime]:
+        """Most recent ingestion time across a set of watermarks"""
+        stamps = [w.last_ingested_at for w in watermarks.values() if w.last_ingested_at]
+        return max(stamps) if stamps else None
+
+    @staticmethod
+    def database_time(db: Session) -> datetime:
+        """
+        Start time of the current transaction, the clock that stamps
+        updated_at. Writes in this transaction or later ones are at or after it.
+        """
+        return db.query(func.now()).scalar()
+
+    @staticmethod
+    def changed_since(db: Session, since: datetime) -> SymbolsChanged:
+        """
+        Symbols with a price write batch at or after since. Passing the
+        event's until as the next since misses nothing (and may repeat the
+        last batch's symbols).
+        """
+        rows = db.query(LatestPrice.symbol, LatestPrice.updated_at).filter(
+            LatestPrice.updated_at >= since
+        ).order_by(LatestPrice.symbol).all()
+        until = max((row[1] for row in rows), default=since)
+        return SymbolsChanged(since, until, [row[0] for row in rows])
+
+    @staticmethod
+    def invalidate(symbols: Optional[List[str]] = None):
+        """Drop cached watermarks after new prices are written"""
+        if symbols is None:
+            _watermark_cache.clear()
+            return
+        for symbol in symbols:
+            _watermark_cache.pop(symbol.upper())
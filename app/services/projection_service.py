@@ -0,0 +1,82 @@
+import hashlib
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.portfolio_snapshot import PortfolioSnapshot
+
+from app.services.backtest_cache_service import BacktestCacheService
+from app.services.backtest_service import BacktestService
+from app.services.projection import Projection, block_bootstrap
+from app.services.risk_metrics import daily_returns
+from app.services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Returns do not depend on the starting value, so every projection reads
+# the cached backtest run at this one
+PROJECTION_BASE_VALUE = 100000.0
+PROJECTION_CACHE_SIZE = 256
+PROJECTION_CACHE_TTL_SECONDS = 3600
+
+_projection_cache = TTLCache(maxsize=PROJECTION_CACHE_SIZE, ttl=PROJECTION_CACHE_TTL_SECONDS)
+
+
+class ProjectionKey(NamedTuple):
+    key: str
+    backtest_key: str
+    snapshots: List[PortfolioSnapshot]
+
+
+class ProjectionService:
+    """Bootstrap projections of a portfolio's backtested daily returns, cached per snapshot set and prices"""
+
+    @staticmethod
+    def cache_key(db: Session, portfolio_id: int, horizon_days: int, paths: int, block_days: int,
+                  seed: int = 0) -> ProjectionKey:
+        """
+        Key of a projection without running it, so a caller can answer a
+        conditional request first. It extends the backtest cache key, which
+        already changes with the snapshots and every symbol's price
+        watermark, with the simulation parameters.
+        """
+        snapshots = BacktestService.get_snapshots(db, portfolio_id)
+        if not snapshots:
+            raise ValueError("No snapshots found for this portfolio")
+
+        backtest_key = BacktestCacheService.cache_key(db, snapshots, PROJECTION_BASE_VALUE)
+        key = hashlib.sha256(
+            f"{backtest_key}|{horizon_days}|{paths}|{block_days}|{seed}".encode("utf-8")
+        ).hexdigest()
+        return ProjectionKey(key, backtest_key, snapshots)
+
+    @staticmethod
+    def project(db: Session, portfolio_id: int, horizon_days: int, paths: int, block_days: int,
+                seed: int = 0, cache_key: Optional[ProjectionKey] = None) -> Tuple[str, Projection, str]:
+        """
+        Returns (cache_key, projection, source) where source is "memory" or
+        "computed". Pass the ProjectionService.cache_key result for the same
+        parameters to skip recomputing it.
+        """
+        if cache_key is None:
+            cache_key = ProjectionService.cache_key(db, portfolio_id, horizon_days, paths, block_days, seed)
+        key, backtest_key, snapshots = cache_key
+        projection = _projection_cache.get(key)
+        if projection is not None:
+            return key, projection, "memory"
+
+        _, payload, _ = BacktestCacheService.get_or_compute(
+            db, portfolio_id, PROJECTION_BASE_VALUE, snapshots, backtest_key
+        )
+        # The first point has no previous day
+        _, returns = daily_returns(np.asarray(payload["curve_values"], dtype=np.float64))
+        projection = block_bootstrap(returns[1:], horizon_days, paths, block_days, seed=seed)
+        _projection_cache.set(key, projection)
+
+        logger.info(
+            f"🔮 Projected portfolio {portfolio_id} over {horizon_days} trading days: "
+            f"{paths} paths from {projection.history_days} days of returns"
+        )
+        return key, projection, "computed"
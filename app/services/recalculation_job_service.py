@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from app.database.connection import SessionLocal
+from app.models.portfolio import Portfolio
+from app.services.backtest_service import BacktestService
+
+logger = logging.getLogger(__name__)
+
+# Recalculations are mostly database and NumPy time, both of which release
+# the GIL, so a small thread pool keeps them off the event loop
+RECALCULATION_WORKERS = int(os.getenv("RECALCULATION_WORKERS", "2"))
+# Finished jobs stay pollable for this long
+JOB_RETENTION_SECONDS = 3600
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobConflictError(Exception):
+    """A job with different parameters is already active for the portfolio"""
+
+
+@dataclass
+class RecalculationJob:
+    id: str
+    portfolio_id: int
+    starting_value: float
+    daily_curve: bool
+    full_replay: bool
+    status: JobStatus = JobStatus.QUEUED
+    progress: float = 0.0
+    stage: str = "Queued"
+    values_calculated: int = 0
+    errors: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    submitted_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def same_request(self, starting_value: float, daily_curve: bool, full_replay: bool) -> bool:
+        return (self.starting_value, self.daily_curve, self.full_replay) == (starting_value, daily_curve, full_replay)
+
+
+class RecalculationJobService:
+    """
+    In-process registry of portfolio recalculation jobs.
+
+    At most one job per portfolio is queued or running; identical submits
+    while it is active return the same job. Jobs live in this process only,
+    so with several API workers each keeps its own registry.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=RECALCULATION_WORKERS, thread_name_prefix="recalc")
+    _lock = threading.Lock()
+    _jobs: Dict[str, RecalculationJob] = {}
+    _active: Dict[int, str] = {}
+
+    @classmethod
+    def submit(cls, portfolio_id: int, starting_value: float, daily_curve: bool = True,
+               full_replay: bool = False) -> Tuple[RecalculationJob, bool]:
+        """Queue a recalculation; returns (job, created). Raises JobConflictError on mismatched duplicates."""
+        with cls._lock:
+            cls._prune()
+            active_id = cls._active.get(portfolio_id)
+            # A job that just finished but is not yet deregistered no longer counts
+            if active_id is not None and not cls._jobs[active_id].done:
+                active = cls._jobs[active_id]
+                if not active.same_request(starting_value, daily_curve, full_replay):
+                    raise JobConflictError(
+                        f"Recalculation {active.id} with different parameters is already {active.status.value}"
+                    )
+                return active, False
+
+            job = RecalculationJob(
+                id=uuid.uuid4().hex,
+                portfolio_id=portfolio_id,
+                starting_value=starting_value,
+                daily_curve=daily_curve,
+                full_replay=full_replay,
+            )
+            cls._jobs[job.id] = job
+            cls._active[portfolio_id] = job.id
+            job.future = cls._executor.submit(cls._run, job)
+            return job, True
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[RecalculationJob]:
+        with cls._lock:
+            return cls._jobs.get(job_id)
+
+    @classmethod
+    def wait(cls, job: RecalculationJob, timeout: Optional[float] = None) -> RecalculationJob:
+        """Block until the job finishes (or timeout) and return it"""
+        job.future.result(timeout=timeout)
+        return job
+
+    @classmethod
+    def _run(cls, job: RecalculationJob):
+        db = SessionLocal()
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now(timezone.utc)
+
+        def report(fraction: float, stage: str):
+            job.progress = fraction
+            job.stage = stage
+
+        try:
+            portfolio = db.query(Portfolio).filter(Portfolio.id == job.portfolio_id).first()
+            if not portfolio:
+                raise ValueError("Portfolio not found")
+            result, job.values_calculated = BacktestService.recalculate_portfolio(
+                db, portfolio, job.starting_value,
+                daily_curve=job.daily_curve, full_replay=job.full_replay, progress=report
+            )
+            job.errors = result.errors
+            job.status = JobStatus.SUCCEEDED
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Recalculation job {job.id} for portfolio {job.portfolio_id} failed: {e}")
+            job.error = str(e)
+            job.stage = "Failed"
+            job.status = JobStatus.FAILED
+        finally:
+            db.close()
+            job.finished_at = datetime.now(timezone.utc)
+            with cls._lock:
+                if cls._active.get(job.portfolio_id) == job.id:
+                    del cls._active[job.portfolio_id]
+
+    @classmethod
+    def _prune(cls):
+        """Forget finished jobs past retention; caller holds the lock"""
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        expired = [
+            job_id for job_id, job in cls._jobs.items()
+            if job.done and job.finished_at and job.finished_at.timestamp() < cutoff
+        ]
+        for job_id in expired:
+            del cls._jobs[job_id]
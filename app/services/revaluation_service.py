@@ -0,0 +1,61 @@
+import logging
+from typing import Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models.portfolio import Portfolio
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.services.backtest_service import BacktestService
+from app.services.holdings_valuation_service import HoldingsValuationService
+from app.services.leaderboard_service import LeaderboardService
+from app.services.portfolio_symbol_service import PortfolioSymbolService
+from app.services.price_watermark_service import SymbolsChanged
+
+logger = logging.getLogger(__name__)
+
+
+class RevaluationService:
+    """Recalculate only the portfolios a set of price changes can reach"""
+
+    @staticmethod
+    def revalue_symbols(db: Session, symbols: Sequence[str]) -> int:
+        """
+        Recalculate every portfolio that references one of the symbols:
+        snapshot portfolios through the backtest (resuming from checkpoints,
+        which ingestion invalidates from the first rewritten day), holdings
+        portfolios through their daily valuation. Commits per portfolio and
+        re-ranks the leaderboards if anything moved; returns portfolios updated.
+        """
+        portfolio_ids = PortfolioSymbolService.get_portfolios(db, symbols)
+        if not portfolio_ids:
+            return 0
+        with_snapshots = {
+            row[0] for row in db.query(PortfolioSnapshot.portfolio_id).filter(
+                PortfolioSnapshot.portfolio_id.in_(portfolio_ids)
+            ).distinct()
+        }
+
+        updated = 0
+        for portfolio in db.query(Portfolio).filter(Portfolio.id.in_(portfolio_ids)).all():
+            try:
+                if portfolio.id in with_snapshots:
+                    BacktestService.recalculate_portfolio(db, portfolio, BacktestService.starting_value(portfolio))
+                else:
+                    HoldingsValuationService.recalculate(db, portfolio)
+                updated += 1
+            except Exception as e:
+                logger.error(f"  ❌ Could not revalue portfolio {portfolio.id}: {e}")
+                db.rollback()
+
+        if updated:
+            LeaderboardService.refresh_all(db)
+        logger.info(f"🎯 Revalued {updated}/{len(portfolio_ids)} portfolios referencing {len(symbols)} changed symbols")
+        return updated
+
+    @staticmethod
+    def on_symbols_changed(db: Session, event: SymbolsChanged) -> int:
+        """Handle a "symbols changed since T" event from ingestion; returns portfolios updated"""
+        if not event.symbols:
+            return 0
+        logger.info(f"🔔 {len(event.symbols)} symbols changed since {event.since}: {', '.join(event.symbols[:20])}")
+        return RevaluationService.revalue_symbols(db, event.symbols)
@@ -0,0 +1,283 @@
+"""
+Return and risk statistics over equity curves.
+
+Pure NumPy, no database access: inputs are value or return arrays in date
+order, as produced by the backtest engine. Volatility and drawdowns are in
+percent; Sharpe, Sortino and beta are plain ratios, annualized over
+TRADING_DAYS_PER_YEAR where applicable.
+"""
+from dataclasses import asdict, dataclass, fields
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+VOLATILITY_WINDOW_DAYS = 30
+# Annual rate subtracted from returns for Sharpe and Sortino
+DEFAULT_RISK_FREE_RATE = 0.0
+BENCHMARK_SYMBOL = "SPY"
+
+
+def daily_returns(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (amount, fraction) change from the previous day for each point of a curve.
+    The first point has no previous day and gets zero.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.array([]), np.array([])
+    amount = np.diff(values, prepend=values[0])
+    previous = np.concatenate(([values[0]], values[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(previous != 0, amount / previous, 0.0)
+    return amount, fraction
+
+
+def rolling_volatility(returns: np.ndarray, window: int = VOLATILITY_WINDOW_DAYS) -> np.ndarray:
+    """Annualized rolling standard deviation (in %) of daily returns; NaN until the window fills"""
+    returns = np.asarray(returns, dtype=np.float64)
+    out = np.full(len(returns), np.nan)
+    if len(returns) < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    out[window - 1:] = windows.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR) * 100
+    return out
+
+
+def max_drawdown(values: np.ndarray) -> float:
+    """Largest peak-to-trough decline in % (0 or negative)"""
+    drawdowns = drawdown_series(values)
+    return float(drawdowns.min()) if len(drawdowns) else 0.0
+
+
+def drawdown_series(values: np.ndarray) -> np.ndarray:
+    """Decline from the running peak in % for each point"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.array([])
+    peaks = np.maximum.accumulate(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(peaks > 0, (values / peaks - 1.0) * 100, 0.0)
+
+
+def rolling_sharpe(returns: np.ndarray, window: int, risk_free_rate: float = DEFAULT_RISK_FREE_RATE) -> np.ndarray:
+    """Annualized Sharpe ratio over each trailing window; NaN until the window fills"""
+    returns = np.asarray(returns, dtype=np.float64)
+    out = np.full(len(returns), np.nan)
+    if len(returns) < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    excess = windows.mean(axis=1) - risk_free_rate / TRADING_DAYS_PER_YEAR
+    std = windows.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[window - 1:] = np.where(std > 0, excess / std * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+    return out
+
+
+def rolling_max_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """Worst drawdown in % within each trailing window of values; NaN until the window fills"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    peaks = np.maximum.accumulate(windows, axis=1)
+    out[window - 1:] = ((windows / peaks - 1.0) * 100).min(axis=1)
+    return out
+
+
+def rolling_beta(returns: np.ndarray, benchmark_returns: np.ndarray, window: int) -> np.ndarray:
+    """Beta against the benchmark over each trailing window; NaN where the window has gaps"""
+    returns = np.asarray(returns, dtype=np.float64)
+    benchmark_returns = np.asarray(benchmark_returns, dtype=np.float64)
+    out = np.full(len(returns), np.nan)
+    if len(returns) < window:
+        return out
+    r = np.lib.stride_tricks.sliding_window_view(returns, window)
+    b = np.lib.stride_tricks.sliding_window_view(benchmark_returns, window)
+    r_dev = r - r.mean(axis=1, keepdims=True)
+    b_dev = b - b.mean(axis=1, keepdims=True)
+    variance = (b_dev * b_dev).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[window - 1:] = np.where(variance > 0, (r_dev * b_dev).sum(axis=1) / variance, np.nan)
+    return out
+
+
+class RiskMetrics(NamedTuple):
+    volatility: Optional[float]
+    sharpe_ratio: Optional[float]
+    sortino_ratio: Optional[float]
+    max_drawdown: Optional[float]
+    beta: Optional[float]
+
+
+@dataclass
+class RiskState:
+    """
+    Running aggregates behind RiskMetrics, so appending one day is O(1).
+
+    Return moments use Welford's update; beta uses the co-moment of the
+    days where both the portfolio and the benchmark have a return.
+    """
+    risk_free_rate: float = DEFAULT_RISK_FREE_RATE
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    downside_sq: float = 0.0
+    peak: float = 0.0
+    max_drawdown: float = 0.0
+    last_value: Optional[float] = None
+    # Paired portfolio/benchmark returns
+    pair_count: int = 0
+    pair_mean: float = 0.0
+    bench_mean: float = 0.0
+    bench_m2: float = 0.0
+    co_moment: float = 0.0
+    last_benchmark: Optional[float] = None
+
+    @classmethod
+    def from_curve(cls, values: np.ndarray, benchmark: Optional[np.ndarray] = None,
+                   risk_free_rate: float = DEFAULT_RISK_FREE_RATE) -> "RiskState":
+        """Aggregates over a whole curve in one vectorized pass; benchmark is aligned to values (NaN = missing)"""
+        values = np.asarray(values, dtype=np.float64)
+        state = cls(risk_free_rate=risk_free_rate)
+        if len(values) == 0:
+            return state
+
+        _, returns = daily_returns(values)
+        returns = returns[1:]
+        rf_daily = risk_free_rate / TRADING_DAYS_PER_YEAR
+        state.count = len(returns)
+        if state.count:
+            state.mean = float(returns.mean())
+            state.m2 = float(((returns - state.mean) ** 2).sum())
+            downside = np.minimum(returns - rf_daily, 0.0)
+            state.downside_sq = float((downside * downside).sum())
+        state.peak = float(values.max())
+        state.max_drawdown = max_drawdown(values)
+        state.last_value = float(values[-1])
+
+        if benchmark is not None and len(benchmark) == len(values):
+            benchmark = np.asarray(benchmark, dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                bench_returns = benchmark[1:] / benchmark[:-1] - 1.0
+            paired = np.isfinite(bench_returns)
+            r, b = returns[paired], bench_returns[paired]
+            state.pair_count = len(r)
+            if state.pair_count:
+                state.pair_mean = float(r.mean())
+                state.bench_mean = float(b.mean())
+                state.bench_m2 = float(((b - state.bench_mean) ** 2).sum())
+                state.co_moment = float(((r - state.pair_mean) * (b - state.bench_mean)).sum())
+            state.last_benchmark = float(benchmark[-1]) if np.isfinite(benchmark[-1]) else None
+        return state
+
+    def update(self, value: float, benchmark: Optional[float] = None):
+        """Append one day's portfolio value (and benchmark close, if known)"""
+        if self.last_value is None:
+            self.last_value = self.peak = float(value)
+            self.last_benchmark = None if benchmark is None else float(benchmark)
+            return
+
+        r = value / self.last_value - 1.0 if self.last_value else 0.0
+        self.count += 1
+        delta = r - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (r - self.mean)
+        excess = min(r - self.risk_free_rate / TRADING_DAYS_PER_YEAR, 0.0)
+        self.downside_sq += excess * excess
+
+        self.peak = max(self.peak, float(value))
+        if self.peak > 0:
+            self.max_drawdown = min(self.max_drawdown, (value / self.peak - 1.0) * 100)
+        self.last_value = float(value)
+
+        if benchmark is not None and self.last_benchmark:
+            b = benchmark / self.last_benchmark - 1.0
+            self.pair_count += 1
+            r_delta = r - self.pair_mean
+            b_delta = b - self.bench_mean
+            self.pair_mean += r_delta / self.pair_count
+            self.bench_mean += b_delta / self.pair_count
+            self.bench_m2 += b_delta * (b - self.bench_mean)
+            self.co_moment += r_delta * (b - self.bench_mean)
+        # A missing close breaks the pairing for the next day too, as in from_curve
+        self.last_benchmark = None if benchmark is None else float(benchmark)
+
+    def metrics(self) -> RiskMetrics:
+        if self.count < 2:
+            return RiskMetrics(None, None, None, self.max_drawdown if self.last_value is not None else None, None)
+        std = np.sqrt(self.m2 / (self.count - 1))
+        excess = self.mean - self.risk_free_rate / TRADING_DAYS_PER_YEAR
+        downside = np.sqrt(self.downside_sq / self.count)
+        annualizer = np.sqrt(TRADING_DAYS_PER_YEAR)
+        beta = self.co_moment / self.bench_m2 if self.pair_count >= 2 and self.bench_m2 > 0 else None
+        return RiskMetrics(
+            volatility=float(std * annualizer * 100),
+            sharpe_ratio=float(excess / std * annualizer) if std > 0 else None,
+            sortino_ratio=float(excess / downside * annualizer) if downside > 0 else None,
+            max_drawdown=float(self.max_drawdown),
+            beta=None if beta is None else float(beta),
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Optional[dict]) -> Optional["RiskState"]:
+        if not data:
+            return None
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+
+def compute_risk_metrics(values: np.ndarray, benchmark: Optional[np.ndarray] = None,
+                         risk_free_rate: float = DEFAULT_RISK_FREE_RATE) -> RiskMetrics:
+    """Volatility, Sharpe, Sortino, max drawdown and beta for a daily value curve"""
+    return RiskState.from_curve(values, benchmark, risk_free_rate).metrics()
+
+
+class RelativeMetrics(NamedTuple):
+    """Per-benchmark arrays, one entry per benchmark column; NaN where undefined"""
+    benchmark_return: np.ndarray  # compounded over paired days, %
+    excess_return: np.ndarray  # portfolio minus benchmark over paired days, percentage points
+    tracking_error: np.ndarray  # annualized std of daily active returns, %
+    information_ratio: np.ndarray
+    up_capture: np.ndarray  # %, mean return on benchmark up days relative to the benchmark's
+    down_capture: np.ndarray  # %, same on benchmark down days
+
+
+def relative_metrics(returns: np.ndarray, benchmark_returns: np.ndarray) -> RelativeMetrics:
+    """
+    Compare daily portfolio returns (T,) with K benchmarks (T, K) at once.
+    Each column only uses the days where its return is known, so a
+    benchmark with a shorter history is compared over its own overlap.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    bench = np.asarray(benchmark_returns, dtype=np.float64).reshape(len(returns), -1)
+    paired = np.isfinite(bench) & np.isfinite(returns)[:, None]
+    count = paired.sum(axis=0)
+    r = np.where(paired, returns[:, None], 0.0)
+    b = np.where(paired, bench, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        portfolio_growth = np.exp(np.log1p(r).sum(axis=0))
+        benchmark_growth = np.exp(np.log1p(b).sum(axis=0))
+        benchmark_return = np.where(count > 0, (benchmark_growth - 1.0) * 100, np.nan)
+        excess_return = np.where(count > 0, (portfolio_growth - benchmark_growth) * 100, np.nan)
+
+        active = r - b
+        active_mean = active.sum(axis=0) / count
+        active_var = (np.where(paired, active - active_mean, 0.0) ** 2).sum(axis=0) / (count - 1)
+        active_std = np.sqrt(np.where(count > 1, active_var, np.nan))
+        tracking_error = active_std * np.sqrt(TRADING_DAYS_PER_YEAR) * 100
+        information_ratio = np.where(active_std > 0, active_mean / active_std * np.sqrt(TRADING_DAYS_PER_YEAR), np.nan)
+
+        up = paired & (bench > 0)
+        down = paired & (bench < 0)
+        up_capture = (np.where(up, r, 0.0).sum(axis=0) / np.where(up, b, 0.0).sum(axis=0)) * 100
+        down_capture = (np.where(down, r, 0.0).sum(axis=0) / np.where(down, b, 0.0).sum(axis=0)) * 100
+
+    return RelativeMetrics(benchmark_return, excess_return, tracking_error, information_ratio,
+                           np.where(up.any(axis=0), up_capture, np.nan),
+                           np.where(down.any(axis=0), down_capture, np.nan))
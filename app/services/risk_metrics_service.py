@@ -0,0 +1,48 @@
+import logging
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.historical_performance import HistoricalPerformance
+from app.models.portfolio import Portfolio
+from app.services.benchmark_service import BenchmarkService
+from app.services.price_lookup import to_day_array
+from app.services.risk_metrics import BENCHMARK_SYMBOL, RiskState
+
+logger = logging.getLogger(__name__)
+
+
+class RiskMetricsService:
+    """Keeps a portfolio's volatility, Sharpe, Sortino, drawdown and beta in step with its curve"""
+
+    @staticmethod
+    def load_benchmark(db: Session, dates: np.ndarray) -> np.ndarray:
+        """Benchmark closes aligned to the given trading days (NaN where unknown)"""
+        return BenchmarkService.load_aligned(db, [BENCHMARK_SYMBOL], dates)[:, 0]
+
+    @staticmethod
+    def apply(portfolio: Portfolio, state: RiskState):
+        """Copy metrics and the running state onto the portfolio row"""
+        metrics = state.metrics()
+        portfolio.volatility = metrics.volatility
+        portfolio.sharpe_ratio = metrics.sharpe_ratio
+        portfolio.sortino_ratio = metrics.sortino_ratio
+        portfolio.max_drawdown = metrics.max_drawdown
+        portfolio.beta = metrics.beta
+        portfolio.risk_state = state.to_dict()
+
+    @staticmethod
+    def refresh(db: Session, portfolio: Portfolio) -> RiskState:
+        """
+        Recompute from the full stored curve in one pass. Call after the
+        curve was rewritten; runs in the caller's transaction.
+        """
+        rows = db.query(HistoricalPerformance.date, HistoricalPerformance.total_value).filter(
+            HistoricalPerformance.portfolio_id == portfolio.id
+        ).order_by(HistoricalPerformance.date).all()
+        dates = to_day_array([row.date for row in rows])
+        values = np.array([row.total_value for row in rows], dtype=np.float64)
+
+        state = RiskState.from_curve(values, RiskMetricsService.load_benchmark(db, dates))
+        RiskMetricsService.apply(portfolio, state)
+        return state
@@ -0,0 +1,47 @@
+from typing import List
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.models.portfolio_snapshot import PortfolioSnapshot
+from app.models.snapshot_allocation import SnapshotAllocation
+
+
+class SnapshotAllocationService:
+    """Set-based questions over snapshot allocations, answered from their indexes"""
+
+    @staticmethod
+    def current_holders(symbol: str):
+        """
+        Select of portfolio ids whose latest snapshot allocates to symbol,
+        for use in an IN filter.
+        """
+        latest = select(
+            PortfolioSnapshot.portfolio_id,
+            func.max(PortfolioSnapshot.snapshot_date).label("snapshot_date")
+        ).group_by(PortfolioSnapshot.portfolio_id).subquery()
+
+        return select(PortfolioSnapshot.portfolio_id).join(
+            latest, and_(
+                PortfolioSnapshot.portfolio_id == latest.c.portfolio_id,
+                PortfolioSnapshot.snapshot_date == latest.c.snapshot_date
+            )
+        ).join(
+            SnapshotAllocation, SnapshotAllocation.snapshot_id == PortfolioSnapshot.id
+        ).where(SnapshotAllocation.symbol == symbol.strip().upper())
+
+    @staticmethod
+    def get_portfolios_ever_holding(db: Session, symbol: str) -> List[int]:
+        """Portfolio ids with any snapshot allocating to symbol"""
+        return db.scalars(
+            select(PortfolioSnapshot.portfolio_id).distinct().join(
+                SnapshotAllocation, SnapshotAllocation.snapshot_id == PortfolioSnapshot.id
+            ).where(SnapshotAllocation.symbol == symbol.strip().upper())
+        ).all()
+
+    @staticmethod
+    def get_required_symbols(db: Session) -> List[str]:
+        """Every symbol some snapshot allocates to, i.e. what all backtests need priced"""
+        return db.scalars(
+            select(SnapshotAllocation.symbol).distinct().order_by(SnapshotAllocation.symbol)
+        ).all()
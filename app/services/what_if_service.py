@@ -0,0 +1,79 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.services.backtest_engine import AllocationSchedule, BacktestResult, run_backtest_batch
+from app.services.price_lookup import DEFAULT_MAX_GAP_DAYS
+from app.services.price_panel_service import PricePanelService
+from app.services.risk_metrics import BENCHMARK_SYMBOL, RiskMetrics, RiskState
+
+logger = logging.getLogger(__name__)
+
+# Schedules x lags x starting values evaluated in one request
+MAX_SCENARIOS = 500
+
+
+@dataclass
+class WhatIfScenario:
+    name: str
+    lag_days: int
+    result: BacktestResult
+    metrics: RiskMetrics
+
+    @property
+    def annualized_return_percentage(self) -> float:
+        """Compound annual growth over the curve, in %"""
+        if len(self.result.values) < 2 or self.result.starting_value <= 0:
+            return 0.0
+        days = int((self.result.dates[-1] - self.result.dates[0]) / np.timedelta64(1, "D"))
+        if days <= 0 or self.result.final_value <= 0:
+            return 0.0
+        growth = self.result.final_value / self.result.starting_value
+        return (growth ** (365.25 / days) - 1.0) * 100
+
+
+class WhatIfService:
+    """Evaluates many allocation schedules and parameter variants over one price load"""
+
+    @staticmethod
+    def run(db: Session, schedules: Sequence[Tuple[str, AllocationSchedule]],
+            starting_values: Sequence[float] = (100000.0,),
+            lags: Sequence[int] = (0,)) -> List[WhatIfScenario]:
+        """
+        One scenario per (schedule, lag, starting value), in that order.
+        Prices for every symbol involved are read once; each lag is one
+        batched engine pass over all schedules, and starting values only
+        rescale its results.
+        """
+        count = len(schedules) * len(lags) * len(starting_values)
+        if count > MAX_SCENARIOS:
+            raise ValueError(f"{count} scenarios requested; the limit is {MAX_SCENARIOS}")
+        non_empty = [schedule for _, schedule in schedules if len(schedule)]
+        if not non_empty:
+            raise ValueError("No schedule has a usable rebalance")
+
+        symbols = sorted({symbol for schedule in non_empty for symbol in schedule.symbols})
+        start_date = min(schedule.dates[0] for schedule in non_empty).item() - timedelta(days=DEFAULT_MAX_GAP_DAYS)
+        prices = PricePanelService.load_matrix(db, symbols + [BENCHMARK_SYMBOL], start_date, datetime.now().date())
+        benchmark = prices.column(BENCHMARK_SYMBOL)
+
+        scenarios = []
+        for lag in lags:
+            shifted = [schedule.shifted(lag) for _, schedule in schedules]
+            results = run_backtest_batch(shifted, prices.dates, prices.symbols, prices.values, starting_values[0])
+            for (name, _), result in zip(schedules, results):
+                # Risk ratios do not depend on the starting value
+                metrics = RiskState.from_curve(result.values, benchmark[len(benchmark) - len(result.values):]).metrics()
+                for starting_value in starting_values:
+                    scaled = result if starting_value == starting_values[0] else result.scaled(starting_value)
+                    scenarios.append(WhatIfScenario(name, lag, scaled, metrics))
+
+        logger.info(
+            f"🧪 Evaluated {len(scenarios)} what-if scenarios over {len(symbols)} symbols "
+            f"and {len(prices.dates)} trading days"
+        )
+        return scenarios
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""
+Offline backtest benchmarks with recorded baselines.
+
+Times the legacy lookup path (find_closest_price, calculate_intermediate_values,
+the old calculate-values loop), both engine modes, batched what-if runs and
+the in-memory part of the calculate-values flow (schedule, engine, risk
+metrics, curve rows, checkpoint hashes) on synthetic prices and schedules.
+No database or network is used.
+
+Timings are divided by a fixed NumPy/Python calibration workload timed
+alongside each case, so baselines recorded on one machine stay meaningful
+on another. A case fails when its normalized time exceeds the baseline by more
+than --threshold.
+
+    python benchmarks/bench_backtest.py                    # compare to baselines
+    python benchmarks/bench_backtest.py --only engine      # cases whose name contains "engine"
+    python benchmarks/bench_backtest.py --update-baselines # record new baselines
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Nothing here connects; app.database.connection only needs a URL to import
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import argparse
+import json
+import platform
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from app.services.backtest_checkpoint_service import BacktestCheckpointService
+from app.services.backtest_engine import AllocationSchedule, EngineMode, run_backtest, run_backtest_batch
+from app.services.performance_service import PerformanceService
+from app.services.risk_metrics import RiskState
+from benchmarks import legacy_backtest
+from benchmarks.synthetic import price_dicts, price_panel, snapshot_schedule, symbols_for
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_REPEAT = 5
+
+# (frequency, universe size, assets per rebalance)
+ENGINE_SIZES = [
+    ("monthly", 10, 3),
+    ("monthly", 300, 30),
+    ("weekly", 30, 10),
+    ("weekly", 300, 100),
+    ("daily", 30, 10),
+    ("daily", 300, 300),
+]
+# The legacy path is pure Python; larger sizes take minutes
+LEGACY_SIZES = [
+    ("monthly", 10, 3),
+    ("weekly", 30, 10),
+]
+
+
+def calibration_workload():
+    """Fixed mix of NumPy and pure-Python work, roughly like the cases"""
+    matrix = np.random.default_rng(0).random((300, 300))
+    for _ in range(3):
+        np.cumsum(matrix @ matrix, axis=0)
+    lookup = {str(i): i for i in range(15000)}
+    return sum(lookup[str(i)] for i in range(15000))
+
+
+def build_inputs(frequency: str, universe: int, assets: int, seed: int = 0) -> dict:
+    symbols = symbols_for(universe)
+    dates, prices = price_panel(symbols, seed=seed, missing_fraction=0.001)
+    entries = snapshot_schedule(symbols, frequency, assets, seed=seed)
+    return {"symbols": symbols, "dates": dates, "prices": prices, "entries": entries}
+
+
+def calculate_values_flow(inputs: dict):
+    """What a recalculation does between reading snapshots/prices and writing rows"""
+    entries = inputs["entries"]
+    snapshots = [
+        SimpleNamespace(snapshot_date=on_date, assets=",".join(assets), weights=",".join(map(str, weights)))
+        for on_date, assets, weights in entries
+    ]
+    BacktestCheckpointService.prefix_hashes(snapshots, 100000.0)
+    schedule = AllocationSchedule.from_allocations(entries)
+    result = run_backtest(schedule, inputs["dates"], inputs["symbols"], inputs["prices"])
+    RiskState.from_curve(result.values).metrics()
+    return PerformanceService.build_rows(1, result.dates, result.values, result.starting_value)
+
+
+def legacy_lookups(inputs: dict):
+    """Every find_closest_price call the old loop makes at rebalance dates"""
+    data = inputs["price_dicts"]
+    return [
+        legacy_backtest.find_closest_price(data[asset], on_date.strftime('%Y-%m-%d'))
+        for on_date, assets, _ in inputs["entries"] for asset in assets
+    ]
+
+
+def legacy_intermediate(inputs: dict):
+    """Weekly valuation of equal holdings between every pair of rebalances"""
+    data = inputs["price_dicts"]
+    entries = inputs["entries"]
+    values = []
+    for (on_date, assets, _), (next_date, _, _) in zip(entries, entries[1:]):
+        holdings = {asset: 1.0 for asset in assets}
+        values.extend(legacy_backtest.calculate_intermediate_values(
+            holdings, data, on_date.strftime('%Y-%m-%d'), next_date.strftime('%Y-%m-%d')
+        ))
+    return values
+
+
+def build_cases() -> List[Tuple[str, Callable[[], dict], Callable[[dict], object]]]:
+    """(name, input builder, timed function); inputs are built outside the timing"""
+    cases = []
+    for frequency, universe, assets in LEGACY_SIZES:
+        label = f"{frequency}-{universe}x{assets}"
+
+        def legacy_inputs(frequency=frequency, universe=universe, assets=assets):
+            inputs = build_inputs(frequency, universe, assets)
+            inputs["price_dicts"] = price_dicts(inputs["symbols"], inputs["dates"], inputs["prices"])
+            return inputs
+
+        cases.append((f"legacy.find_closest_price[{label}]", legacy_inputs, legacy_lookups))
+        cases.append((f"legacy.calculate_intermediate_values[{label}]", legacy_inputs, legacy_intermediate))
+        cases.append((f"legacy.calculate_values[{label}]", legacy_inputs,
+                      lambda inputs: legacy_backtest.calculate_values(inputs["entries"], inputs["price_dicts"])))
+
+    for frequency, universe, assets in ENGINE_SIZES:
+        label = f"{frequency}-{universe}x{assets}"
+        inputs_for = lambda frequency=frequency, universe=universe, assets=assets: build_inputs(frequency, universe, assets)
+        for mode in EngineMode:
+            cases.append((
+                f"engine.{mode.value}[{label}]", inputs_for,
+                lambda inputs, mode=mode: run_backtest(
+                    AllocationSchedule.from_allocations(inputs["entries"]),
+                    inputs["dates"], inputs["symbols"], inputs["prices"], mode=mode
+                )
+            ))
+        cases.append((f"flow.calculate_values[{label}]", inputs_for, calculate_values_flow))
+
+    def batch_inputs():
+        inputs = build_inputs("monthly", 300, 30)
+        inputs["schedules"] = [
+            AllocationSchedule.from_allocations(snapshot_schedule(inputs["symbols"], "monthly", 30, seed=seed))
+            for seed in range(50)
+        ]
+        return inputs
+
+    cases.append(("engine.batch[monthly-300x30 x50]", batch_inputs,
+                  lambda inputs: run_backtest_batch(inputs["schedules"], inputs["dates"],
+                                                    inputs["symbols"], inputs["prices"])))
+    return cases
+
+
+def time_case(fn: Callable[[dict], object], inputs: dict, repeat: int) -> Tuple[float, float]:
+    """
+    Best seconds of the case and of the calibration workload, timed
+    alternately so both see the same machine load.
+    """
+    best = calibration = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calibration_workload()
+        elapsed = time.perf_counter() - start
+        calibration = elapsed if calibration is None else min(calibration, elapsed)
+
+        start = time.perf_counter()
+        fn(inputs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, calibration
+
+
+def load_baselines() -> Dict[str, float]:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f).get("cases", {})
+
+
+def save_baselines(results: Dict[str, float]):
+    baselines = load_baselines()
+    baselines.update(results)
+    with open(BASELINES_PATH, "w") as f:
+        json.dump({
+            "note": "Normalized times: seconds / calibration seconds. Regenerate with --update-baselines.",
+            "recorded_with": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+            },
+            "cases": {name: round(value, 4) for name, value in sorted(baselines.items())},
+        }, f, indent=2)
+        f.write("\n")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help="Run only cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown over baseline as a fraction (0.5 = 50%%)")
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    print(f"Best of {args.repeat} per case; norm = case time / calibration time measured alongside it")
+    print(f"  {'case':<52} {'ms':>10} {'norm':>8} {'baseline':>9} {'change':>8}")
+
+    results = {}
+    regressions = []
+    for name, make_inputs, fn in build_cases():
+        if args.only not in name:
+            continue
+        inputs = make_inputs()
+        seconds, calibration = time_case(fn, inputs, args.repeat)
+        normalized = seconds / calibration
+        results[name] = normalized
+
+        baseline = baselines.get(name)
+        if baseline:
+            change = normalized / baseline - 1.0
+            flag = "  REGRESSION" if change > args.threshold else ""
+            if flag:
+                regressions.append(name)
+            print(f"  {name:<52} {seconds * 1000:>10.1f} {normalized:>8.3f} {baseline:>9.3f} {change:>+7.0%}{flag}")
+        else:
+            print(f"  {name:<52} {seconds * 1000:>10.1f} {normalized:>8.3f} {'-':>9} {'new':>8}")
+
+    if args.update_baselines:
+        save_baselines(results)
+        print(f"📝 Recorded {len(results)} baselines in {BASELINES_PATH}")
+        return 0
+    if regressions:
+        print(f"❌ {len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
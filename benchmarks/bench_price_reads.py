@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Compare rows/sec of the ORM price path against the Core repository path.
+
+Needs DATABASE_URL pointing at a database with asset_prices populated:
+
+    python benchmarks/bench_price_reads.py --symbols SPY,QQQ,TLT,GLD --repeat 5
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from app.database.connection import SessionLocal
+from app.models.asset_price import AssetPrice
+from app.repositories.price_repository import PriceRepository
+
+
+def orm_price_dicts(db, symbols):
+    """The original route path: hydrate ORM instances, then convert to dicts"""
+    prices = db.query(AssetPrice).filter(
+        AssetPrice.symbol.in_(symbols)
+    ).order_by(AssetPrice.symbol, AssetPrice.date.asc()).all()
+    return [
+        {
+            "symbol": p.symbol,
+            "date": p.date.isoformat(),
+            "open_price": p.open_price,
+            "high_price": p.high_price,
+            "low_price": p.low_price,
+            "close_price": p.close_price,
+            "adjusted_close": p.adjusted_close,
+            "volume": p.volume
+        }
+        for p in prices
+    ]
+
+
+def core_price_dicts(db, symbols):
+    """Repository path: column-selected rows converted to the same dicts"""
+    return [
+        {
+            "symbol": p.symbol,
+            "date": p.date.isoformat(),
+            "open_price": p.open_price,
+            "high_price": p.high_price,
+            "low_price": p.low_price,
+            "close_price": p.close_price,
+            "adjusted_close": p.adjusted_close,
+            "volume": p.volume
+        }
+        for p in PriceRepository.fetch_price_rows(db, symbols)
+    ]
+
+
+def orm_adjusted_closes(db, symbols):
+    """The original backtest loader: one ORM query per symbol"""
+    rows = []
+    for symbol in symbols:
+        rows.extend((p.date, p.adjusted_close) for p in db.query(AssetPrice).filter(
+            AssetPrice.symbol == symbol
+        ).all())
+    return rows
+
+
+def core_adjusted_closes(db, symbols):
+    rows = []
+    for symbol in symbols:
+        rows.extend(PriceRepository.fetch_adjusted_closes(db, symbol))
+    return rows
+
+
+def batched_adjusted_closes(db, symbols):
+    """One round trip for every symbol"""
+    return PriceRepository.fetch_adjusted_closes_for_symbols(db, symbols)
+
+
+def time_case(name, fn, db, symbols, repeat):
+    best = None
+    row_count = 0
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        row_count = len(fn(db, symbols))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = row_count / best if best else 0.0
+    print(f"  {name:<24} {row_count:>9,} rows  {best * 1000:>9.1f} ms  {rate:>12,.0f} rows/sec")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", default="SPY,QQQ,TLT,GLD,EEM,EFA", help="Comma-separated symbols")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    db = SessionLocal()
+    try:
+        print(f"Price read benchmark over {symbols} (best of {args.repeat})")
+        print("Route serialization:")
+        orm_rate = time_case("ORM query().all()", orm_price_dicts, db, symbols, args.repeat)
+        core_rate = time_case("Core repository", core_price_dicts, db, symbols, args.repeat)
+        print(f"  speedup: {core_rate / orm_rate:.2f}x" if orm_rate else "  no rows read")
+
+        print("Backtest loader (date, adjusted_close):")
+        orm_rate = time_case("ORM query().all()", orm_adjusted_closes, db, symbols, args.repeat)
+        core_rate = time_case("Core repository", core_adjusted_closes, db, symbols, args.repeat)
+        batched_rate = time_case("Core single query", batched_adjusted_closes, db, symbols, args.repeat)
+        print(f"  speedup: {core_rate / orm_rate:.2f}x per-symbol, {batched_rate / orm_rate:.2f}x batched"
+              if orm_rate else "  no rows read")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+The original calculate-values simulation, kept only as a benchmark baseline.
+
+Copied from the route as it was before the array engine, with the print
+statements and database writes removed.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def find_closest_price(price_dict: Dict[str, float], target_date: str) -> Optional[float]:
+    """Find the closest available price to target date within 7 days"""
+    if target_date in price_dict:
+        return price_dict[target_date]
+
+    target = datetime.strptime(target_date, '%Y-%m-%d')
+
+    # Search within 7 days (weekends/holidays)
+    for days_offset in range(1, 8):
+        # Try before target date first (more likely to have data)
+        before_date = (target - timedelta(days=days_offset)).strftime('%Y-%m-%d')
+        if before_date in price_dict:
+            return price_dict[before_date]
+
+        # Try after target date
+        after_date = (target + timedelta(days=days_offset)).strftime('%Y-%m-%d')
+        if after_date in price_dict:
+            return price_dict[after_date]
+
+    return None
+
+
+def calculate_portfolio_value_on_date(holdings: Dict[str, float], price_data: Dict[str, Dict[str, float]],
+                                      date: str) -> float:
+    """Calculate portfolio value on a specific date given current holdings"""
+    total_value = 0.0
+    for symbol, shares in holdings.items():
+        if symbol in price_data:
+            price = find_closest_price(price_data[symbol], date)
+            if price:
+                total_value += shares * price
+    return total_value
+
+
+def calculate_intermediate_values(holdings: Dict[str, float], price_data: Dict[str, Dict[str, float]],
+                                  start_date: str, end_date: str) -> List[float]:
+    """Calculate portfolio values between rebalancing dates (weekly intervals)"""
+    values = []
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+
+    current = start + timedelta(days=7)
+    while current < end:
+        date_str = current.strftime('%Y-%m-%d')
+        value = calculate_portfolio_value_on_date(holdings, price_data, date_str)
+        if value > 0:
+            values.append(value)
+        current += timedelta(days=7)
+    return values
+
+
+def calculate_values(entries: Sequence[Tuple[date, List[str], List[float]]],
+                     price_data: Dict[str, Dict[str, float]],
+                     starting_value: float = 100000.0) -> Tuple[List[float], List[str]]:
+    """The rebalancing loop; returns (value after each rebalance, errors)"""
+    portfolio_value = starting_value
+    current_holdings = {}
+    rebalance_values = []
+    errors = []
+
+    for i, (on_date, assets, weights) in enumerate(entries):
+        rebalance_date = on_date.strftime('%Y-%m-%d')
+        new_assets = [s.strip().upper() for s in assets]
+        new_weights = [float(w) for w in weights]
+
+        weight_sum = sum(new_weights)
+        if abs(weight_sum - 100.0) > 0.1:
+            errors.append(f"Rebalance {i+1}: Weights sum to {weight_sum}%, not 100%")
+            new_weights = [w * 100.0 / weight_sum for w in new_weights]
+
+        if current_holdings:
+            portfolio_value = calculate_portfolio_value_on_date(current_holdings, price_data, rebalance_date)
+
+        new_holdings = {}
+        for asset, weight_pct in zip(new_assets, new_weights):
+            if asset not in price_data:
+                errors.append(f"Rebalance {i+1}: No price data for {asset}")
+                continue
+            price = find_closest_price(price_data[asset], rebalance_date)
+            if not price:
+                errors.append(f"Rebalance {i+1}: No price for {asset} near {rebalance_date}")
+                continue
+            new_holdings[asset] = portfolio_value * (weight_pct / 100.0) / price
+
+        current_holdings = new_holdings
+        portfolio_value = calculate_portfolio_value_on_date(current_holdings, price_data, rebalance_date)
+        rebalance_values.append(portfolio_value)
+
+        if i < len(entries) - 1:
+            next_rebalance_date = entries[i + 1][0]
+            intermediate_values = calculate_intermediate_values(
+                current_holdings, price_data, rebalance_date, next_rebalance_date.strftime('%Y-%m-%d')
+            )
+            portfolio_value = intermediate_values[-1] if intermediate_values else portfolio_value
+
+    return rebalance_values, errors
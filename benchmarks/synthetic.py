@@ -0,0 +1,70 @@
+"""
+Seeded synthetic inputs for the backtest benchmarks.
+
+Prices are random walks on business days with a few holidays dropped, so
+lookups hit the same weekend/holiday gaps as real data. Schedules mirror
+the bundled CSVs: one row per rebalance with a handful of assets at equal
+weights rounded to two decimals ("33.33%" x 3).
+"""
+from datetime import date
+from typing import List, Tuple
+
+import numpy as np
+
+FREQUENCIES = ("monthly", "weekly", "daily")
+DEFAULT_START = "2007-01-01"
+DEFAULT_END = "2019-07-01"
+
+
+def symbols_for(count: int) -> List[str]:
+    return [f"S{i:03d}" for i in range(count)]
+
+
+def price_panel(symbols: List[str], start: str = DEFAULT_START, end: str = DEFAULT_END,
+                seed: int = 0, missing_fraction: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """(dates, prices) with prices[t, j] the close of symbols[j]; NaN where missing"""
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    dates = dates[np.is_busday(dates)]
+    dates = dates[rng.random(len(dates)) > 0.02]
+    returns = rng.normal(0.0003, 0.012, size=(len(dates), len(symbols)))
+    prices = 50.0 * np.exp(np.cumsum(returns, axis=0))
+    if missing_fraction:
+        prices[rng.random(prices.shape) < missing_fraction] = np.nan
+    return dates, prices
+
+
+def rebalance_dates(frequency: str, start: str = DEFAULT_START, end: str = DEFAULT_END) -> np.ndarray:
+    """First of each month, each Monday, or each business day"""
+    if frequency == "monthly":
+        months = np.arange(np.datetime64(start, "M"), np.datetime64(end, "M"))
+        return months.astype("datetime64[D]")
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    if frequency == "weekly":
+        return days[np.is_busday(days, weekmask="Mon")]
+    if frequency == "daily":
+        return days[np.is_busday(days)]
+    raise ValueError(f"Unknown frequency {frequency!r}; expected one of {FREQUENCIES}")
+
+
+def snapshot_schedule(symbols: List[str], frequency: str, assets_per_rebalance: int,
+                      seed: int = 0, start: str = DEFAULT_START,
+                      end: str = DEFAULT_END) -> List[Tuple[date, List[str], List[float]]]:
+    """(date, assets, weights-in-percent) entries, as parsed from a snapshot CSV"""
+    rng = np.random.default_rng(seed)
+    count = min(assets_per_rebalance, len(symbols))
+    weight = round(100.0 / count, 2)
+    entries = []
+    for on_date in rebalance_dates(frequency, start, end).tolist():
+        picked = rng.choice(len(symbols), size=count, replace=False)
+        entries.append((on_date, [symbols[j] for j in sorted(picked)], [weight] * count))
+    return entries
+
+
+def price_dicts(symbols: List[str], dates: np.ndarray, prices: np.ndarray) -> dict:
+    """{symbol: {"YYYY-MM-DD": close}} as the removed route loaded them"""
+    keys = [str(d) for d in dates]
+    return {
+        symbol: {key: float(price) for key, price in zip(keys, prices[:, j]) if not np.isnan(price)}
+        for j, symbol in enumerate(symbols)
+    }
@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+"""
+Offline checks for the vectorized backtest engine against the dict-based
+simulation it replaced, using the bundled CSV schedules and synthetic prices.
+"""
+import csv
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services.backtest_engine import AllocationSchedule, EngineMode, ResumeState, run_backtest, run_backtest_batch
+from app.services.risk_metrics import (
+    RiskState, compute_risk_metrics, daily_returns, relative_metrics, rolling_beta, rolling_max_drawdown,
+    rolling_sharpe, rolling_volatility
+)
+from app.services.price_lookup import AsOfPriceSeries
+from app.services.holdings_valuation import holdings_curve
+from app.services.period_returns import period_returns
+from app.services.projection import block_bootstrap
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_CSVS = ["history_compact_monthly.csv", "123.csv"]
+
+
+def load_csv_entries(path):
+    """Parse an upload CSV the same way the upload endpoint does"""
+    entries = []
+    with open(path, encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            assets = [a.strip() for a in row["Assets"].replace('"', '').split(',') if a.strip()]
+            weights = [w.strip().replace('%', '') for w in row["Weights"].replace('"', '').split(',') if w.strip()]
+            entries.append((datetime.strptime(row["Start Date"].strip(), "%m/%d/%Y"), assets, weights))
+    return entries
+
+
+def synthetic_prices(symbols, start, end, seed, every_day=False):
+    """Seeded random-walk closes; business days with a few holidays, or every calendar day"""
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D"))
+    if not every_day:
+        dates = dates[np.is_busday(dates)]
+        dates = dates[rng.random(len(dates)) > 0.02]
+    returns = rng.normal(0.0003, 0.012, size=(len(dates), len(symbols)))
+    prices = 50.0 * np.exp(np.cumsum(returns, axis=0))
+    return dates, prices
+
+
+def rng_mask(shape, seed, fraction=0.01):
+    """Seeded mask of roughly fraction of the cells, for knocking out prices"""
+    return np.random.default_rng(seed).random(shape) < fraction
+
+
+def reference_simulation(entries, series, starting_value, lookup):
+    """The original sell-all/buy-new loop over per-symbol price lookups"""
+    portfolio_value = starting_value
+    holdings = {}
+    rebalance_values = []
+    for on_date, assets, weights in entries:
+        assets = [a.upper() for a in assets]
+        weights = [float(w) for w in weights]
+        total = sum(weights)
+        weights = [w * 100.0 / total for w in weights]
+        rebalance_date = on_date.date()
+        if holdings:
+            portfolio_value = sum(shares * lookup(series[s], rebalance_date) for s, shares in holdings.items())
+        holdings = {}
+        for asset, weight in zip(assets, weights):
+            price = lookup(series[asset], rebalance_date)
+            holdings[asset] = holdings.get(asset, 0.0) + portfolio_value * weight / 100.0 / price
+        rebalance_values.append(portfolio_value)
+    return np.array(rebalance_values), holdings
+
+
+def legacy_find_closest_price(price_dict, target_date):
+    """Verbatim copy of the removed lookup: exact date, else +-7 days preferring earlier"""
+    if target_date in price_dict:
+        return price_dict[target_date]
+    target = datetime.strptime(target_date, '%Y-%m-%d')
+    for days_offset in range(1, 8):
+        before_date = (target - timedelta(days=days_offset)).strftime('%Y-%m-%d')
+        if before_date in price_dict:
+            return price_dict[before_date]
+        after_date = (target + timedelta(days=days_offset)).strftime('%Y-%m-%d')
+        if after_date in price_dict:
+            return price_dict[after_date]
+    return None
+
+
+def _run_engine(entries, symbols, dates, prices, starting_value=100000.0):
+    schedule = AllocationSchedule.from_allocations(entries)
+    return run_backtest(schedule, dates, symbols, prices, starting_value)
+
+
+def test_engine_matches_reference_loop_on_bundled_csvs():
+    for seed, name in enumerate(BUNDLED_CSVS):
+        entries = load_csv_entries(os.path.join(HERE, name))
+        symbols = sorted({a.upper() for _, assets, _ in entries for a in assets})
+        dates, prices = synthetic_prices(symbols, "2006-12-01", "2019-07-01", seed)
+
+        result = _run_engine(entries, symbols, dates, prices)
+        series = {s: AsOfPriceSeries(dates, prices[:, j]) for j, s in enumerate(symbols)}
+        expected, final_holdings = reference_simulation(entries, series, 100000.0, AsOfPriceSeries.lookup)
+
+        assert len(result.rebalance_values) == len(entries)
+        np.testing.assert_allclose(result.rebalance_values, expected, rtol=1e-10)
+
+        # The daily curve after the last rebalance is the final holdings marked to market
+        last_value = sum(shares * series[s].prices[-1] for s, shares in final_holdings.items())
+        np.testing.assert_allclose(result.final_value, last_value, rtol=1e-10)
+        assert result.dates[0] <= result.rebalance_dates[0]
+        print(f"✅ {name}: {len(entries)} rebalances match, final ${result.final_value:,.2f}")
+
+
+def test_engine_close_to_legacy_lookup():
+    # With prices on every calendar day the legacy +-7 day search never looks
+    # ahead; what remains is the 0.01% the old loop left uninvested per
+    # rebalance for "33.33%" weights, which the engine now normalizes.
+    entries = load_csv_entries(os.path.join(HERE, BUNDLED_CSVS[0]))
+    symbols = sorted({a.upper() for _, assets, _ in entries for a in assets})
+    dates, prices = synthetic_prices(symbols, "2006-12-01", "2019-07-01", 42, every_day=True)
+
+    result = _run_engine(entries, symbols, dates, prices)
+    price_dicts = {
+        s: {str(d): p for d, p in zip(dates, prices[:, j])} for j, s in enumerate(symbols)
+    }
+
+    portfolio_value = 100000.0
+    holdings = {}
+    legacy_values = []
+    for on_date, assets, weights in entries:
+        rebalance_date = on_date.strftime('%Y-%m-%d')
+        if holdings:
+            portfolio_value = sum(shares * legacy_find_closest_price(price_dicts[s], rebalance_date)
+                                  for s, shares in holdings.items())
+        holdings = {}
+        for asset, weight in zip(assets, [float(w) for w in weights]):
+            price = legacy_find_closest_price(price_dicts[asset.upper()], rebalance_date)
+            holdings[asset.upper()] = portfolio_value * weight / 100.0 / price
+        legacy_values.append(portfolio_value)
+
+    np.testing.assert_allclose(result.rebalance_values, legacy_values, rtol=0.01)
+    print(f"✅ Within 1% of the legacy engine over {len(entries)} rebalances")
+
+
+def test_missing_price_is_held_as_cash():
+    dates = np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-01-11"))
+    prices = np.column_stack([np.linspace(10, 19, 10), np.full(10, np.nan)])
+    entries = [(datetime(2020, 1, 2), ["AAA", "BBB"], ["50", "50"])]
+
+    result = _run_engine(entries, ["AAA", "BBB"], dates, prices, 1000.0)
+    assert result.cash[0] == 500.0
+    # AAA doubles-ish from 11 to 19; the cash half is unchanged
+    np.testing.assert_allclose(result.final_value, 500.0 * 19 / 11 + 500.0)
+    assert any("No price for BBB" in e for e in result.errors)
+    print("✅ Uninvestable weight is held as cash")
+
+
+def test_skipped_entries_keep_source_positions():
+    dates = np.arange(np.datetime64("2020-01-01"), np.datetime64("2020-03-01"))
+    prices = np.linspace(10, 20, len(dates))[:, None]
+    entries = [
+        (datetime(2020, 1, 2), ["AAA"], ["100"]),
+        (datetime(2020, 1, 15), ["AAA", "BBB"], ["100"]),
+        (datetime(2020, 2, 3), ["AAA"], ["50"]),
+    ]
+    result = _run_engine(entries, ["AAA"], dates, prices)
+    assert result.source_index.tolist() == [0, 2]
+    assert any("Rebalance 2: Asset/weight count mismatch" == e for e in result.errors)
+    assert any("Rebalance 3: Weights sum to 50.0%" in e for e in result.errors)
+    print("✅ Skipped rebalances are reported and do not shift results")
+
+
+def test_curve_returns_and_volatility():
+    entries = load_csv_entries(os.path.join(HERE, BUNDLED_CSVS[0]))
+    symbols = sorted({a.upper() for _, assets, _ in entries for a in assets})
+    dates, prices = synthetic_prices(symbols, "2006-12-01", "2019-07-01", 7)
+    result = _run_engine(entries, symbols, dates, prices)
+
+    amount, fraction = daily_returns(result.values)
+    assert amount[0] == 0.0 and fraction[0] == 0.0
+    np.testing.assert_allclose([amount[-1], fraction[-1] * 100], result.daily_change())
+
+    # Volatility needs a full 30-day window of returns
+    volatility = rolling_volatility(fraction[1:])
+    assert np.isnan(volatility[28]) and not np.isnan(volatility[29])
+    returns = np.diff(result.values[-31:]) / result.values[-31:-1]
+    np.testing.assert_allclose(volatility[-1], returns.std(ddof=1) * np.sqrt(252) * 100)
+    print(f"✅ Daily returns and 30-day volatility over {len(result.values)} curve days")
+
+
+def test_resume_matches_full_replay():
+    entries = load_csv_entries(os.path.join(HERE, BUNDLED_CSVS[0]))
+    schedule = AllocationSchedule.from_allocations(entries)
+    dates, prices = synthetic_prices(schedule.symbols, "2006-12-01", "2019-07-01", 11)
+    # Leave holes so the resumed fill has to rely on the checkpoint closes
+    prices[np.random.default_rng(5).random(prices.shape) < 0.05] = np.nan
+    full = run_backtest(schedule, dates, schedule.symbols, prices)
+
+    for k in (0, 40, len(schedule) - 1):
+        state = ResumeState(position=k, nav=full.rebalance_values[k], shares=full.shares[k],
+                            cash=full.cash[k], prices=full.prices[k])
+        # Only prices from a week before the checkpoint are loaded on resume
+        window = dates >= schedule.dates[k] - np.timedelta64(7, "D")
+        resumed = run_backtest(schedule, dates[window], schedule.symbols, prices[window], resume=state)
+
+        assert resumed.source_index.tolist() == full.source_index[k:].tolist()
+        np.testing.assert_allclose(resumed.rebalance_values, full.rebalance_values[k:], rtol=1e-12)
+        np.testing.assert_allclose(resumed.values, full.values[-len(resumed.values):], rtol=1e-12)
+        assert resumed.dates[0] == full.trade_dates[k]
+    print("✅ Resuming from a checkpoint reproduces the full replay")
+
+
+def test_risk_metrics_batch_and_incremental_agree():
+    entries = load_csv_entries(os.path.join(HERE, BUNDLED_CSVS[0]))
+    symbols = sorted({a.upper() for _, assets, _ in entries for a in assets})
+    dates, prices = synthetic_prices(symbols + ["SPY"], "2006-12-01", "2019-07-01", 11)
+    result = _run_engine(entries, symbols, dates, prices[:, :-1])
+    benchmark = prices[-len(result.values):, -1].copy()
+    benchmark[[5, 6, 400]] = np.nan
+
+    metrics = compute_risk_metrics(result.values, benchmark, risk_free_rate=0.02)
+    returns = np.diff(result.values) / result.values[:-1]
+    excess = returns - 0.02 / 252
+    np.testing.assert_allclose(metrics.volatility, returns.std(ddof=1) * np.sqrt(252) * 100)
+    np.testing.assert_allclose(metrics.sharpe_ratio, excess.mean() / returns.std(ddof=1) * np.sqrt(252))
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+    np.testing.assert_allclose(metrics.sortino_ratio, excess.mean() / downside * np.sqrt(252))
+    peaks = np.maximum.accumulate(result.values)
+    np.testing.assert_allclose(metrics.max_drawdown, ((result.values / peaks - 1) * 100).min())
+    bench_returns = np.diff(benchmark) / benchmark[:-1]
+    paired = np.isfinite(bench_returns)
+    cov = np.cov(returns[paired], bench_returns[paired])
+    np.testing.assert_allclose(metrics.beta, cov[0, 1] / cov[1, 1])
+
+    # The last rolling window over the whole curve is the full-curve figure
+    window = len(returns)
+    np.testing.assert_allclose(rolling_sharpe(returns, window, 0.02)[-1], metrics.sharpe_ratio)
+    np.testing.assert_allclose(rolling_max_drawdown(result.values, len(result.values))[-1], metrics.max_drawdown)
+    clean = np.nan_to_num(bench_returns)
+    np.testing.assert_allclose(rolling_beta(returns, clean, 60)[-1],
+                               np.cov(returns[-60:], clean[-60:])[0, 1] / clean[-60:].var(ddof=1))
+
+    # Appending days one at a time to a stored state gives the batch numbers
+    split = len(result.values) - 250
+    state = RiskState.from_dict(RiskState.from_curve(result.values[:split], benchmark[:split], 0.02).to_dict())
+    for value, close in zip(result.values[split:], benchmark[split:]):
+        state.update(value, None if np.isnan(close) else close)
+    np.testing.assert_allclose(state.metrics(), metrics, rtol=1e-9)
+    print(f"✅ Risk metrics: sharpe {metrics.sharpe_ratio:.2f}, beta {metrics.beta:.2f}, incremental matches batch")
+
+
+def test_batch_matches_single_runs():
+    schedules = []
+    for name in BUNDLED_CSVS:
+        schedule = AllocationSchedule.from_allocations(load_csv_entries(os.path.join(HERE, name)))
+        schedules += [schedule, schedule.shifted(3)]
+    symbols = sorted({s for schedule in schedules for s in schedule.symbols})
+    dates, prices = synthetic_prices(symbols, "2006-12-01", "2019-07-01", 13)
+    prices[rng_mask(prices.shape, 17)] = np.nan
+
+    for schedule, batched in zip(schedules, run_backtest_batch(schedules, dates, symbols, prices)):
+        single = run_backtest(schedule, dates, symbols, prices)
+        np.testing.assert_allclose(batched.values, single.values, rtol=1e-12)
+        assert batched.errors == single.errors
+
+    # Results are linear in the starting value
+    single = run_backtest(schedules[0], dates, symbols, prices, starting_value=2500.0)
+    scaled = run_backtest(schedules[0], dates, symbols, prices).scaled(2500.0)
+    np.testing.assert_allclose(scaled.values, single.values, rtol=1e-12)
+    np.testing.assert_allclose(scaled.rebalance_values, single.rebalance_values, rtol=1e-12)
+    print(f"✅ Batched run of {len(schedules)} schedules matches single runs; rescaling matches a rerun")
+
+
+def test_segmented_mode_matches_sequential():
+    # Daily rebalancing is the case the segmented mode is for
+    dates, prices = synthetic_prices(["AAA", "BBB", "CCC"], "2015-01-01", "2019-01-01", 19)
+    prices[rng_mask(prices.shape, 23)] = np.nan
+    entries = [(d.item(), ["AAA", "BBB", "CCC", "ZZZ"], [40, 30, 20, 10]) for d in dates]
+    entries += [(np.datetime64("2019-06-01").item(), ["AAA"], [100])]
+    schedule = AllocationSchedule.from_allocations(entries)
+
+    sequential = run_backtest(schedule, dates, ["AAA", "BBB", "CCC"], prices)
+    segmented = run_backtest(schedule, dates, ["AAA", "BBB", "CCC"], prices, mode=EngineMode.SEGMENTED)
+    assert segmented.source_index.tolist() == sequential.source_index.tolist()
+    assert segmented.errors == sequential.errors
+    np.testing.assert_allclose(segmented.rebalance_values, sequential.rebalance_values, rtol=1e-9)
+    np.testing.assert_allclose(segmented.values, sequential.values, rtol=1e-9)
+    np.testing.assert_allclose(segmented.shares, sequential.shares, rtol=1e-9)
+
+    k = len(sequential.rebalance_values) // 2
+    resume = ResumeState(
+        position=int(np.flatnonzero(schedule.source_index == sequential.source_index[k])[0]),
+        nav=float(sequential.rebalance_values[k]), shares=sequential.shares[k],
+        cash=float(sequential.cash[k]), prices=sequential.prices[k],
+    )
+    row = sequential.rebalance_rows[k]
+    resumed = run_backtest(schedule, dates[row:], ["AAA", "BBB", "CCC"], prices[row:],
+                           resume=resume, mode=EngineMode.SEGMENTED)
+    np.testing.assert_allclose(resumed.values, sequential.values[-len(resumed.values):], rtol=1e-9)
+    print(f"✅ Segmented mode matches sequential over {len(sequential.rebalance_values)} daily rebalances")
+
+
+def test_block_bootstrap_is_seeded_and_consistent():
+    returns = np.random.default_rng(3).normal(0.0004, 0.01, 2000)
+    projection = block_bootstrap(returns, 2520, paths=4000, block_days=21, seed=7)
+    again = block_bootstrap(returns, 2520, paths=4000, block_days=21, seed=7)
+    np.testing.assert_array_equal(projection.growth, again.growth)
+    assert projection.trading_days[0] == 0 and projection.trading_days[-1] == 2520
+    # Bands are ordered by percentile at every point and start at today's value
+    assert np.all(np.diff(projection.growth, axis=0) >= 0)
+    np.testing.assert_allclose(projection.growth[:, 0], 1.0)
+
+    # A path made of one block repeated is that block's compounded growth
+    one_block = block_bootstrap(np.full(50, 0.001), 10, paths=1000, block_days=5, seed=0)
+    np.testing.assert_allclose(one_block.final_growth, 1.001 ** 10)
+
+    # The median path compounds at about the median block's log growth
+    expected = np.exp(np.log1p(returns).mean() * 2520)
+    assert abs(np.log(np.median(projection.final_growth) / expected)) < 0.05
+    print(f"✅ Bootstrap projection: median {np.median(projection.final_growth):.2f}x over 10y, "
+          f"P(loss) {projection.probability_of_loss:.1%}")
+
+
+def test_period_returns_from_trailing_window():
+    dates = np.arange(np.datetime64("2019-01-02"), np.datetime64("2023-03-16"))
+    dates = dates[np.is_busday(dates)]
+    values = 100.0 * np.exp(np.linspace(0, 1, len(dates)))
+    full = period_returns(dates, values)
+
+    def value_on_or_before(day):
+        return values[np.searchsorted(dates, np.datetime64(day), side="right") - 1]
+
+    # 2023-03-15 is a Wednesday; 2022-03-15 a Tuesday, 2022-12-31 a Saturday
+    np.testing.assert_allclose(full["return_1y"], (values[-1] / value_on_or_before("2022-03-15") - 1) * 100)
+    np.testing.assert_allclose(full["return_ytd"], (values[-1] / value_on_or_before("2022-12-30") - 1) * 100)
+    np.testing.assert_allclose(full["return_1d"], (values[-1] / values[-2] - 1) * 100)
+    np.testing.assert_allclose(full["return_inception"], (values[-1] / values[0] - 1) * 100)
+
+    # A trailing window plus the inception value gives the same numbers
+    start = np.searchsorted(dates, np.datetime64("2020-03-01"))
+    window = period_returns(dates[start:], values[start:], inception_value=values[0])
+    assert window == full
+    assert period_returns(dates[-100:], values[-100:])["return_1y"] is None
+    print(f"✅ Period returns: 1y {full['return_1y']:.1f}%, window matches full curve")
+
+
+def test_relative_metrics_match_per_benchmark_loop():
+    rng = np.random.default_rng(5)
+    bench = rng.normal(0.0003, 0.01, size=(750, 3))
+    returns = 0.8 * bench[:, 0] + rng.normal(0.0001, 0.004, 750)
+    bench[:200, 2] = np.nan  # shorter history
+    metrics = relative_metrics(returns, bench)
+
+    for k in range(3):
+        known = np.isfinite(bench[:, k])
+        r, b = returns[known], bench[known, k]
+        active = r - b
+        np.testing.assert_allclose(metrics.excess_return[k], (np.prod(1 + r) - np.prod(1 + b)) * 100)
+        np.testing.assert_allclose(metrics.tracking_error[k], active.std(ddof=1) * np.sqrt(252) * 100)
+        np.testing.assert_allclose(metrics.information_ratio[k], active.mean() / active.std(ddof=1) * np.sqrt(252))
+        np.testing.assert_allclose(metrics.up_capture[k], r[b > 0].mean() / b[b > 0].mean() * 100)
+        np.testing.assert_allclose(metrics.down_capture[k], r[b < 0].mean() / b[b < 0].mean() * 100)
+    print(f"✅ Relative metrics: up/down capture vs first benchmark "
+          f"{metrics.up_capture[0]:.0f}%/{metrics.down_capture[0]:.0f}%")
+
+
+def test_attribution_adds_up_to_returns():
+    entries = load_csv_entries(os.path.join(HERE, BUNDLED_CSVS[0]))
+    symbols = sorted({a.upper() for _, assets, _ in entries for a in assets})
+    dates, prices = synthetic_prices(symbols, "2006-12-01", "2019-07-01", 13)
+    prices[rng_mask(prices.shape, 13)] = np.nan
+    for mode in EngineMode:
+        result = run_backtest(AllocationSchedule.from_allocations(entries), dates, symbols, prices, mode=mode)
+        np.testing.assert_allclose(result.contributions.sum(axis=1),
+                                   result.period_end_values() - result.rebalance_values, rtol=1e-9, atol=1e-6)
+        per_period, cumulative = result.attribution()
+        np.testing.assert_allclose(cumulative.sum(), result.total_return_percentage, rtol=1e-9)
+        np.testing.assert_allclose(per_period.sum(axis=1),
+                                   (result.period_end_values() / result.rebalance_values - 1) * 100, atol=1e-9)
+    top = result.symbols[int(np.argmax(cumulative))]
+    print(f"✅ Attribution adds up over {len(result.rebalance_values)} periods; top contributor {top}")
+
+
+def test_holdings_curve_with_staggered_purchases():
+    dates, prices = synthetic_prices(["AAA", "BBB", "CCC"], "2020-01-01", "2021-01-01", 17)
+    prices[:40, 1] = np.nan
+    quantities = np.array([10.0, 5.0, 2.0])
+    costs = np.array([100.0, 50.0, 20.0])
+    # The third holding is bought on a Saturday and counts from Monday
+    purchases = np.array(["2020-03-02", "2020-01-01", "2020-06-06"], dtype="datetime64[D]")
+    curve = holdings_curve(dates, prices, quantities, costs, purchases)
+
+    assert curve.dates[0] == dates[0] and curve.dates[-1] == dates[-1]
+    filled = prices.copy()
+    for t in range(1, len(dates)):
+        filled[t] = np.where(np.isnan(filled[t]), filled[t - 1], filled[t])
+    filled = np.where(np.isnan(filled), costs, filled)
+    held = curve.dates[:, None] >= purchases[None, :]
+    np.testing.assert_allclose(curve.values, (filled * held * quantities).sum(axis=1))
+    np.testing.assert_allclose(curve.cost_basis, (held * quantities * costs).sum(axis=1))
+    assert np.all(np.diff(curve.cost_basis) >= 0)
+    np.testing.assert_allclose(curve.last_prices, filled[-1])
+    print(f"✅ Holdings curve over {len(curve.dates)} days with {int(np.count_nonzero(np.diff(curve.cost_basis)))} purchases")
+
+
+if __name__ == "__main__":
+    test_engine_matches_reference_loop_on_bundled_csvs()
+    test_engine_close_to_legacy_lookup()
+    test_missing_price_is_held_as_cash()
+    test_skipped_entries_keep_source_positions()
+    test_curve_returns_and_volatility()
+    test_resume_matches_full_replay()
+    test_risk_metrics_batch_and_incremental_agree()
+    test_batch_matches_single_runs()
+    test_segmented_mode_matches_sequential()
+    test_block_bootstrap_is_seeded_and_consistent()
+    test_period_returns_from_trailing_window()
+    test_relative_metrics_match_per_benchmark_loop()
+    test_attribution_adds_up_to_returns()
+    test_holdings_curve_with_staggered_purchases()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Offline checks for the as-of price lookup (no database or server needed)
+"""
+from datetime import date, datetime
+
+import numpy as np
+
+from app.services.price_lookup import AsOfPriceSeries, AsOfPolicy
+
+# Fri 2006-12-29, then the market was closed until Wed 2007-01-03
+ROWS = [
+    (date(2006, 12, 28), 10.0),
+    (date(2006, 12, 29), 11.0),
+    (date(2007, 1, 3), 12.0),
+    (date(2007, 1, 4), 13.0),
+]
+
+
+def test_previous_close_never_looks_ahead():
+    series = AsOfPriceSeries.from_rows(ROWS)
+    assert series.lookup(date(2007, 1, 3)) == 12.0
+    # New Year's Day uses Friday's close, not the next available one
+    assert series.lookup(date(2007, 1, 1)) == 11.0
+    assert series.lookup(datetime(2007, 1, 2, 15, 30)) == 11.0
+    # Before the first observation there is nothing to use
+    assert series.lookup(date(2006, 12, 27)) is None
+    print("✅ Previous-close lookups")
+
+
+def test_staleness_limit():
+    series = AsOfPriceSeries.from_rows(ROWS, max_gap_days=3)
+    assert series.lookup(date(2007, 1, 7)) == 13.0
+    # The window is in trading days: Thursday's close still counts the next
+    # Tuesday (Thu, Fri, Mon) but not Wednesday
+    assert series.lookup(date(2007, 1, 9)) == 13.0
+    assert series.lookup(date(2007, 1, 10)) is None
+    print("✅ Staleness limit")
+
+
+def test_nearest_policy():
+    series = AsOfPriceSeries.from_rows(ROWS, policy=AsOfPolicy.NEAREST, max_gap_days=2)
+    # Jan 2 is one trading day before Jan 3 and two after Dec 29
+    assert series.lookup(date(2007, 1, 2)) == 12.0
+    series = AsOfPriceSeries.from_rows(ROWS, policy=AsOfPolicy.NEAREST, max_gap_days=7)
+    assert series.lookup(date(2006, 12, 31)) == 11.0
+    # Monday Jan 1 is one trading day after Friday and two before Wednesday
+    assert series.lookup(date(2007, 1, 1)) == 11.0
+    assert series.lookup(date(2006, 12, 27)) == 10.0
+    # Equal distance prefers the earlier close
+    series = AsOfPriceSeries.from_rows([(date(2020, 1, 6), 1.0), (date(2020, 1, 8), 2.0)],
+                                       policy=AsOfPolicy.NEAREST)
+    assert series.lookup(date(2020, 1, 7)) == 1.0
+    # A weekend in between does not count towards the distance
+    series = AsOfPriceSeries.from_rows([(date(2020, 1, 2), 1.0), (date(2020, 1, 6), 2.0)],
+                                       policy=AsOfPolicy.NEAREST, max_gap_days=1)
+    assert series.lookup(date(2020, 1, 3)) == 1.0
+    assert series.lookup(date(2020, 1, 4)) == 2.0
+    print("✅ Nearest lookups")
+
+
+def test_batch_matches_single_lookups():
+    rng = np.random.default_rng(7)
+    dates = np.datetime64("2020-01-01") + np.sort(rng.choice(2000, size=1200, replace=False))
+    prices = rng.uniform(50, 150, size=len(dates))
+    series = AsOfPriceSeries(dates, prices)
+
+    targets = np.datetime64("2019-12-25") + np.arange(0, 2100, 3)
+    batch = series.lookup_many(targets)
+    for target, value in zip(targets, batch):
+        single = series.lookup(target)
+        assert (single is None and np.isnan(value)) or single == value
+    print(f"✅ Batch lookup agrees with {len(targets)} single lookups")
+
+
+def test_empty_series():
+    series = AsOfPriceSeries.from_rows([])
+    assert series.lookup(date(2020, 1, 1)) is None
+    assert np.isnan(series.lookup_many([date(2020, 1, 1)])).all()
+    print("✅ Empty series")
+
+
+if __name__ == "__main__":
+    test_previous_close_never_looks_ahead()
+    test_staleness_limit()
+    test_nearest_policy()
+    test_batch_matches_single_lookups()
+    test_empty_series()